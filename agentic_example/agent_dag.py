@@ -0,0 +1,263 @@
+# agent_dag.py
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_core.models import ChatCompletionClient, RequestUsage
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(*parts: Any) -> str:
+    """Stable digest of JSON-serialisable values (dict key order does not matter)"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Stage:
+    """One node of the pipeline.
+
+    ``fn(inputs)`` receives a dict holding the artifacts named in ``inputs``
+    and returns this stage's artifact (stored under ``name``). When
+    ``skip_if(inputs)`` is true the stage does not run and passes its first
+    input through unchanged. Bump ``version`` when the stage logic changes so
+    cached artifacts are not reused.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        inputs: Sequence[str] = (),
+        skip_if: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        version: str = "1",
+        cacheable: bool = True,
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.skip_if = skip_if
+        self.version = version
+        self.cacheable = cacheable
+
+    def cache_key(self, inputs: Dict[str, Any]) -> str:
+        return content_hash(self.name, self.version, inputs)
+
+    async def execute(self, inputs: Dict[str, Any]) -> Tuple[Any, RequestUsage]:
+        return await self.fn(inputs), RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+
+class AgentStage(Stage):
+    """Stage backed by a fresh ``AssistantAgent`` per run.
+
+    ``build_task(inputs)`` renders the user message and ``parse(text)`` turns
+    the final reply into the artifact. Token usage is summed from the
+    messages of the run. The system message is part of the cache key, so
+    editing a prompt invalidates that stage (and everything downstream).
+    Give the model client the same ``parse`` as its ``validate`` hook so a
+    reply that fails here is not served again from the response cache.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model_client: ChatCompletionClient,
+        system_message: str,
+        build_task: Callable[[Dict[str, Any]], str],
+        parse: Callable[[str], Any] = json.loads,
+        inputs: Sequence[str] = (),
+        skip_if: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        version: str = "1",
+    ):
+        super().__init__(name, inputs=inputs, skip_if=skip_if, version=version)
+        self.model_client = model_client
+        self.system_message = system_message
+        self.build_task = build_task
+        self.parse = parse
+
+    def cache_key(self, inputs: Dict[str, Any]) -> str:
+        return content_hash(self.name, self.version, self.system_message, inputs)
+
+    async def execute(self, inputs: Dict[str, Any]) -> Tuple[Any, RequestUsage]:
+        # agents keep chat history, so every run gets its own
+        agent = AssistantAgent(
+            name=self.name,
+            model_client=self.model_client,
+            system_message=self.system_message,
+        )
+        result = await agent.run(task=self.build_task(inputs))
+        usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        for message in result.messages:
+            if message.models_usage:
+                usage.prompt_tokens += message.models_usage.prompt_tokens
+                usage.completion_tokens += message.models_usage.completion_tokens
+        return self.parse(result.messages[-1].to_text()), usage
+
+
+class ArtifactCache:
+    """Stage outputs on disk, one JSON file per content hash"""
+
+    def __init__(self, directory: Union[str, Path] = ".cache/artifacts"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["artifact"]
+
+    def put(self, key: str, artifact: Any) -> None:
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"artifact": artifact}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class StageMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.status = "pending"  # ran / cached / skipped / failed
+        self.latency_ms = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "latency_ms": round(self.latency_ms, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+class AgentDAG:
+    """Runs stages as soon as their inputs exist.
+
+    Stages whose inputs are ready run concurrently (bounded by
+    ``max_concurrency`` if given). Artifacts are cached by a hash of the
+    stage and its inputs, so a rerun with the same script touches the model
+    only for stages whose inputs actually changed.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        cache: Optional[ArtifactCache] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.metrics: Dict[str, StageMetrics] = {}
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle in pipeline: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dependency in self.stages[name].inputs:
+                if dependency in self.stages:
+                    visit(dependency, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    async def _run_stage(
+        self,
+        stage: Stage,
+        upstream: Dict[str, "asyncio.Task"],
+        artifacts: Dict[str, Any],
+        semaphore: Optional[asyncio.Semaphore],
+    ) -> Any:
+        for dependency in stage.inputs:
+            if dependency in upstream:
+                await upstream[dependency]
+        inputs = {key: artifacts[key] for key in stage.inputs}
+        metrics = self.metrics[stage.name]
+        start = time.perf_counter()
+
+        if stage.skip_if and stage.skip_if(inputs):
+            metrics.status = "skipped"
+            artifacts[stage.name] = inputs[stage.inputs[0]] if stage.inputs else None
+            return artifacts[stage.name]
+
+        key = stage.cache_key(inputs) if self.cache and stage.cacheable else None
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            metrics.status = "cached"
+            metrics.latency_ms = (time.perf_counter() - start) * 1000
+            artifacts[stage.name] = cached
+            return cached
+
+        try:
+            if semaphore:
+                async with semaphore:
+                    artifact, usage = await stage.execute(inputs)
+            else:
+                artifact, usage = await stage.execute(inputs)
+        except Exception:
+            metrics.status = "failed"
+            metrics.latency_ms = (time.perf_counter() - start) * 1000
+            raise
+        metrics.status = "ran"
+        metrics.latency_ms = (time.perf_counter() - start) * 1000
+        metrics.prompt_tokens = usage.prompt_tokens
+        metrics.completion_tokens = usage.completion_tokens
+        if key:
+            self.cache.put(key, artifact)
+        artifacts[stage.name] = artifact
+        logger.info(f"Stage {stage.name} finished in {metrics.latency_ms:.0f} ms")
+        return artifact
+
+    async def run(self, initial: Dict[str, Any]) -> Dict[str, Any]:
+        """Run every stage and return all artifacts, including ``initial``"""
+        for stage in self.stages.values():
+            for dependency in stage.inputs:
+                if dependency not in self.stages and dependency not in initial:
+                    raise ValueError(f"Stage {stage.name} needs unknown input '{dependency}'")
+
+        artifacts = dict(initial)
+        self.metrics = {name: StageMetrics(name) for name in self.order}
+        semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in self.order:
+            tasks[name] = asyncio.create_task(self._run_stage(self.stages[name], tasks, artifacts, semaphore))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        return artifacts
+
+    def report(self) -> str:
+        lines = [f"{'stage':<16}{'status':>10}{'ms':>10}{'prompt tok':>12}{'completion tok':>16}"]
+        for name in self.order:
+            s = self.metrics[name].summary() if name in self.metrics else StageMetrics(name).summary()
+            lines.append(
+                f"{name:<16}{s['status']:>10}{s['latency_ms']:>10}"
+                f"{s['prompt_tokens']:>12}{s['completion_tokens']:>16}"
+            )
+        return "\n".join(lines)
@@ -1,11 +1,25 @@
-from autogen import AssistantAgent, UserProxyAgent
+import asyncio
+import json
+import logging
+import re
+import sys
+from typing import Dict, List
 
-# ---------- Sub-Agents ---------- #
+from autogen_ext.models.replay import ReplayChatCompletionClient
+from pydantic import BaseModel, Field, ValidationError
 
-analyzer = AssistantAgent(
-    name="AnalyzerAgent",
-    system_message="""
-    You are the Analyzer Agent. 
+from agent_dag import AgentDAG, AgentStage, ArtifactCache, Stage
+from autogen_course.model_clients import close_all, get_client, report
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TOTAL_SECONDS = 60
+
+# ---------- Sub-Agent prompts ---------- #
+
+ANALYZER_PROMPT = """
+    You are the Analyzer Agent.
     Task: Read the script and identify main story beats or logical shifts.
     Output only a JSON outline of segment labels (no text splitting).
     Example:
@@ -20,54 +34,138 @@ analyzer = AssistantAgent(
       ]
     }
     """
-)
 
-segmenter = AssistantAgent(
-    name="SegmenterAgent",
-    system_message="""
+SEGMENTER_PROMPT = """
     You are the Segmenter Agent.
     Task: Use Analyzer's outline and split the script into segments.
     Preserve original wording. Assign labels from the outline.
     Output JSON with:
     { "segments": [ { "label": "...", "text": "..." } ] }
     """
-)
 
-formatter = AssistantAgent(
-    name="FormatterAgent",
-    system_message="""
+FORMATTER_PROMPT = """
     You are the Formatter Agent.
     Task: Take Segmenter’s JSON and reformat cleanly.
     Add `"time_estimate": "X-Ys"` for each segment assuming total 60s.
     Keep segments in logical order.
+    Output only the JSON.
     """
-)
 
-evaluator = AssistantAgent(
-    name="EvaluatorAgent",
-    system_message="""
+EVALUATOR_PROMPT = """
     You are the Evaluator & Refiner Agent.
     Task: Check narrative flow, pacing, and label accuracy.
     If needed, refine segmentation.
     Output only the final improved JSON.
     """
-)
-
-# ---------- Controller Agent ---------- #
-
-controller = UserProxyAgent(
-    name="ControllerAgent",
-    human_input_mode="NEVER",  # fully automated
-    system_message="""
-    You are the Controller Agent. 
-    Orchestrate the workflow:
-    1. Send the script to AnalyzerAgent.
-    2. Send Analyzer output + script to SegmenterAgent.
-    3. Send Segmenter output to FormatterAgent.
-    4. Send Formatter output to EvaluatorAgent.
-    Return only the final refined JSON.
-    """
-)
+
+
+# ---------- Output schema ---------- #
+
+class FormattedSegment(BaseModel):
+    label: str
+    text: str
+    time_estimate: str = Field(pattern=r"^\d+-\d+s$")
+
+
+class FormattedScript(BaseModel):
+    segments: List[FormattedSegment]
+
+
+def parse_json(text: str):
+    # tolerate ```json fences around the reply
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    return json.loads(match.group(0) if match else text)
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def formatted_is_valid(inputs: Dict) -> bool:
+    """Skip the Evaluator when the Formatter already produced usable output:
+    schema-valid, wording preserved and timings inside the 60s budget."""
+    try:
+        formatted = FormattedScript.model_validate(inputs["formatted"])
+    except ValidationError:
+        return False
+    if not formatted.segments:
+        return False
+    script_words = _words(inputs["script"])
+    segment_words = [w for s in formatted.segments for w in _words(s.text)]
+    end = int(formatted.segments[-1].time_estimate.split("-")[1].rstrip("s"))
+    return segment_words == script_words and end <= TOTAL_SECONDS
+
+
+async def script_stats(inputs: Dict) -> Dict:
+    """Word counts per paragraph, computed locally while the Analyzer runs"""
+    paragraphs = [p.strip() for p in inputs["script"].split("\n\n") if p.strip()]
+    counts = [len(_words(p)) for p in paragraphs]
+    total = sum(counts)
+    return {
+        "total_words": total,
+        "words_per_second": round(total / TOTAL_SECONDS, 2),
+        "paragraph_words": counts,
+    }
+
+
+def build_pipeline(clients: Dict, cache: ArtifactCache = None) -> AgentDAG:
+    return AgentDAG(
+        [
+            AgentStage(
+                "analysis",
+                clients["analysis"],
+                ANALYZER_PROMPT,
+                build_task=lambda i: i["script"],
+                parse=parse_json,
+                inputs=["script"],
+            ),
+            Stage("stats", script_stats, inputs=["script"], cacheable=False),
+            AgentStage(
+                "segments",
+                clients["segments"],
+                SEGMENTER_PROMPT,
+                build_task=lambda i: json.dumps({"analysis": i["analysis"], "script": i["script"]}),
+                parse=parse_json,
+                inputs=["analysis", "script"],
+            ),
+            AgentStage(
+                "formatted",
+                clients["formatted"],
+                FORMATTER_PROMPT,
+                build_task=lambda i: json.dumps({"segments": i["segments"], "script_stats": i["stats"]}),
+                parse=parse_json,
+                inputs=["segments", "stats"],
+            ),
+            AgentStage(
+                "final",
+                clients["final"],
+                EVALUATOR_PROMPT,
+                build_task=lambda i: json.dumps(i["formatted"]),
+                parse=parse_json,
+                inputs=["formatted", "script"],
+                skip_if=formatted_is_valid,
+            ),
+        ],
+        cache=cache,
+    )
+
+
+def fake_clients(script: str) -> Dict:
+    """Canned replies so the pipeline can be exercised without a llama.cpp server"""
+    paragraphs = [p.strip() for p in script.split("\n\n") if p.strip()]
+    labels = ["Hook", "Conflict", "Resolution", "Call to Action"][: len(paragraphs)]
+    segments = [{"label": label, "text": text} for label, text in zip(labels, paragraphs)]
+    step = TOTAL_SECONDS // len(segments)
+    formatted = [
+        dict(s, time_estimate=f"{i * step}-{(i + 1) * step}s") for i, s in enumerate(segments)
+    ]
+    return {
+        "analysis": ReplayChatCompletionClient([json.dumps({"analysis": labels})]),
+        "segments": ReplayChatCompletionClient([json.dumps({"segments": segments})]),
+        "formatted": ReplayChatCompletionClient([json.dumps({"segments": formatted})]),
+        "final": ReplayChatCompletionClient([json.dumps({"segments": formatted})]),
+    }
+
 
 # ---------- Input Script ---------- #
 script = """
@@ -82,18 +180,31 @@ So if you're stuck right now—just start. Even if it’s messy.
 Tag someone who needs to hear this.
 """
 
+
 # ---------- Run Workflow ---------- #
-# Step 1: Analyzer
-analysis = controller.initiate_chat(analyzer, message=script)
+async def main():
+    # python example01.py --fake runs against canned replies instead of the server
+    if "--fake" in sys.argv:
+        clients = fake_clients(script)
+        cache = None
+    else:
+        clients = {
+            name: get_client(name=f"{name}_agent", response_format={"type": "json_object"}, validate=parse_json)
+            for name in ("analysis", "segments", "formatted", "final")
+        }
+        cache = ArtifactCache()
 
-# Step 2: Segmenter
-segments = controller.initiate_chat(segmenter, message={"analysis": analysis, "script": script})
+    pipeline = build_pipeline(clients, cache)
+    try:
+        artifacts = await pipeline.run({"script": script})
+    finally:
+        print(pipeline.report())
+        if "--fake" not in sys.argv:
+            print(report())
+            await close_all()
 
-# Step 3: Formatter
-formatted = controller.initiate_chat(formatter, message=segments)
+    # ---------- Print Final JSON ---------- #
+    print(json.dumps(artifacts["final"], indent=2, ensure_ascii=False))
 
-# Step 4: Evaluator
-final_output = controller.initiate_chat(evaluator, message=formatted)
 
-# ---------- Print Final JSON ---------- #
-print(final_output)
+asyncio.run(main())
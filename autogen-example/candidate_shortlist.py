@@ -0,0 +1,48 @@
+# candidate_shortlist.py
+from sentence_transformers import SentenceTransformer
+from typing import List
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingShortlister:
+    """Pre-rank image candidates by embedding similarity before the LLM sees them.
+
+    Every candidate name is scored against the keyword in one vectorized pass
+    and only the ``top_k`` best are kept, so prompt size stays bounded no
+    matter how many scraped results come in.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", top_k: int = 20):
+        self.model_name = model_name
+        self.top_k = top_k
+        self.model = SentenceTransformer(model_name)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32)
+
+    def score(self, keyword: str, images: List[dict]) -> np.ndarray:
+        """Cosine similarity between the keyword and every image name"""
+        if not images:
+            return np.zeros(0, dtype=np.float32)
+        names = [img.get("name", "") for img in images]
+        keyword_embedding = self._encode([keyword])[0]
+        return self._encode(names) @ keyword_embedding
+
+    def shortlist(self, keyword: str, images: List[dict]) -> List[dict]:
+        """Return the ``top_k`` images most similar to the keyword, best first"""
+        if len(images) <= self.top_k:
+            return images
+
+        scores = self.score(keyword, images)
+        top = np.argpartition(-scores, self.top_k - 1)[: self.top_k]
+        top = top[np.argsort(-scores[top])]
+        logger.info(
+            f"Shortlisted {len(top)} of {len(images)} images for '{keyword}' "
+            f"(best score {scores[top[0]]:.3f})"
+        )
+        return [images[i] for i in top]
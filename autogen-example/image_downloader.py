@@ -5,143 +5,170 @@ from pydoll.browser.options import ChromiumOptions as Options
 from bs4 import BeautifulSoup
 import json
 from pathlib import Path
-from sentence_transformers import SentenceTransformer, util
+from autogen_course.embedding_cache import EmbeddingCache
+from autogen_course.image_matcher import ImageMatcher
+from autogen_course.wait_engine import WaitEngine, pixabay_search_url
+from autogen_course.asset_store import AssetStore
 import os
-import shutil
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+model = EmbeddingCache('all-MiniLM-L6-v2')
+matcher = ImageMatcher(model)
+waits = WaitEngine()
 
+RESULTS_SELECTOR = 'div[class^="results"] div[class^="verticalMasonry"] script[type="application/ld+json"]'
+# seconds to wait for any single element before giving up on the step
+STEP_TIMEOUT = 10
+# photo / horizontal / authentic filters come from the search URL instead of
+# six dropdown clicks; set to False to drive the filter UI
+USE_URL_FILTERS = True
 
-def handle_image(index:str):
-    #  current directory
-    current_dir = Path(os.path.join(os.getcwd(), "image_downloads"))
-    # target directory
-    target_dir = Path(os.path.join(os.getcwd(), "images"))
 
-    for file in current_dir.iterdir():
-        if file.is_file():
-            new_name = f"{index}.jpg"
-            new_path = target_dir / new_name  # new folder + new name
-            # file.rename(new_path)
-            shutil.move(str(file), str(new_path))
-            print(f"Moved + renamed {file.name} → {new_path}")
+# project name keys the segment -> image entries in the asset store
+PROJECT = os.path.basename(os.getcwd())
+store = AssetStore()
 
-async def main(query:str,index:str):
-    
+
+def handle_image(index: str, query: str = None, url: str = None):
+    # each segment downloads into its own sub folder
+    download_dir = os.path.join(os.getcwd(), "image_downloads", index)
+    store.fetch_to(os.getcwd(), index, url=url, query=query, download_dir=download_dir)
+
+
+async def process_segment(tab:Tab, query:str, index:str):
+    """Search, pick and download the best image for one segment in an open tab"""
+    selected_image = None
+    best_score = -1
     try:
+        await waits.step("goto_search", tab.go_to(pixabay_search_url(query, filtered=USE_URL_FILTERS)))
         
-        options = Options()
-        
-        # options.binary_location = r'C:\Program Files\Google\Chrome\Application\chrome.exe'
-        # Use existing profile
-        # user_data_dir = r"C:\Users\admin\AppData\Local\Google\Chrome\User Data"
-        # options.add_argument(f"--user-data-dir={user_data_dir}")
-        options.add_argument("--profile-directory=Default")  # Use default profile
-    
-        # Optional: Prevent browser from closing automatically
-        # options.add_experimental_option("detach", True)
-        async with Chrome(options=options) as browser:   
-            # id = await browser.get_browser_contexts()  
-            tab = await browser.start()
-            await tab.go_to("https://pixabay.com/")
-            await asyncio.sleep(2)
-            # select input element input[type="search"]
-            search_box = await tab.query("input[type='search']")
-            await search_box.type_text(query)
-            await asyncio.sleep(2)
-            await search_box.execute_script("""()=>{
-                // Create a new KeyboardEvent for Enter
-                var enterEvent = new KeyboardEvent('keydown', {
-                    key: 'Enter',
-                    code: 'Enter',
-                    keyCode: 13,
-                    which: 13,
-                    bubbles: true
-                });
-
-                // Dispatch the event on the currently focused element
-                document.activeElement.dispatchEvent(enterEvent);
-                            
-                } """)
-            await asyncio.sleep(3)
-            
+        if not USE_URL_FILTERS:
             await handle_pixabay_filter(tab)
-            
-            await asyncio.sleep(3)
 
-            images = await tab.query('div[class^="results"] div[class^="verticalMasonry"] script[type="application/ld+json"]',find_all=True)
-            suggestion_embedding = model.encode(query)
-            selected_image = None
-            best_score = -1
-            
-            for image in images:
-                # print(image)
-                image_data = await image.inner_html
-                soup = BeautifulSoup(image_data,features="html.parser")
-                image_str_obj = soup.find('script').text
-                image_object = json.loads(image_str_obj)
-                image_embedding = model.encode(image_object["name"])
-                similarity = util.cos_sim(suggestion_embedding, image_embedding).item()
-                print(f"Suggestion: '{"mountain peak silhouette"}' | Image: {image_object['contentUrl']} | Score: {similarity:.3f}")
-                if similarity > best_score:
-                    best_score = similarity
-                    selected_image = image_object
-                
-            print("\n=== BEST MATCH ===")
-            print(f"selected Image a tag href {selected_image['acquireLicensePage']}")
-            print(f"Selected Image: {selected_image['contentUrl']} with score {best_score:.3f}")
-            
-            await asyncio.sleep(3)
-            
-            await (await tab.query(f'a[href="{selected_image['acquireLicensePage']}"]')).click()
-            
-            await asyncio.sleep(3)
-            
-            await (await tab.query('button[class^="fullWidthTrigger"]')).click()
+        # pydoll's query(timeout=...) polls until the element shows up
+        images = await waits.step("results", tab.query(RESULTS_SELECTOR, timeout=STEP_TIMEOUT, find_all=True), timeout=STEP_TIMEOUT + 1)
+        image_objects = []
+        
+        for image in images:
+            # print(image)
+            image_data = await image.inner_html
+            soup = BeautifulSoup(image_data,features="html.parser")
+            image_str_obj = soup.find('script').text
+            image_objects.append(json.loads(image_str_obj))
+        
+        # score every result in one batched pass instead of one encode per image
+        [matches] = matcher.top_k([query], image_objects, k=len(image_objects))
+        for image_object, similarity in matches:
+            print(f"Suggestion: '{query}' | Image: {image_object['contentUrl']} | Score: {similarity:.3f}")
+        selected_image, best_score = matches[0]
             
-            # div[class="container--YKYLB container--gwuMt fullWidthContainer--a8QAe"] > div > div > div > div > label:last-child
-            # div[class^="container--YK"] > div > div > div > div > label:last-child
-            await (await tab.query('div[class^="container--YK"] > div > div > div > div > label:last-child')).click()
-            # .buttons--cqw3Y > a:first-of-type
-            # await asyncio.sleep(20)
-            current_dir = os.path.join(os.getcwd(),'image_downloads')
+        print("\n=== BEST MATCH ===")
+        print(f"selected Image a tag href {selected_image['acquireLicensePage']}")
+        print(f"Selected Image: {selected_image['contentUrl']} with score {best_score:.3f}")
+        
+        # photo already in the asset store (e.g. used in another video): link it, skip the download flow
+        stored = store.get_by_url(selected_image['contentUrl'])
+        if stored:
+            store.assign(stored, PROJECT, index, query=query, url=selected_image['contentUrl'])
+            store.link(stored, Path(os.getcwd()) / "images" / f"{index}.jpg")
+            return {"id": index, "query": query, "image": selected_image, "score": best_score}
+
+        await click_when_ready(tab, "license_link", f'a[href="{selected_image['acquireLicensePage']}"]')
+        
+        await click_when_ready(tab, "size_trigger", 'button[class^="fullWidthTrigger"]')
+        
+        # div[class="container--YKYLB container--gwuMt fullWidthContainer--a8QAe"] > div > div > div > div > label:last-child
+        # div[class^="container--YK"] > div > div > div > div > label:last-child
+        await click_when_ready(tab, "size_option", 'div[class^="container--YK"] > div > div > div > div > label:last-child')
+        # .buttons--cqw3Y > a:first-of-type
+        # await asyncio.sleep(20)
+        # one download folder per segment so concurrent tabs never mix files
+        current_dir = os.path.join(os.getcwd(),'image_downloads',index)
+        os.makedirs(current_dir, exist_ok=True)
+        
+        try:
+            async with tab.expect_download(keep_file_at=current_dir,timeout=15) as dl:
+                await click_when_ready(tab, "download_button", '.buttons--cqw3Y > a:first-of-type')
+                data = await dl.read_bytes()
+                print('Saved at:', dl.file_path)
             
-            try:
-                async with tab.expect_download(keep_file_at=current_dir,timeout=15) as dl:
-                    await (await tab.query('.buttons--cqw3Y > a:first-of-type')).click()
-                    data = await dl.read_bytes()
-                    print('Saved at:', dl.file_path)
-                
-            except Exception as e:
-                print(e)
-            handle_image(index=index)
-            # await asyncio.sleep(2000)
+        except Exception as e:
+            print(e)
+        handle_image(index=index, query=query, url=selected_image['contentUrl'])
+        return {"id": index, "query": query, "image": selected_image, "score": best_score}
     except Exception as e:
-        #  handle browser level error
+        #  handle tab level error
         print(e)
+        return {"id": index, "query": query, "image": selected_image, "score": best_score, "error": str(e)}
+
+
+async def run_segments(segments:list, concurrency:int = 3):
+    """Process segments concurrently in tabs of one long-lived Chrome.
+
+    At most ``concurrency`` tabs are open at a time. Results are yielded per
+    segment as soon as each one finishes, not in input order.
+    """
+    options = Options()
     
+    # options.binary_location = r'C:\Program Files\Google\Chrome\Application\chrome.exe'
+    # Use existing profile
+    # user_data_dir = r"C:\Users\admin\AppData\Local\Google\Chrome\User Data"
+    # options.add_argument(f"--user-data-dir={user_data_dir}")
+    options.add_argument("--profile-directory=Default")  # Use default profile
+
+    semaphore = asyncio.BoundedSemaphore(concurrency)
+
+    async with Chrome(options=options) as browser:
+        await browser.start()
+
+        async def worker(segment:dict):
+            async with semaphore:
+                tab = await browser.new_tab()
+                try:
+                    return await process_segment(
+                        tab, query=segment['image_suggestion'][0], index=str(segment['id'])
+                    )
+                finally:
+                    await tab.close()
+
+        tasks = [asyncio.create_task(worker(segment)) for segment in segments]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def main(segments:list, concurrency:int = 3):
+    async for result in run_segments(segments, concurrency=concurrency):
+        if result['image']:
+            print(f"Segment {result['id']} done: {result['image']['contentUrl']} ({result['score']:.3f})")
+        else:
+            print(f"Segment {result['id']} failed: {result.get('error')}")
+    print(waits.report())
+
+
+async def click_when_ready(tab:Tab, name:str, selector:str):
+    element = await waits.step(name, tab.query(selector, timeout=STEP_TIMEOUT), timeout=STEP_TIMEOUT + 1)
+    await element.click()
 
 
 async def handle_pixabay_filter(tab:Tab):
     try:
+        # each dropdown item only exists once its trigger is open, so waiting
+        # for the next selector replaces the fixed sleeps between clicks
         # photo => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="triggerWrapper"] > button
-        await(await tab.query('div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="triggerWrapper"] > button')).click()
-        await asyncio.sleep(2)
+        await click_when_ready(tab, "photo_trigger", 'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="triggerWrapper"] > button')
             # dropdown photo click => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)
-        await(await tab.query('div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)')).click()
-        await asyncio.sleep(2)           
+        await click_when_ready(tab, "photo_option", 'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)')
         # horizontal => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="triggerWrapper"] >button
-        await(await tab.query('div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="triggerWrapper"] >button')).click()
-        await asyncio.sleep(2)         
+        await click_when_ready(tab, "orientation_trigger", 'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="triggerWrapper"] >button')
         # div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)
-        await(await tab.query('div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)')).click()
-        await asyncio.sleep(2)         
+        await click_when_ready(tab, "orientation_option", 'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)')
         # authencity => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="triggerWrapper"] >button
-        await(await tab.query('div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="triggerWrapper"] >button')).click()
-        await asyncio.sleep(2)           
+        await click_when_ready(tab, "authenticity_trigger", 'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="triggerWrapper"] >button')
         # div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)
-        await(await tab.query('div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)')).click()
-        await asyncio.sleep(2)
+        await click_when_ready(tab, "authenticity_option", 'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)')
     except Exception as e:
         print(e)
 
@@ -157,5 +184,4 @@ if __name__ == "__main__":
         transcription = json.load(f)
     segments = transcription['segments']
     
-    for segement in segments:
-        asyncio.run(main(query=segement['image_suggestion'][0],index=str(segement['id'])))
\ No newline at end of file
+    asyncio.run(main(segments, concurrency=3))
\ No newline at end of file
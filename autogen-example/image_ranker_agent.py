@@ -2,17 +2,17 @@ from __future__ import annotations
 from autogen_agentchat.agents import AssistantAgent
 import copy
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client
 import asyncio
-import json
 from pathlib import Path
 from typing import Any
 from typing import List
 from pydantic import BaseModel
+from autogen_course.prompt_compaction import CandidateTable
 
 
 class RankedImage(BaseModel):
-    url: str
+    id: int
     score: float
 
 
@@ -23,19 +23,7 @@ class ImageSuggestion(BaseModel):
 
 async def main():
     # setup model client
-    client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        response_format=ImageSuggestion,
-        model_info={
-            "vision": False,
-            "function_calling": True,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    client = get_client(name="image_ranker", response_format=ImageSuggestion)
     # call the assistant agent
     image_ranker = AssistantAgent(
         name="image_raker",
@@ -55,9 +43,9 @@ async def main():
             "{\n"
             '  "image_suggestion": "<repeat the keyword>",\n'
             '  "ranked_images": [\n'
-            '    {"url": "<url>", "score": <float>},\n'
-            '    {"url": "<url>", "score": <float>},\n'
-            '    {"url": "<url>", "score": <float>}\n'
+            '    {"id": <image id>, "score": <float>},\n'
+            '    {"id": <image id>, "score": <float>},\n'
+            '    {"id": <image id>, "score": <float>}\n'
             "  ]\n"
             "}\n"
         ),
@@ -196,10 +184,13 @@ async def main():
             "name": "Free Child Nature illustration and picture",
         },
     ]
-    #  now send prompt
+    #  now send prompt (ids + cleaned names instead of the raw JSON with URLs)
+    table = CandidateTable(images)
+    table.report(keyword)
     input_prompt = f"""
     Keyword: "{keyword}"
-    Images: {json.dumps(images, indent=2)}
+    Images:
+    {table.render()}
     """
 
     print(input_prompt)
@@ -209,5 +200,9 @@ async def main():
 
     print("Response: ", response.messages[-1])
 
+    result = ImageSuggestion.model_validate_json(response.messages[-1].to_text())
+    for img in result.ranked_images:
+        print(f"{img.score:.1f}  {table.url(img.id)}")
+
 
 asyncio.run(main())
@@ -1,10 +1,10 @@
 from __future__ import annotations
 from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client, report, close_all
+from autogen_core.models import SystemMessage, UserMessage
 import asyncio
 import json
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field, validator
 import logging
 from pathlib import Path
@@ -15,6 +15,10 @@ from tenacity import (
     retry_if_exception_type,
 )
 import re
+from candidate_shortlist import EmbeddingShortlister
+from json_stream import JsonItemStream
+from autogen_course.structured_output import StructuredOutput, json_schema_format, metrics
+from autogen_course.prompt_compaction import CandidateTable, stats as compaction_stats
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -40,20 +44,44 @@ class ImageMetadata(BaseModel):
     name: str
 
 
+class BatchRankedImage(BaseModel):
+    id: int = Field(..., description="Image id from the shared image table")
+    score: float = Field(
+        ..., ge=1.0, le=10.0, description="Relevance score between 1.0 and 10.0"
+    )
+
+
+class IdRanking(BaseModel):
+    """What the model returns for one keyword; ids are mapped back to URLs"""
+
+    image_keyword: str = Field(..., description="The search keyword")
+    ranked_images: List[BatchRankedImage] = Field(
+        ..., min_items=3, max_items=3, description="Exactly 3 ranked image ids"
+    )
+
+
+class KeywordRanking(BaseModel):
+    keyword_id: int = Field(..., description="Keyword number from the prompt")
+    image_keyword: str = Field(..., description="The search keyword")
+    ranked_images: List[BatchRankedImage]
+
+
+class BatchRanking(BaseModel):
+    rankings: List[KeywordRanking]
+
+
 class ImageRanker:
-    def __init__(self):
-        self.client = OpenAIChatCompletionClient(
-            model="gemma-3-1b-it-GGUF",
-            base_url="http://localhost:8080/v1",
-            api_key="placeholder",
-            response_format=ImageSuggestion,
-            model_info={
-                "vision": False,
-                "function_calling": True,
-                "json_output": True,
-                "family": "",
-                "structured_output": True,
-            },
+    def __init__(self, shortlister=None):
+        # Optional pre-ranking stage (e.g. EmbeddingShortlister) that cuts the
+        # candidate list down before it is written into the prompt.
+        self.shortlister = shortlister
+        # the schema goes to the server as a JSON-schema grammar; replies that
+        # still come back truncated are repaired locally before any re-ask
+        self.structured = StructuredOutput(IdRanking)
+        self.batch_structured = StructuredOutput(BatchRanking)
+        # replies the parser rejects are never cached, so a re-ask reaches the server
+        self.client = get_client(
+            name="image_ranker", response_format=json_schema_format(IdRanking), validate=self.structured.check
         )
 
         self.image_ranker = AssistantAgent(
@@ -64,6 +92,15 @@ class ImageRanker:
             system_message=self._get_system_message(),
         )
 
+        # Batch mode talks to the client directly so no chat history piles up
+        # between completions. A keyword re-sent alone can repeat the exact
+        # prompt of a parseable but useless reply, so later rounds skip the cache.
+        batch_format = json_schema_format(BatchRanking)
+        self.batch_client = get_client(
+            name="image_ranker_batch", response_format=batch_format, validate=self.batch_structured.check
+        )
+        self.batch_retry_client = get_client(name="image_ranker_batch", response_format=batch_format, cache=False)
+
     def _get_system_message(self) -> str:
         return (
             "You are an image relevance ranking agent.\n"
@@ -79,17 +116,18 @@ class ImageRanker:
             "{\n"
             '  "image_keyword": "exact keyword string",\n'
             '  "ranked_images": [\n'
-            '    {"url": "image_url_1", "score": 9.5},\n'
-            '    {"url": "image_url_2", "score": 8.2},\n'
-            '    {"url": "image_url_3", "score": 7.1}\n'
+            '    {"id": 4, "score": 9.5},\n'
+            '    {"id": 0, "score": 8.2},\n'
+            '    {"id": 7, "score": 7.1}\n'
             "  ]\n"
             "}\n"
+            "   where each id comes from the image table in the prompt.\n"
             "7. If you cannot find 3 suitable images, prioritize the most relevant ones anyway.\n"
             "8. NEVER include images that don't match the keyword requirements.\n"
         )
 
     def _prefilter_images(self, images: List[dict], keyword: str) -> List[dict]:
-        """Pre-filter images to remove obviously irrelevant ones"""
+        """Pre-filter images to remove obviously irrelevant ones, then shortlist"""
         filtered = []
         keyword_lower = keyword.lower()
 
@@ -123,12 +161,14 @@ class ImageRanker:
 
             filtered.append(img)
 
-        return filtered or images  # Return original if filtering removes everything
+        filtered = filtered or images  # Return original if filtering removes everything
 
-    def _create_prompt(self, keyword: str, images: List[dict]) -> str:
-        """Create a structured prompt for the AI"""
-        filtered_images = self._prefilter_images(images, keyword)
+        if self.shortlister is not None:
+            filtered = self.shortlister.shortlist(keyword, filtered)
+        return filtered
 
+    def _create_prompt(self, keyword: str, table: CandidateTable) -> str:
+        """Create a structured prompt for the AI from the pre-filtered image table"""
         return f"""
         KEYWORD ANALYSIS:
         Keyword: "{keyword}"
@@ -137,8 +177,8 @@ class ImageRanker:
         - Avoid: AI-generated, non-human, irrelevant subjects
         
         IMAGE DATASET:
-        Here are {len(filtered_images)} potentially relevant images:
-        {json.dumps(filtered_images, indent=2)}
+        Here are {len(table.images)} potentially relevant images (id, name):
+        {table.render()}
         
         INSTRUCTIONS:
         1. Select EXACTLY 3 most relevant images
@@ -152,45 +192,218 @@ class ImageRanker:
         {{
           "image_keyword": "{keyword}",
           "ranked_images": [
-            {{"url": "url1", "score": 9.5}},
-            {{"url": "url2", "score": 8.2}},
-            {{"url": "url3", "score": 7.1}}
+            {{"id": 4, "score": 9.5}},
+            {{"id": 0, "score": 8.2}},
+            {{"id": 7, "score": 7.1}}
           ]
         }}
         """
 
+    def _get_batch_system_message(self) -> str:
+        return (
+            "You are an image relevance ranking agent.\n"
+            "You receive ONE shared image table and SEVERAL numbered keywords. "
+            "Each keyword lists the image ids it may choose from.\n\n"
+            "STRICT RULES:\n"
+            "1. IGNORE AI-generated, non-human, and irrelevant images unless the keyword explicitly asks for them.\n"
+            "2. For EVERY keyword return EXACTLY 3 image ids taken from that keyword's candidate ids.\n"
+            "3. Assign each image a distinct score between 1.0 (lowest) and 10.0 (highest).\n"
+            "4. Output MUST be valid JSON in this exact format:\n"
+            "{\n"
+            '  "rankings": [\n'
+            '    {"keyword_id": 1, "image_keyword": "exact keyword string",\n'
+            '     "ranked_images": [{"id": 4, "score": 9.5}, {"id": 0, "score": 8.2}, {"id": 7, "score": 7.1}]}\n'
+            "  ]\n"
+            "}\n"
+        )
+
+    def _build_candidate_table(
+        self, keywords: List[str], candidates: Dict[str, List[dict]]
+    ) -> Tuple[Dict[str, int], Dict[int, dict]]:
+        """Deduplicate the candidates of several keywords into one id table"""
+        url_to_id: Dict[str, int] = {}
+        id_to_image: Dict[int, dict] = {}
+        for keyword in keywords:
+            for img in candidates[keyword]:
+                url = img.get("contentUrl", "")
+                if url and url not in url_to_id:
+                    url_to_id[url] = len(url_to_id)
+                    id_to_image[url_to_id[url]] = img
+        return url_to_id, id_to_image
+
+    def _create_batch_prompt(
+        self,
+        keywords: List[str],
+        candidates: Dict[str, List[dict]],
+        url_to_id: Dict[str, int],
+        id_to_image: Dict[int, dict],
+    ) -> str:
+        """Create one prompt that ranks several keywords against a shared table"""
+        # ids are assigned in insertion order, so a positional table matches them
+        table = CandidateTable(list(id_to_image.values()))
+        table.report(f"batch of {len(keywords)} keywords")
+        keyword_lines = []
+        for number, keyword in enumerate(keywords, start=1):
+            ids = sorted({url_to_id[img["contentUrl"]] for img in candidates[keyword]})
+            allowed = "all" if len(ids) == len(id_to_image) else ", ".join(map(str, ids))
+            keyword_lines.append(f'{number}. "{keyword}" -> candidates: {allowed}')
+
+        return (
+            f"IMAGE TABLE ({len(id_to_image)} images):\n{table.render()}\n\n"
+            f"KEYWORDS ({len(keywords)}):\n" + "\n".join(keyword_lines) + "\n\n"
+            "Return one entry in \"rankings\" per keyword, using its keyword_id."
+        )
+
+    def _parse_batch_response(
+        self,
+        content: str,
+        keywords: List[str],
+        candidates: Dict[str, List[dict]],
+        url_to_id: Dict[str, int],
+        id_to_image: Dict[int, dict],
+    ) -> Dict[str, ImageSuggestion]:
+        """Map a batch answer back to validated ImageSuggestion objects.
+
+        Keywords whose entry is missing or invalid are left out so the caller
+        can retry just those.
+        """
+        try:
+            batch = self.batch_structured.parse(content)
+        except ValueError as e:
+            logger.warning(f"Batch response could not be parsed: {e}")
+            return {}
+
+        results: Dict[str, ImageSuggestion] = {}
+        for ranking in batch.rankings:
+            if not 1 <= ranking.keyword_id <= len(keywords):
+                continue
+            keyword = keywords[ranking.keyword_id - 1]
+            allowed = {url_to_id[img["contentUrl"]] for img in candidates[keyword]}
+
+            ranked, seen = [], set()
+            for item in ranking.ranked_images:
+                if item.id in allowed and item.id not in seen:
+                    seen.add(item.id)
+                    ranked.append(
+                        RankedImage(url=id_to_image[item.id]["contentUrl"], score=item.score)
+                    )
+            try:
+                results[keyword] = ImageSuggestion(
+                    image_keyword=keyword, ranked_images=ranked
+                )
+            except ValueError as e:
+                logger.warning(f"Invalid ranking for keyword '{keyword}': {e}")
+        return results
+
+    async def rank_images_batch(
+        self,
+        requests: List[Tuple[str, List[dict]]],
+        batch_size: int = 10,
+        max_rounds: int = 2,
+    ) -> Dict[str, ImageSuggestion]:
+        """Rank many (keyword, images) pairs with as few completions as possible.
+
+        Keywords are grouped ``batch_size`` at a time and every group shares one
+        deduplicated image table. Keywords that come back missing or invalid are
+        re-sent in the next round. Keywords left with no candidates after
+        pre-filtering are logged and missing from the result (an
+        ImageSuggestion needs exactly 3 images).
+        """
+        candidates: Dict[str, List[dict]] = {}
+        for keyword, images in requests:
+            merged = candidates.setdefault(keyword, [])
+            known = {img.get("contentUrl") for img in merged}
+            merged.extend(
+                img
+                for img in self._prefilter_images(images, keyword)
+                if img.get("contentUrl") and img.get("contentUrl") not in known
+            )
+
+        results: Dict[str, ImageSuggestion] = {}
+        pending = [keyword for keyword in candidates if candidates[keyword]]
+        empty = [keyword for keyword in candidates if not candidates[keyword]]
+        if empty:
+            logger.warning(f"No candidate images left after pre-filtering, not ranked: {empty}")
+        for round_number in range(1, max_rounds + 1):
+            if not pending:
+                break
+            for start in range(0, len(pending), batch_size):
+                keywords = pending[start : start + batch_size]
+                url_to_id, id_to_image = self._build_candidate_table(keywords, candidates)
+                prompt = self._create_batch_prompt(
+                    keywords, candidates, url_to_id, id_to_image
+                )
+                logger.info(
+                    f"Round {round_number}: ranking {len(keywords)} keywords "
+                    f"against {len(id_to_image)} shared images"
+                )
+                client = self.batch_client if round_number == 1 else self.batch_retry_client
+                response = await client.create(
+                    [
+                        SystemMessage(content=self._get_batch_system_message()),
+                        UserMessage(content=prompt, source="user"),
+                    ]
+                )
+                ranked = self._parse_batch_response(
+                    str(response.content),
+                    keywords,
+                    candidates,
+                    url_to_id,
+                    id_to_image,
+                )
+                results.update(ranked)
+            pending = [keyword for keyword in pending if keyword not in results]
+
+        if pending:
+            raise ValueError(f"Failed to rank images for keywords: {pending}")
+        return results
+
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
+        wait=wait_exponential(multiplier=0.5, min=0.5, max=2),
         retry=retry_if_exception_type((ValueError, json.JSONDecodeError)),
+        before_sleep=metrics.record_retry,
         reraise=True,
     )
     async def rank_images(self, keyword: str, images: List[dict]):
         """Rank images with retry mechanism and validation"""
-        prompt = self._create_prompt(keyword, images)
+        filtered_images = self._prefilter_images(images, keyword)
+        table = CandidateTable(filtered_images)
+        table.report(keyword)
+        prompt = self._create_prompt(keyword, table)
 
         logger.info(f"Ranking images for keyword: {keyword}")
         logger.info(
-            f"Using {len(images)} total images ({len(self._prefilter_images(images, keyword))} after pre-filtering)"
+            f"Using {len(images)} total images ({len(filtered_images)} after pre-filtering)"
         )
 
         try:
-            response = await Console(self.image_ranker.run_stream(task=prompt))
-            last_message = response.messages[-1].to_text()
-
-            # Extract JSON from response
-            json_str = json.loads(last_message)
+            # ranked images are logged as soon as each one is streamed; a
+            # malformed stream aborts the completion instead of finishing it
+            parser = JsonItemStream(keys=("ranked_images",))
+            async for _, ranked in parser.consume(self.image_ranker.run_stream(task=prompt)):
+                logger.info(f"Ranked image: {ranked.get('id')} ({ranked.get('score')})")
+
+            # Parse and validate (repairing a truncated reply if needed), then
+            # map the ids back to URLs; an unknown id raises ValueError and retries
+            reply = parser.result.messages[-1].to_text()
+            ranking = self.structured.parse(reply)
+            result = ImageSuggestion(
+                image_keyword=keyword,
+                ranked_images=[
+                    RankedImage(url=table.url(item.id), score=item.score)
+                    for item in ranking.ranked_images
+                ],
+            )
             path = Path("output_suggestion_url.json")
             with path.open("w", encoding="utf-8") as f:
-                json.dump(json_str, f, ensure_ascii=False, indent=2)
-
-            # Parse and validate
+                json.dump(result.model_dump(), f, ensure_ascii=False, indent=2)
 
             # Additional validation
             # self._validate_result(result, images)
 
-            # logger.info(f"Successfully ranked 3 images with scores: {[img.score for img in result.ranked_images]}")
-            # return result
+            logger.info(f"Successfully ranked 3 images with scores: {[img.score for img in result.ranked_images]}")
+            return result
 
         except Exception as e:
             logger.error(f"Failed to rank images: {e}")
@@ -198,7 +411,7 @@ class ImageRanker:
 
 
 async def main():
-    ranker = ImageRanker()
+    ranker = ImageRanker(shortlister=EmbeddingShortlister(top_k=20))
 
     keyword = "close-up of Alex's face showing doubt"
 
@@ -607,5 +820,11 @@ async def main():
 
     await ranker.rank_images(keyword, images)
 
+    print(report())
+    print(metrics.report())
+    print(compaction_stats.summary())
+    await close_all()
+
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,15 +1,16 @@
 from __future__ import annotations
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client
 import asyncio
 import json
 from typing import List
 from pydantic import BaseModel
+from autogen_course.prompt_compaction import CandidateTable
 
 
 class RankedImage(BaseModel):
-    url: str
+    id: int
     score: float
 
 
@@ -20,19 +21,7 @@ class ImageSuggestion(BaseModel):
 
 async def main():
     # setup model client
-    client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        response_format=ImageSuggestion,
-        model_info={
-            "vision": False,
-            "function_calling": True,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    client = get_client(name="image_ranker", response_format=ImageSuggestion)
     
     # call the assistant agent
     image_ranker = AssistantAgent(
@@ -54,12 +43,12 @@ async def main():
             "{\n"
             '  "image_keyword": "exact keyword string",\n'
             '  "ranked_images": [\n'
-            '    {"url": "EXACT_ORIGINAL_URL_1", "score": 9.5},\n'
-            '    {"url": "EXACT_ORIGINAL_URL_2", "score": 8.2},\n'
-            '    {"url": "EXACT_ORIGINAL_URL_3", "score": 7.1}\n'
+            '    {"id": <image id>, "score": 9.5},\n'
+            '    {"id": <image id>, "score": 8.2},\n'
+            '    {"id": <image id>, "score": 7.1}\n'
             "  ]\n"
             "}\n"
-            "7. CRITICAL: Return the EXACT URL strings as provided in the input. DO NOT modify, shorten, or change URLs in any way.\n"
+            "7. CRITICAL: Refer to images only by the integer id from the first column of the table.\n"
             "8. If you cannot find 3 suitable images, prioritize the most relevant ones anyway.\n"
             "9. NEVER include images that don't match the keyword requirements.\n"
         ),
@@ -200,17 +189,19 @@ async def main():
         },
     ]
     
-    # Create input prompt with explicit URL preservation instructions
+    # Send ids + cleaned names; the model never has to copy a URL
+    table = CandidateTable(images)
+    table.report(keyword)
     input_prompt = f"""
     KEYWORD: "{keyword}"
     
-    IMAGE DATASET:
-    {json.dumps(images, indent=2)}
+    IMAGE DATASET (id, name):
+    {table.render()}
     
     CRITICAL INSTRUCTIONS:
     1. Select EXACTLY 3 most relevant images for the keyword
-    2. Return the EXACT URL strings as provided - DO NOT modify URLs in any way
-    3. URLs must match exactly what's in the input dataset
+    2. Return each image's id exactly as listed in the table
+    3. Ids must be ones that appear in the table
     4. Rank from most relevant (highest score) to least relevant (lowest score)
     5. Output must be valid JSON in the specified format
     
@@ -218,9 +209,9 @@ async def main():
     {{
       "image_keyword": "{keyword}",
       "ranked_images": [
-        {{"url": "EXACT_ORIGINAL_URL_HERE", "score": 9.5}},
-        {{"url": "EXACT_ORIGINAL_URL_HERE", "score": 8.2}},
-        {{"url": "EXACT_ORIGINAL_URL_HERE", "score": 7.1}}
+        {{"id": <image id>, "score": 9.5}},
+        {{"id": <image id>, "score": 8.2}},
+        {{"id": <image id>, "score": 7.1}}
       ]
     }}
     """
@@ -243,8 +234,8 @@ async def main():
         
         # Simple display of results
         try:
-            if hasattr(last_message, 'content') and last_message.content:
-                content = last_message.content
+            content = json.loads(last_message)
+            if content:
                 if isinstance(content, dict):
                     # Handle structured response
                     result = ImageSuggestion(**content)
@@ -252,7 +243,7 @@ async def main():
                     print("Top 3 Images:")
                     for i, img in enumerate(result.ranked_images, 1):
                         print(f"{i}. Score: {img.score:.1f}")
-                        print(f"   URL: {img.url}")
+                        print(f"   URL: {table.url(img.id)}")
                         print()
                 else:
                     # Handle text response
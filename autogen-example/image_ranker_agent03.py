@@ -1,15 +1,16 @@
 from __future__ import annotations
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client
 import asyncio
 import json
 from typing import List
 from pydantic import BaseModel
+from autogen_course.prompt_compaction import CandidateTable
 
 
 class RankedImage(BaseModel):
-    url: str
+    id: int
     score: float
 
 
@@ -20,19 +21,7 @@ class ImageSuggestion(BaseModel):
 
 async def main():
     # setup model client
-    client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        response_format=ImageSuggestion,
-        model_info={
-            "vision": False,
-            "function_calling": True,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    client = get_client(name="image_ranker", response_format=ImageSuggestion)
     
     # call the assistant agent
     image_ranker = AssistantAgent(
@@ -55,14 +44,14 @@ async def main():
             "1. Use your intelligence to assign meaningful, nuanced scores that reflect true relevance\n"
             "2. Consider multiple factors: subject match, expression, framing, composition, and overall fit\n"
             "3. Scores should be distinct and reflect a clear ranking hierarchy\n"
-            "4. Return EXACTLY 3 images with EXACT original URLs - no modifications\n"
+            "4. Return EXACTLY 3 images, referring to each by its id from the table\n"
             "5. Output MUST be valid JSON in this exact format:\n"
             "{\n"
             '  "image_keyword": "keyword",\n'
             '  "ranked_images": [\n'
-            '    {"url": "EXACT_URL", "score": 9.8},\n'
-            '    {"url": "EXACT_URL", "score": 8.5},\n'
-            '    {"url": "EXACT_URL", "score": 7.2}\n'
+            '    {"id": <image id>, "score": 9.8},\n'
+            '    {"id": <image id>, "score": 8.5},\n'
+            '    {"id": <image id>, "score": 7.2}\n'
             "  ]\n"
             "}\n"
         ),
@@ -204,6 +193,8 @@ async def main():
     ]
     
     # Create input prompt that encourages intelligent scoring
+    table = CandidateTable(images)
+    table.report(keyword)
     input_prompt = f"""
     KEYWORD ANALYSIS:
     "{keyword}"
@@ -211,15 +202,15 @@ async def main():
     - Desired: natural lighting, clear facial features, authentic emotion
     - Context: Likely for a story about uncertainty, decision-making, or introspection
     
-    IMAGE DATASET:
-    {json.dumps(images, indent=2)}
+    IMAGE DATASET (id, name):
+    {table.render()}
     
     YOUR TASK:
     Use your visual understanding intelligence to:
     1. Analyze each image's metadata for relevance to the keyword
     2. Consider: facial expression, framing (close-up), subject appropriateness
     3. Assign nuanced scores that reflect true visual relevance (9.0-10.0 = perfect, 1.0-3.9 = poor)
-    4. Return EXACTLY 3 best matches with EXACT original URLs
+    4. Return EXACTLY 3 best matches by their table ids
     5. Provide meaningful score differentiation based on intelligent assessment
     
     THINK STEP BY STEP:
@@ -232,9 +223,9 @@ async def main():
     {{
       "image_keyword": "{keyword}",
       "ranked_images": [
-        {{"url": "EXACT_ORIGINAL_URL_HERE", "score": 9.8}},
-        {{"url": "EXACT_ORIGINAL_URL_HERE", "score": 8.3}},
-        {{"url": "EXACT_ORIGINAL_URL_HERE", "score": 7.1}}
+        {{"id": <image id>, "score": 9.8}},
+        {{"id": <image id>, "score": 8.3}},
+        {{"id": <image id>, "score": 7.1}}
       ]
     }}
     """
@@ -255,8 +246,8 @@ async def main():
         last_message = response.messages[-1].to_text()
         
         try:
-            if hasattr(last_message, 'content') and last_message.content:
-                content = last_message.content
+            content = json.loads(last_message)
+            if content:
                 if isinstance(content, dict):
                     # Handle structured response
                     result = ImageSuggestion(**content)
@@ -267,7 +258,7 @@ async def main():
                     for i, img in enumerate(result.ranked_images, 1):
                         score_emoji = "🎯" if img.score >= 9.0 else "⭐" if img.score >= 7.0 else "✅"
                         print(f"{i}. {score_emoji} Score: {img.score:.1f}/10.0")
-                        print(f"   📷 URL: {img.url}")
+                        print(f"   📷 URL: {table.url(img.id)}")
                         print()
                         
                     # Show score analysis
@@ -1,15 +1,16 @@
 from __future__ import annotations
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client
 import asyncio
 import json
 from typing import List
 from pydantic import BaseModel
+from autogen_course.prompt_compaction import CandidateTable
 
 
 class RankedImage(BaseModel):
-    url: str
+    id: int
     score: float
 
 
@@ -20,19 +21,7 @@ class ImageSuggestion(BaseModel):
 
 async def main():
     # setup model client
-    client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        response_format=ImageSuggestion,
-        model_info={
-            "vision": False,
-            "function_calling": True,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    client = get_client(name="image_director", response_format=ImageSuggestion)
 
     # call the assistant agent
     image_ranker = AssistantAgent(
@@ -221,6 +210,8 @@ async def main():
     ]
 
     # Professional director's brief
+    table = CandidateTable(images)
+    table.report(keyword)
     input_prompt = f"""
     🎬 DIRECTOR'S BRIEF - PROFESSIONAL IMAGE SELECTION
     
@@ -230,8 +221,8 @@ async def main():
     SPECIFIC SHOT REQUIREMENT:
     "{keyword}"
     
-    IMAGE DATASET FOR CONSIDERATION:
-    {json.dumps(images, indent=2)}
+    IMAGE DATASET FOR CONSIDERATION (id, name):
+    {table.render()}
     
     🎯 YOUR ROLE AS DIRECTOR:
     You are selecting the perfect reference image for this crucial scene. Consider:
@@ -255,9 +246,9 @@ async def main():
     {{
       "image_keyword": "{keyword}",
       "ranked_images": [
-        {{"url": "EXACT_URL", "score": 9.8}},
-        {{"url": "EXACT_URL", "score": 8.7}},
-        {{"url": "EXACT_URL", "score": 7.9}}
+        {{"id": <image id>, "score": 9.8}},
+        {{"id": <image id>, "score": 8.7}},
+        {{"id": <image id>, "score": 7.9}}
       ]
     }}
     
@@ -278,11 +269,11 @@ async def main():
     print("=" * 80)
 
     if response.messages:
-        last_message = response.messages[-1]
+        last_message = response.messages[-1].to_text()
 
         try:
-            if hasattr(last_message, "content") and last_message.content:
-                content = last_message.content
+            content = json.loads(last_message)
+            if content:
                 if isinstance(content, dict):
                     result = ImageSuggestion(**content)
 
@@ -308,7 +299,7 @@ async def main():
                             emoji = "📦"
 
                         print(f"{i}. {emoji} {rating} - Score: {img.score:.1f}/10.0")
-                        print(f"   📷 Reference URL: {img.url}")
+                        print(f"   📷 Reference URL: {table.url(img.id)}")
                         print(
                             f"   💡 Director's Note: Would work with {'minimal' if img.score > 8.0 else 'some'} lighting adjustments"
                         )
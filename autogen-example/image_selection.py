@@ -9,11 +9,12 @@
 # similarity = util.cos_sim(query_embedding, image_embedding)
 
 
-from sentence_transformers import SentenceTransformer, util
+from autogen_course.embedding_cache import EmbeddingCache
+from autogen_course.image_matcher import ImageMatcher
 import json
 
 # # ====== Load Model ======
-model = SentenceTransformer('all-MiniLM-L6-v2')
+model = EmbeddingCache('all-MiniLM-L6-v2')
 
 # # ====== Example Segment ======
 # segment = {
@@ -44,22 +45,17 @@ mock_images = [
 with open("input.json", "r", encoding="utf-8") as f:
     images = json.load(f)
 # # ====== Compute Similarity ======
-selected_image = None
-best_score = -1
+# One batched encode per side and a single suggestion x image matrix multiply
+matcher = ImageMatcher(model)
+suggestions = segment["image_suggestion"]
 
-for suggestion in segment["image_suggestion"]:
+for suggestion, matches in zip(suggestions, matcher.top_k(suggestions, images, k=3)):
     print(suggestion)
-    suggestion_embedding = model.encode(suggestion)
-
-    for image in images:
-        image_embedding = model.encode(image["name"])
-        similarity = util.cos_sim(suggestion_embedding, image_embedding).item()
-        
-        print(f"Suggestion: '{"mountain peak silhouette"}' | Image: {image['contentUrl']} | Score: {similarity:.3f}")
-        
-        if similarity > best_score:
-            best_score = similarity
-            selected_image = image
-
-    print("\n=== BEST MATCH ===")
-    print(f"Selected Image: {selected_image['contentUrl']} with score {best_score:.3f}")
+    for image, similarity in matches:
+        print(f"Suggestion: '{suggestion}' | Image: {image['contentUrl']} | Score: {similarity:.3f}")
+
+best_suggestion, selected_image, best_score = matcher.best(suggestions, images)
+
+print("\n=== BEST MATCH ===")
+print(f"Suggestion: '{best_suggestion}'")
+print(f"Selected Image: {selected_image['contentUrl']} with score {best_score:.3f}")
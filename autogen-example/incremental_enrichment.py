@@ -0,0 +1,137 @@
+# incremental_enrichment.py
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# timing/text fields come from the transcript itself and are never stored
+TRANSCRIPT_KEYS = ("id", "text", "start", "end", "duration")
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def segment_fingerprint(segment: Dict) -> str:
+    return _digest(segment["text"].strip(), f"{float(segment['duration']):.2f}")
+
+
+def enricher_signature(*parts: str) -> str:
+    """Digest of everything that shapes an enricher's output besides the
+    transcript: its name, system prompt and the fields it must return."""
+    return _digest(*parts)
+
+
+def context_digest(segments: List[Dict], index: int, radius: int = 0) -> str:
+    """Digest of the texts around a segment (a rolling window, not the whole story)"""
+    window = segments[max(0, index - radius): index] + segments[index + 1: index + 1 + radius]
+    return _digest(*(s["text"].strip() for s in window))
+
+
+class EnrichmentState:
+    """Per-segment enrichment results remembered between runs.
+
+    Each segment is keyed by the enricher ``signature`` and its own
+    fingerprint, so a one-line edit regenerates just that segment (its
+    neighbours still go into the prompt as context). With ``context_radius``
+    > 0 the key also covers that many segments on either side, and an edit
+    regenerates the neighbours whose story context moved as well. A state file written under another signature (a different enricher, or
+    an edited system prompt) is ignored. Changed segments are prompted with
+    ``neighbour_radius`` neighbours as read-only context, and the story arc
+    summary of the last full run stands in for the whole narrative.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        signature: str = "",
+        context_radius: int = 0,
+        neighbour_radius: int = 1,
+    ):
+        self.path = Path(path)
+        self.signature = signature
+        self.context_radius = context_radius
+        self.neighbour_radius = neighbour_radius
+        self.entries: Dict[str, Dict] = {}
+        self.story_arc_summary: Optional[Dict] = None
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("signature", "") == signature:
+                self.entries = data.get("entries", {})
+                self.story_arc_summary = data.get("story_arc_summary")
+            else:
+                logger.info(f"{self.path} was written by another enricher or prompt, starting fresh")
+
+    def _key(self, segments: List[Dict], index: int) -> str:
+        return ":".join(
+            (
+                self.signature,
+                segment_fingerprint(segments[index]),
+                context_digest(segments, index, self.context_radius),
+            )
+        )
+
+    def split(self, transcript: Dict) -> Tuple[Dict, List[Dict]]:
+        """Return ({segment id: stored fields}, [segments that need the model])"""
+        segments = transcript["segments"]
+        reused, changed = {}, []
+        for index, segment in enumerate(segments):
+            stored = self.entries.get(self._key(segments, index))
+            if stored is None:
+                changed.append(segment)
+            else:
+                reused[segment["id"]] = stored
+        return reused, changed
+
+    def neighbours(self, transcript: Dict, changed: List[Dict]) -> List[Dict]:
+        """Unchanged segments next to changed ones, sent as read-only context"""
+        segments = transcript["segments"]
+        changed_ids = {s["id"] for s in changed}
+        context = {}
+        for index, segment in enumerate(segments):
+            if segment["id"] not in changed_ids:
+                continue
+            for neighbour in segments[max(0, index - self.neighbour_radius): index + 1 + self.neighbour_radius]:
+                if neighbour["id"] not in changed_ids:
+                    context[neighbour["id"]] = {"id": neighbour["id"], "text": neighbour["text"]}
+        return list(context.values())
+
+    def record(self, enriched: Dict, segment_ids: List) -> None:
+        """Remember the enrichment of the given (model-generated) segments"""
+        segments = enriched["segments"]
+        wanted = set(segment_ids)
+        for index, segment in enumerate(segments):
+            if segment["id"] in wanted:
+                self.entries[self._key(segments, index)] = {
+                    k: v for k, v in segment.items() if k not in TRANSCRIPT_KEYS
+                }
+        if enriched.get("story_arc_summary"):
+            self.story_arc_summary = enriched["story_arc_summary"]
+        self.prune(segments)
+
+    def prune(self, segments: List[Dict]) -> int:
+        """Forget entries that match no segment of the current transcript"""
+        current = {self._key(segments, index) for index in range(len(segments))}
+        stale = [key for key in self.entries if key not in current]
+        for key in stale:
+            del self.entries[key]
+        return len(stale)
+
+    def save(self) -> None:
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "signature": self.signature,
+                    "entries": self.entries,
+                    "story_arc_summary": self.story_arc_summary,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,164 @@
+# json_stream.py
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+import json
+
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import ModelClientStreamingChunkEvent
+from autogen_core.models import CreateResult
+
+
+class MalformedStreamError(ValueError):
+    """The model output stopped looking like the JSON document we asked for"""
+
+
+class JsonItemStream:
+    """Incremental parser that emits array items as soon as they are complete.
+
+    Feed it the model output chunk by chunk; every object inside an array
+    stored under one of ``keys`` (e.g. ``segments`` or ``ranked_images``) is
+    decoded the moment its closing brace arrives. Anything before the first
+    ``{`` (a code fence, a short preamble) is skipped, anything after the
+    top-level value is ignored. Mismatched brackets or more than
+    ``max_prefix`` characters of prose raise ``MalformedStreamError`` straight
+    away instead of after the whole completion.
+    """
+
+    def __init__(self, keys: Iterable[str] = ("segments", "ranked_images"), max_prefix: int = 512):
+        self.keys = set(keys)
+        self.max_prefix = max_prefix
+        self.items: Dict[str, List[dict]] = {key: [] for key in self.keys}
+        self.result: Any = None  # TaskResult / CreateResult once consume() finishes
+
+        self._text: List[str] = []  # the top-level document, for document()
+        self._skipped = 0
+        self._started = False
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string: Optional[str] = None
+        self._after_colon_key: Optional[str] = None
+        # stack entries: (closing char, key of the array or None)
+        self._stack: List[Tuple[str, Optional[str]]] = []
+        self._item: Optional[List[str]] = None
+        self._item_key: Optional[str] = None
+        self._item_depth = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, dict]]:
+        """Consume one chunk and return the (key, item) pairs completed by it"""
+        ready = []
+        for char in chunk:
+            if self._done:
+                break
+            if not self._started:
+                if char not in "{[":
+                    self._skipped += 1
+                    if self._skipped > self.max_prefix:
+                        raise MalformedStreamError(f"no JSON after {self._skipped} characters")
+                    continue
+                self._started = True
+
+            self._text.append(char)
+            if self._item is not None:
+                self._item.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._string)
+                else:
+                    self._string.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string = []
+            elif char == ":":
+                self._after_colon_key = self._last_string
+            elif char in "{[":
+                array_key = self._after_colon_key if char == "[" else None
+                self._stack.append(("}" if char == "{" else "]", array_key))
+                if (
+                    char == "{"
+                    and self._item is None
+                    and len(self._stack) > 1
+                    and self._stack[-2][1] in self.keys
+                ):
+                    self._item = [char]
+                    self._item_key = self._stack[-2][1]
+                    self._item_depth = len(self._stack)
+                self._after_colon_key = None
+            elif char in "}]":
+                if not self._stack or self._stack[-1][0] != char:
+                    raise MalformedStreamError(f"unexpected '{char}' at offset {len(self._text)}")
+                if self._item is not None and len(self._stack) == self._item_depth:
+                    ready.append(self._emit())
+                self._stack.pop()
+                if not self._stack:
+                    self._done = True
+            elif char == ",":
+                self._after_colon_key = None
+        return ready
+
+    def _emit(self) -> Tuple[str, dict]:
+        text = "".join(self._item)
+        key = self._item_key
+        self._item = None
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise MalformedStreamError(f"bad {key} item: {e}") from None
+        self.items[key].append(item)
+        return key, item
+
+    def document(self) -> Any:
+        """The complete top-level JSON value (only after the stream has ended)"""
+        if not self._done:
+            raise MalformedStreamError("stream ended before the JSON document was complete")
+        return json.loads("".join(self._text))
+
+    async def consume(self, stream: AsyncIterator, echo: bool = True) -> AsyncIterator[Tuple[str, dict]]:
+        """Drive an ``agent.run_stream(...)`` or ``client.create_stream(...)``
+        and yield items while the model is still writing.
+
+        ``echo`` prints the tokens like ``Console`` does. The final TaskResult
+        or CreateResult ends up in ``self.result``. Raising out of this loop
+        closes the stream, which stops generation early.
+        """
+        streamed = False
+        try:
+            async for event in stream:
+                if isinstance(event, ModelClientStreamingChunkEvent):
+                    text = event.content
+                elif isinstance(event, str):
+                    text = event
+                elif isinstance(event, (TaskResult, CreateResult)):
+                    self.result = event
+                    continue
+                else:
+                    continue
+                streamed = True
+                if echo:
+                    print(text, end="", flush=True)
+                for ready in self.feed(text):
+                    yield ready
+        finally:
+            # close the model stream in this task so an early abort cancels generation now
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+
+        if not streamed and self.result is not None:
+            # model_client_stream=False: only the final message is available
+            final = (
+                self.result.messages[-1].to_text()
+                if isinstance(self.result, TaskResult)
+                else str(self.result.content)
+            )
+            for ready in self.feed(final):
+                yield ready
+        if echo:
+            print()
@@ -1,14 +1,17 @@
 # masterpiece_audio_visual_enricher.py
 from autogen_agentchat.agents import AssistantAgent
 import copy
-from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+import hashlib
+from autogen_course.model_clients import get_client, report, close_all
 import asyncio
 import json
 import re
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import logging
 from enum import Enum
+from incremental_enrichment import EnrichmentState, enricher_signature
+from windowed_enrichment import Window, WindowedEnrichment, estimate_tokens, story_digest
+from json_stream import JsonItemStream
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,23 +33,85 @@ class SoundType(Enum):
     TRANSITION = "transition"
     TEXTURE = "texture"
 
+def parse_response(response_content: str) -> Dict:
+    """Parse an enrichment reply; ValueError (or JSONDecodeError) if it is unusable.
+
+    Also the response cache's ``validate`` hook, so a bad reply is never cached.
+    """
+    # Extract JSON from potential markdown or other formatting
+    json_match = re.search(r'```json\s*(.*?)\s*```', response_content, re.DOTALL)
+    if json_match:
+        response_content = json_match.group(1)
+
+    data = json.loads(response_content)
+
+    # Validate response structure
+    if 'segments' not in data:
+        raise ValueError("Missing 'segments' key in response")
+
+    for segment in data['segments']:
+        if 'audio_suggestions' not in segment:
+            raise ValueError(f"Missing 'audio_suggestions' in segment {segment.get('id', 'unknown')}")
+
+    return data
+
+
 class TranscriptEnricher:
     """A sophisticated processor for enriching transcripts with audio-visual strategies."""
+
+    AGENT_NAME = "AudioVisualStorytellerAgent"
     
-    def __init__(self, model_client):
+    def __init__(
+        self,
+        model_client,
+        state_path: Optional[str] = None,
+        max_prompt_tokens: int = 1500,
+        max_concurrency: int = 4,
+        on_segment: Optional[Callable[[Dict], Any]] = None,
+        latency_budget: Optional[float] = None,
+        on_upgrade: Optional[Callable[[Dict], Any]] = None,
+    ):
         self.model_client = model_client
-        self.audio_visual_agent = self._create_audio_visual_agent()
+        # with a budget (seconds), the rule-based fallback is returned when the model
+        # is slower than that; the model result replaces it once it arrives
+        self.latency_budget = latency_budget
+        self.on_upgrade = on_upgrade
+        self.upgraded: Dict[str, Dict] = {}
+        self._pending: set = set()
+        # called with each AI segment as soon as it is streamed, so downstream
+        # work (e.g. image lookup) can start before the completion finishes
+        self.on_segment = on_segment
+        # with a state file, only segments that changed since the last run are sent to the model;
+        # editing the prompt or the required fields invalidates everything stored
+        self.state = (
+            EnrichmentState(
+                state_path,
+                signature=enricher_signature(
+                    self.AGENT_NAME, self._get_audio_visual_prompt(), "audio_suggestions"
+                ),
+            )
+            if state_path
+            else None
+        )
+        # prompts longer than this are split into overlapping windows run concurrently
+        self.max_prompt_tokens = max_prompt_tokens
+        self.windows = WindowedEnrichment(
+            make_agent=self._create_audio_visual_agent,
+            build_prompt=self._create_window_prompt,
+            parse=self._parse_and_validate_response,
+            max_window_tokens=max_prompt_tokens,
+            max_concurrency=max_concurrency,
+            on_item=on_segment,
+        )
         
     def _create_audio_visual_agent(self) -> AssistantAgent:
         """Create and configure the audio-visual strategy agent."""
         return AssistantAgent(
-            name="AudioVisualStorytellerAgent",
+            name=self.AGENT_NAME,
             system_message=self._get_audio_visual_prompt(),
             model_client=self.model_client,
             reflect_on_tool_use=True,
             model_client_stream=True,
-            max_consecutive_auto_reply=3,
-            temperature=0.1
         )
     
     def _get_audio_visual_prompt(self) -> str:
@@ -184,25 +249,80 @@ class TranscriptEnricher:
         Return complete JSON response with comprehensive story arc summary including audio theme.
         """
 
+    def _create_incremental_prompt(self, changed: List[Dict], context: List[Dict]) -> str:
+        """Prompt for only the changed segments, with their neighbours as read-only context."""
+        story = (
+            f"Story Arc Summary: {json.dumps(self.state.story_arc_summary, ensure_ascii=False)}"
+            if self.state.story_arc_summary
+            else "Story Arc Summary: not available yet"
+        )
+        return f"""
+        # PARTIAL AUDIO-VISUAL STORYTELLING UPDATE
+
+        ## STORY CONTEXT
+        {story}
+
+        ## NEIGHBOURING SEGMENTS (context only, do NOT return these)
+        {json.dumps(context, indent=2)}
+
+        ## SEGMENTS TO PROCESS:
+        {json.dumps(changed, indent=2)}
+
+        For EACH segment to process, provide the same visual strategy, audio strategy,
+        emotional tone and timing fields as the full blueprint, keeping continuity with
+        the neighbouring segments and the story arc above.
+
+        Return JSON with a "segments" list containing ONLY the segments to process.
+        """
+
+    def _create_window_prompt(self, window: Window, story: str) -> str:
+        """Prompt for one window of a long transcript."""
+        return f"""
+        # AUDIO-VISUAL STORYTELLING MISSION (PART OF A LONGER STORY)
+
+        ## STORY CONTEXT
+        Story Outline: {story}
+
+        ## PREVIOUS SEGMENTS (context only, do NOT return these)
+        {json.dumps(window.before, indent=2)}
+
+        ## SEGMENTS TO PROCESS:
+        {json.dumps(window.core, indent=2)}
+
+        ## NEXT SEGMENTS (context only, do NOT return these)
+        {json.dumps(window.after, indent=2)}
+
+        For EACH segment to process, provide visual strategy, audio strategy, emotional
+        tone and timing recommendations. Keep transitions smooth with the context segments.
+
+        Return JSON with a "segments" list containing ONLY the segments to process, and a
+        "story_arc_summary" describing this part of the story including its audio theme.
+        """
+
+    async def _generate(self, segments: List[Dict], prompt: str, story: str) -> Optional[Dict]:
+        """Run the prompt in one call if it fits, otherwise window the segments."""
+        if estimate_tokens(prompt) <= self.max_prompt_tokens:
+            parser = JsonItemStream(keys=("segments",))
+            # a fresh agent per call: a run that outlived its latency budget may
+            # still be streaming, and an AssistantAgent can't serve two runs at once
+            agent = self._create_audio_visual_agent()
+            try:
+                async for _, segment in parser.consume(agent.run_stream(task=prompt)):
+                    if self.on_segment:
+                        self.on_segment(segment)
+                return self._parse_and_validate_response(json.dumps(parser.document()))
+            except Exception as e:
+                logger.error(f"Error in enrichment process: {e}")
+                return None
+
+        logger.info("Prompt exceeds the token budget, switching to windowed enrichment")
+        parsed_data, _ = await self.windows.run(segments, story)
+        return parsed_data if parsed_data["segments"] else None
+
     def _parse_and_validate_response(self, response_content: str) -> Optional[Dict]:
         """Parse and validate the AI response with robust error handling."""
         try:
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_content, re.DOTALL)
-            if json_match:
-                response_content = json_match.group(1)
-            
-            data = json.loads(response_content)
-            
-            # Validate response structure
-            if 'segments' not in data:
-                raise ValueError("Missing 'segments' key in response")
-                
-            for segment in data['segments']:
-                if 'audio_suggestions' not in segment:
-                    raise ValueError(f"Missing 'audio_suggestions' in segment {segment.get('id', 'unknown')}")
-                    
-            return data
-            
+            return parse_response(response_content)
         except json.JSONDecodeError as e:
             logger.error(f"JSON parsing failed: {e}")
             return None
@@ -266,19 +386,67 @@ class TranscriptEnricher:
         """Main method to enrich transcript with audio-visual strategy."""
         if not self._validate_transcript_structure(transcript):
             raise ValueError("Invalid transcript structure")
-        
+        if self.latency_budget is None:
+            return await self._enrich(transcript)
+        return await self._enrich_within_budget(transcript)
+
+    @staticmethod
+    def _transcript_key(transcript: Dict) -> str:
+        segments = [(s["id"], s["text"], s["duration"]) for s in transcript["segments"]]
+        return hashlib.sha256(json.dumps(segments).encode("utf-8")).hexdigest()
+
+    async def _enrich_within_budget(self, transcript: Dict) -> Dict:
+        """Race the model against ``latency_budget``, answering with the fallback on a miss.
+
+        The model call is shielded, so a miss does not cancel it: it keeps
+        running in the background and its result is stored in ``upgraded``
+        (and in the state file, when there is one) for the next request.
+        """
+        key = self._transcript_key(transcript)
+        if key in self.upgraded:
+            return copy.deepcopy(self.upgraded[key])
+
+        # the rule-based answer costs nothing, so have it ready before waiting
+        fallback = self._apply_audio_fallback_strategy(copy.deepcopy(transcript))
+        task = asyncio.create_task(self._enrich(transcript))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.latency_budget)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Model missed the {self.latency_budget:.1f}s budget, returning fallback and upgrading in the background"
+            )
+        self._pending.add(task)
+        task.add_done_callback(lambda done: self._store_upgrade(key, done, fallback))
+        return fallback
+
+    def _store_upgrade(self, key: str, task: asyncio.Task, fallback: Dict) -> None:
+        self._pending.discard(task)
+        # _enrich answers failures with the same fallback; that is no upgrade
+        if task.cancelled() or task.exception() is not None or task.result() == fallback:
+            return
+        self.upgraded[key] = task.result()
+        logger.info("Background enrichment finished, upgraded result is cached")
+        if self.on_upgrade:
+            self.on_upgrade(task.result())
+
+    async def drain(self) -> None:
+        """Wait for background upgrades (call before closing the model client)."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def _enrich(self, transcript: Dict) -> Dict:
         enriched_transcript = copy.deepcopy(transcript)
+        if self.state is not None:
+            return await self._enrich_incrementally(enriched_transcript)
         
         try:
             prompt = self._create_audio_visual_prompt(transcript)
             
             logger.info("Generating complete audio-visual strategy...")
             
-            response = await  Console(self.audio_visual_agent.run_stream(task=prompt))
-            
-            # print(response.messages[-1].content.response)
-            
-            parsed_data = self._parse_and_validate_response(response.content)
+            parsed_data = await self._generate(
+                transcript['segments'], prompt, story_digest(transcript['segments'])
+            )
             
             if not parsed_data:
                 logger.warning("Failed to parse AI response, using fallback strategy")
@@ -286,6 +454,12 @@ class TranscriptEnricher:
             
             self._merge_audio_visual_data(enriched_transcript, parsed_data)
             
+            returned = {s.get('id') for s in parsed_data['segments']}
+            missing = [s for s in enriched_transcript['segments'] if s['id'] not in returned]
+            if missing:
+                logger.warning(f"No AI result for segments {[s['id'] for s in missing]}, using fallback strategy")
+                self._apply_audio_fallback_strategy(enriched_transcript, missing)
+            
             logger.info("Successfully enriched transcript with audio-visual strategy")
             return enriched_transcript
             
@@ -293,11 +467,62 @@ class TranscriptEnricher:
             logger.error(f"Error in enrichment process: {e}")
             return self._apply_audio_fallback_strategy(enriched_transcript)
 
-    def _apply_audio_fallback_strategy(self, transcript: Dict) -> Dict:
-        """Fallback strategy if AI processing fails."""
+    async def _enrich_incrementally(self, enriched_transcript: Dict) -> Dict:
+        """Reuse stored results for unchanged segments and ask the model for the rest."""
+        reused, changed = self.state.split(enriched_transcript)
+        stored = {"segments": [{"id": seg_id, **fields} for seg_id, fields in reused.items()]}
+        if self.state.story_arc_summary:
+            stored["story_arc_summary"] = self.state.story_arc_summary
+        self._merge_audio_visual_data(enriched_transcript, stored)
+        logger.info(f"Incremental enrichment: {len(reused)} segments reused, {len(changed)} to generate")
+        if not changed:
+            return enriched_transcript
+
+        # the first run (nothing stored yet) still uses the full-story prompt
+        partial = bool(reused or self.state.story_arc_summary)
+        if partial:
+            prompt = self._create_incremental_prompt(changed, self.state.neighbours(enriched_transcript, changed))
+        else:
+            prompt = self._create_audio_visual_prompt(enriched_transcript)
+        story = (
+            json.dumps(self.state.story_arc_summary, ensure_ascii=False)
+            if self.state.story_arc_summary
+            else story_digest(enriched_transcript["segments"])
+        )
+
+        parsed_data = await self._generate(changed, prompt, story)
+
+        changed_ids = {s["id"] for s in changed}
+        generated = []
+        if parsed_data:
+            parsed_data["segments"] = [s for s in parsed_data["segments"] if s.get("id") in changed_ids]
+            if partial:
+                # a summary written from a few segments would overwrite the whole-story one
+                parsed_data.pop("story_arc_summary", None)
+            self._merge_audio_visual_data(enriched_transcript, parsed_data)
+            generated = [s["id"] for s in parsed_data["segments"]]
+            self.state.record(enriched_transcript, generated)
+            self.state.save()
+
+        # anything the model didn't return gets the fallback, and is retried next run
+        missing = [s for s in enriched_transcript["segments"] if s["id"] in changed_ids - set(generated)]
+        if missing:
+            logger.warning(f"No AI result for segments {[s['id'] for s in missing]}, using fallback strategy")
+            self._apply_audio_fallback_strategy(enriched_transcript, missing)
+        return enriched_transcript
+
+    def _apply_audio_fallback_strategy(self, transcript: Dict, segments: Optional[List[Dict]] = None) -> Dict:
+        """Fallback strategy if AI processing fails.
+
+        Only ``segments`` (default: all) are filled in; the mood still follows
+        each segment's position in the whole transcript.
+        """
         emotional_arc = ["hopeful", "determined", "tense", "challenging", "triumphant"]
+        wanted = None if segments is None else {s['id'] for s in segments}
         
         for i, segment in enumerate(transcript['segments']):
+            if wanted is not None and segment['id'] not in wanted:
+                continue
             mood_index = min(i, len(emotional_arc) - 1)
             emotional_tone = emotional_arc[mood_index]
             
@@ -363,18 +588,8 @@ class TranscriptEnricher:
 
 async def main():
     # Initialize model client
-    model_client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        model_info={
-            "vision": False,
-            "function_calling": True,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    # AssistantAgent takes no sampling options; temperature is a create argument of the client
+    model_client = get_client(name="enricher", temperature=0.1, validate=parse_response)
 
     # Example transcript
     transcript = {
@@ -397,7 +612,7 @@ async def main():
     }
 
     # Process transcript
-    enricher = TranscriptEnricher(model_client)
+    enricher = TranscriptEnricher(model_client, state_path="audio_visual_enrichment_state.json", latency_budget=30.0)
     enriched_result = await enricher.enrich_transcript(transcript)
     
     # Generate audio asset list
@@ -430,6 +645,10 @@ async def main():
         print(f"Recommended BGM: {audio_theme.get('recommended_bgm', 'N/A')}")
         print(f"Key Sound Elements: {', '.join(audio_theme.get('key_sound_elements', []))}")
 
+    await enricher.drain()
+    print(report())
+    await close_all()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,162 @@
+# segment_router.py
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from autogen_course.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+# Searchable stand-ins for each category, as in spacy-examples/example03.py
+REFERENCE_WORDS = {
+    "characters": ["hiker", "climber", "traveler", "adventurer", "person"],
+    "locations": ["mountain", "trail", "peak", "forest", "summit", "path", "city", "room"],
+    "actions": ["climb", "walk", "hike", "struggle", "stumble", "rest", "howl", "block", "grow", "dream"],
+    "nouns": ["gear", "backpack", "obstacle", "path", "wind", "rock", "step", "storm", "camera", "laptop"],
+}
+
+# Words that read well but photograph badly ("show don't tell")
+ABSTRACT_NOUNS = {
+    "hope", "dream", "doubt", "fear", "training", "expert", "year", "way", "moment",
+    "time", "thing", "idea", "confidence", "plan", "warning", "life",
+}
+
+
+class SegmentRoute:
+    """Routing decision for one transcript segment"""
+
+    def __init__(self, segment: Dict, queries: List[str], confidence: float, features: Dict):
+        self.segment = segment
+        self.queries = queries
+        self.confidence = confidence
+        self.features = features
+
+    @property
+    def id(self):
+        return self.segment["id"]
+
+
+class SegmentRouter:
+    """Answer easy segments with spaCy + embeddings, leave the rest to the LLM.
+
+    Each segment is parsed like ``spacy-examples/example01.py`` (characters,
+    locations, actions, nouns). Gaps are filled with the nearest reference
+    word (``suggest_missing`` in example03), and the story's setting and
+    subject are carried forward from earlier segments. A segment whose
+    concrete nouns, subject/setting and action produce ``queries_per_segment``
+    distinct image queries with confidence ``>= min_confidence`` is answered
+    locally; everything else is ambiguous and goes to the model.
+    """
+
+    def __init__(
+        self,
+        nlp=None,
+        embedder: Optional[EmbeddingCache] = None,
+        reference_words: Dict[str, List[str]] = REFERENCE_WORDS,
+        queries_per_segment: int = 5,
+        min_confidence: float = 0.6,
+        similarity_threshold: float = 0.4,
+    ):
+        self._nlp = nlp
+        self.embedder = embedder or EmbeddingCache("all-MiniLM-L6-v2")
+        self.reference_words = reference_words
+        self.queries_per_segment = queries_per_segment
+        self.min_confidence = min_confidence
+        self.similarity_threshold = similarity_threshold
+        self.ref_embeddings = {
+            category: self.embedder.encode(words) for category, words in reference_words.items()
+        }
+        self.local = 0
+        self.ambiguous = 0
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            import spacy
+
+            self._nlp = spacy.load("en_core_web_sm")
+        return self._nlp
+
+    def _nearest(self, text: str, category: str) -> Optional[str]:
+        """Closest reference word for ``text`` (embeddings are normalized, so dot = cosine)"""
+        sims = self.ref_embeddings[category] @ self.embedder.encode(text)
+        best = int(np.argmax(sims))
+        return self.reference_words[category][best] if sims[best] > self.similarity_threshold else None
+
+    def analyze(self, text: str) -> Dict:
+        doc = self.nlp(text)
+        nouns = []
+        for token in doc:
+            if token.pos_ != "NOUN" or token.lemma_.lower() in ABSTRACT_NOUNS:
+                continue
+            # "steep trail" from "the steep trail" or "the trail grew steeper"
+            adjectives = [c.lemma_.lower() for c in token.children if c.dep_ == "amod"]
+            if token.dep_ == "nsubj":
+                adjectives += [c.lemma_.lower() for c in token.head.children if c.dep_ == "acomp"]
+            nouns.append(" ".join(adjectives + [token.lemma_.lower()]))
+        return {
+            "characters": [ent.text for ent in doc.ents if ent.label_ == "PERSON"],
+            "locations": [ent.text for ent in doc.ents if ent.label_ in ["GPE", "LOC", "FAC"]],
+            "actions": [token.lemma_.lower() for token in doc if token.pos_ == "VERB"],
+            "nouns": nouns,
+        }
+
+    def _route_one(self, segment: Dict, context: Dict) -> SegmentRoute:
+        features = self.analyze(segment["text"])
+        # names and place names are not searchable; map them to a generic stand-in
+        subject = self._nearest(segment["text"], "characters") if features["characters"] else None
+        setting = next(
+            (self._nearest(loc, "locations") for loc in features["locations"]), None
+        ) or next(
+            (n.split()[-1] for n in features["nouns"] if n.split()[-1] in self.reference_words["locations"]), None
+        )
+        context["subject"] = subject or context.get("subject")
+        context["setting"] = setting or context.get("setting") or self._nearest(segment["text"], "locations")
+        subject, setting = context["subject"], context["setting"]
+        action = next((a for a in features["actions"] if self._nearest(a, "actions")), None)
+
+        queries = list(features["nouns"])
+        for noun in features["nouns"]:
+            if setting and setting not in noun:
+                queries.append(f"{noun} on {setting}")
+            if subject:
+                queries.append(f"{subject} with {noun}")
+        if features["characters"] and action:
+            queries.append(f"{subject} {action} {setting or ''}".strip())
+        if subject and setting:
+            queries.append(f"{subject} on {setting}")
+        queries = list(dict.fromkeys(q for q in queries if q))[: self.queries_per_segment]
+
+        confidence = (
+            0.5 * min(1.0, len(features["nouns"]) / 2)
+            + 0.25 * bool(subject or setting)
+            + 0.25 * bool(action)
+        )
+        if len(queries) < self.queries_per_segment:
+            confidence *= len(queries) / self.queries_per_segment
+        return SegmentRoute(segment, queries, round(confidence, 2), features)
+
+    def route(self, segments: List[Dict]) -> Tuple[Dict, List[Dict]]:
+        """Return ({segment id: image queries} for confident segments, [ambiguous segments])"""
+        context: Dict = {}
+        local, ambiguous = {}, []
+        for segment in segments:
+            decision = self._route_one(segment, context)
+            if decision.confidence >= self.min_confidence:
+                local[decision.id] = decision.queries
+            else:
+                ambiguous.append(segment)
+            logger.debug(f"Segment {decision.id}: confidence {decision.confidence} -> {decision.queries}")
+        self.local += len(local)
+        self.ambiguous += len(ambiguous)
+        logger.info(f"Routed {len(local)} segments locally, {len(ambiguous)} to the model")
+        return local, ambiguous
+
+    def stats(self) -> Dict:
+        total = self.local + self.ambiguous
+        return {
+            "local": self.local,
+            "ambiguous": self.ambiguous,
+            "llm_calls_avoided_pct": round(100 * self.local / total, 1) if total else 0.0,
+        }
@@ -1,10 +1,11 @@
 # story_image_agent.py
 from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client, close_all
 from typing import List, Dict, Any, Optional
 from autogen_agentchat.ui import Console
 import json
 import os
+from autogen_course.prompt_compaction import CandidateTable
 
 
 class StoryImageAgent:
@@ -27,19 +28,7 @@ class StoryImageAgent:
         # Get API key from environment if not provided
 
         # Initialize model client
-        self.model_client = OpenAIChatCompletionClient(
-            model="gemma-3-1b-it-GGUF",
-            base_url="http://localhost:8080/v1",
-            api_key="placeholder",
-            # response_format=Model,
-            model_info={
-                "vision": False,
-                "function_calling": True,
-                "json_output": True,
-                "family": "",
-                "structured_output": True,
-            },
-        )
+        self.model_client = get_client(name="story_image_agent")
 
         # Default system message
         default_system_message = """You are an expert visual storytelling assistant. Your primary function is to select the most narratively appropriate image for a specific moment in a story.
@@ -88,6 +77,10 @@ Return your final decision as JSON with: {"selected_image_id": <number-or-null>,
         Returns:
             Dictionary with selected_image_id and justification
         """
+        # ids stay the caller's own, so selected_image_id needs no mapping
+        table = CandidateTable(image_options, id_key="id")
+        table.report(target_keyword)
+
         # Create a comprehensive prompt that includes everything
         prompt = f"""
         STORY IMAGE SELECTION TASK
@@ -98,8 +91,8 @@ Return your final decision as JSON with: {"selected_image_id": <number-or-null>,
         TARGET IMAGE DESCRIPTION:
         \"\"\"{target_keyword}\"\"\"
 
-        AVAILABLE IMAGE OPTIONS:
-        {json.dumps(image_options, indent=2)}
+        AVAILABLE IMAGE OPTIONS (id, name):
+        {table.render()}
 
         PLEASE ANALYZE AND SELECT:
 
@@ -173,6 +166,7 @@ async def example_usage():
 
     finally:
         await agent.close()
+        await close_all()
 
 
 # Run if executed directly
@@ -1,22 +1,13 @@
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client, close_all
 
 import asyncio
 
 # Define a model client. You can use other model client that implements
 # the `ChatCompletionClient` interface.
-model_client = OpenAIChatCompletionClient(
-    model="gemma-3-1b-it-GGUF",
-    base_url="http://localhost:8080/v1",
-    api_key="placeholder",
-    model_info={
-        "vision": False,
-        "function_calling": True,
-        "json_output": True,
-        "family": "",
-        "structured_output": True,
-    },
+model_client = get_client(
+    name="weather_agent",
     response_format={
         "type": "json_object",
         "schema": {
@@ -51,7 +42,7 @@ agent = AssistantAgent(
 async def main() -> None:
     await Console(agent.run_stream(task="What is the weather in New York?"))
     # Close the connection to the model client.
-    await model_client.close()
+    await close_all()
 
 
 # NOTE: if running this inside a Python script you'll need to use asyncio.run(main()).
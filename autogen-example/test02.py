@@ -1,21 +1,10 @@
 from autogen_core.models import CreateResult, UserMessage
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client, DEFAULT_MODEL_INFO
 import asyncio
 
 
 async def main():
-    model_client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        model_info={
-            "vision": False,
-            "function_calling": False,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    model_client = get_client(name="test02", model_info={**DEFAULT_MODEL_INFO, "function_calling": False})
     sample_input = {
         "language": "en",
         "language_probability": 0.998,
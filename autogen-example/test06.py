@@ -1,24 +1,13 @@
 from autogen_agentchat.agents import AssistantAgent
 import copy
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client
 import asyncio
 import json
 
 
 async def main():
-    model_client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        model_info={
-            "vision": False,
-            "function_calling": True,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    model_client = get_client(name="keyword_agent")
 
     # Create the assistant agent
     keyword_agent = AssistantAgent(
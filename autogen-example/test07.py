@@ -2,13 +2,15 @@ from __future__ import annotations
 from autogen_agentchat.agents import AssistantAgent
 import copy
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client, report, close_all
 import asyncio
 import json
 from pathlib import Path
 from typing import Any
 from typing import List
 from pydantic import BaseModel
+from autogen_course.structured_output import StructuredOutput, json_schema_format, metrics
+from segment_router import SegmentRouter
 
 
 class Segment(BaseModel):
@@ -25,19 +27,7 @@ class Model(BaseModel):
 
 
 async def main():
-    model_client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        response_format=Model,
-        model_info={
-            "vision": False,
-            "function_calling": True,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    model_client = get_client(name="keyword_agent", response_format=json_schema_format(Model))
 
     # Create the assistant agent with updated blueprint strategy
     keyword_agent = AssistantAgent(
@@ -175,6 +165,19 @@ async def main():
     # Deep copy transcript to enrich
     enriched_transcript = copy.deepcopy(transcript)
 
+    # Concrete segments are answered by spaCy + embeddings; only the rest reach the model
+    router = SegmentRouter()
+    local, ambiguous = router.route(enriched_transcript["segments"])
+    for seg in enriched_transcript["segments"]:
+        if seg["id"] in local:
+            seg["image_suggestion"] = local[seg["id"]]
+    print("Routing:", router.stats())
+    if not ambiguous:
+        with Path('output.json').open("w", encoding="utf-8") as f:
+            json.dump(enriched_transcript, f, ensure_ascii=False, indent=2)
+        await close_all()
+        return
+
     # Prepare the task prompt with clear context
     task_prompt = f"""
     ANALYZE this story and generate image search suggestions for each segment using the blueprint strategy.
@@ -188,7 +191,7 @@ async def main():
     - Search-friendly adjective+noun combinations
 
     Process the following segments:
-    {json.dumps(enriched_transcript['segments'], indent=2)}
+    {json.dumps(ambiguous, indent=2)}
     """
 
     # Get response from the agent
@@ -206,7 +209,7 @@ async def main():
         
         # Parse JSON output from assistant
         response_content = response.messages[-1].to_text()
-        enriched_data = json.loads(response_content)
+        enriched_data = StructuredOutput(Model).parse(response_content).model_dump()
         
         # Merge the image suggestions back into the original transcript structure
         segment_map = {s["id"]: s for s in enriched_data["segments"]}
@@ -223,12 +226,16 @@ async def main():
             json.dump(enriched_transcript, f, ensure_ascii=False, indent=2)
         # print(json.dumps(enriched_transcript, indent=2))
         
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         print("Error parsing JSON response:", e)
     #     print("Raw response:", response_content)
     except Exception as e:
         print("Error processing response:", e)
     #     print("Raw response:", response_content)
+    finally:
+        print(report())
+        print(metrics.report())
+        await close_all()
 
 
 if __name__ == "__main__":
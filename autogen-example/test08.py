@@ -1,23 +1,57 @@
 from autogen_agentchat.agents import AssistantAgent
 import copy
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client, report, close_all
 import asyncio
 import json
 import re
 from typing import Dict, List, Any, Optional
 import logging
+from incremental_enrichment import EnrichmentState, enricher_signature
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def parse_response(response_content: str) -> Dict:
+    """Parse an enrichment reply; ValueError (or JSONDecodeError) if it is unusable.
+
+    Also the response cache's ``validate`` hook, so a bad reply is never cached.
+    """
+    # Extract JSON from potential markdown or other formatting
+    json_match = re.search(r'```json\s*(.*?)\s*```', response_content, re.DOTALL)
+    if json_match:
+        response_content = json_match.group(1)
+
+    data = json.loads(response_content)
+
+    # Validate response structure
+    if 'segments' not in data:
+        raise ValueError("Missing 'segments' key in response")
+
+    for segment in data['segments']:
+        if 'image_suggestions' not in segment:
+            raise ValueError(f"Missing 'image_suggestions' in segment {segment.get('id', 'unknown')}")
+
+    return data
+
+
 class TranscriptEnricher:
     """A sophisticated processor for enriching transcripts with image search strategies."""
     
-    def __init__(self, model_client):
+    def __init__(self, model_client, state_path: Optional[str] = None):
         self.model_client = model_client
         self.keyword_agent = self._create_keyword_agent()
+        # with a state file, only segments that changed since the last run are sent to the model;
+        # editing the prompt or the required fields invalidates everything stored
+        self.state = (
+            EnrichmentState(
+                state_path,
+                signature=enricher_signature(self.keyword_agent.name, self._get_system_prompt(), "image_suggestions"),
+            )
+            if state_path
+            else None
+        )
         
     def _create_keyword_agent(self) -> AssistantAgent:
         """Create and configure the keyword generation agent."""
@@ -140,26 +174,35 @@ class TranscriptEnricher:
         Return complete JSON response with story arc summary.
         """
 
+    def _create_incremental_prompt(self, changed: List[Dict], context: List[Dict]) -> str:
+        """Prompt for only the changed segments, with their neighbours as read-only context."""
+        story = (
+            f"Story Arc Summary: {json.dumps(self.state.story_arc_summary, ensure_ascii=False)}"
+            if self.state.story_arc_summary
+            else "Story Arc Summary: not available yet"
+        )
+        return f"""
+        # PARTIAL VISUAL STORYTELLING UPDATE
+
+        ## STORY CONTEXT
+        {story}
+
+        ## NEIGHBOURING SEGMENTS (context only, do NOT return these)
+        {json.dumps(context, indent=2)}
+
+        ## SEGMENTS TO PROCESS:
+        {json.dumps(changed, indent=2)}
+
+        For EACH segment to process, provide narrative role, shot type, visual priority
+        and 5 ranked image search suggestions, consistent with the neighbouring segments.
+
+        Return JSON with a "segments" list containing ONLY the segments to process.
+        """
+
     def _parse_and_validate_response(self, response_content: str) -> Optional[Dict]:
         """Parse and validate the AI response with robust error handling."""
         try:
-            # Extract JSON from potential markdown or other formatting
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_content, re.DOTALL)
-            if json_match:
-                response_content = json_match.group(1)
-            
-            data = json.loads(response_content)
-            
-            # Validate response structure
-            if 'segments' not in data:
-                raise ValueError("Missing 'segments' key in response")
-                
-            for segment in data['segments']:
-                if 'image_suggestions' not in segment:
-                    raise ValueError(f"Missing 'image_suggestions' in segment {segment.get('id', 'unknown')}")
-                    
-            return data
-            
+            return parse_response(response_content)
         except json.JSONDecodeError as e:
             logger.error(f"JSON parsing failed: {e}")
             return None
@@ -173,6 +216,8 @@ class TranscriptEnricher:
             raise ValueError("Invalid transcript structure")
         
         enriched_transcript = copy.deepcopy(transcript)
+        if self.state is not None:
+            return await self._enrich_incrementally(enriched_transcript)
         
         try:
             # Create strategic prompt
@@ -183,21 +228,65 @@ class TranscriptEnricher:
             response = await Console(self.keyword_agent.run_stream(task=prompt))
             
             # Parse and validate response
-            # parsed_data = self._parse_and_validate_response(response.content)
+            parsed_data = self._parse_and_validate_response(response.messages[-1].to_text())
             
-            # if not parsed_data:
-            #     logger.warning("Failed to parse AI response, using fallback strategy")
-            #     return self._apply_fallback_strategy(enriched_transcript)
+            if not parsed_data:
+                logger.warning("Failed to parse AI response, using fallback strategy")
+                return self._apply_fallback_strategy(enriched_transcript)
             
             # Merge AI insights with original transcript
-            # self._merge_strategic_data(enriched_transcript, parsed_data)
+            self._merge_strategic_data(enriched_transcript, parsed_data)
             
             logger.info("Successfully enriched transcript with visual strategy")
-            # return enriched_transcript
+            return enriched_transcript
             
         except Exception as e:
             logger.error(f"Error in enrichment process: {e}")
-            # return self._apply_fallback_strategy(enriched_transcript)
+            return self._apply_fallback_strategy(enriched_transcript)
+
+    async def _enrich_incrementally(self, enriched_transcript: Dict) -> Dict:
+        """Reuse stored results for unchanged segments and ask the model for the rest."""
+        reused, changed = self.state.split(enriched_transcript)
+        stored = {"segments": [{"id": seg_id, **fields} for seg_id, fields in reused.items()]}
+        if self.state.story_arc_summary:
+            stored["story_arc_summary"] = self.state.story_arc_summary
+        self._merge_strategic_data(enriched_transcript, stored)
+        logger.info(f"Incremental enrichment: {len(reused)} segments reused, {len(changed)} to generate")
+        if not changed:
+            return enriched_transcript
+
+        # the first run (nothing stored yet) still uses the full-story prompt
+        partial = bool(reused or self.state.story_arc_summary)
+        if partial:
+            prompt = self._create_incremental_prompt(changed, self.state.neighbours(enriched_transcript, changed))
+        else:
+            prompt = self._create_strategic_prompt(enriched_transcript)
+
+        try:
+            response = await Console(self.keyword_agent.run_stream(task=prompt))
+            parsed_data = self._parse_and_validate_response(response.messages[-1].to_text())
+        except Exception as e:
+            logger.error(f"Error in enrichment process: {e}")
+            parsed_data = None
+
+        changed_ids = {s["id"] for s in changed}
+        generated = []
+        if parsed_data:
+            parsed_data["segments"] = [s for s in parsed_data["segments"] if s.get("id") in changed_ids]
+            if partial:
+                # a summary written from a few segments would overwrite the whole-story one
+                parsed_data.pop("story_arc_summary", None)
+            self._merge_strategic_data(enriched_transcript, parsed_data)
+            generated = [s["id"] for s in parsed_data["segments"]]
+            self.state.record(enriched_transcript, generated)
+            self.state.save()
+
+        # anything the model didn't return gets the fallback, and is retried next run
+        missing = [s for s in enriched_transcript["segments"] if s["id"] in changed_ids - set(generated)]
+        if missing:
+            logger.warning(f"No AI result for segments {[s['id'] for s in missing]}, using fallback strategy")
+            self._apply_fallback_strategy({"segments": missing})
+        return enriched_transcript
 
     def _apply_fallback_strategy(self, transcript: Dict) -> Dict:
         """Fallback strategy if AI processing fails."""
@@ -229,18 +318,7 @@ class TranscriptEnricher:
 
 async def main():
     # Initialize model client
-    model_client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        model_info={
-            "vision": False,
-            "function_calling": True,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    model_client = get_client(name="enricher", validate=parse_response)
 
     # Example transcript
     transcript = {
@@ -263,7 +341,7 @@ async def main():
     }
 
     # Process transcript
-    enricher = TranscriptEnricher(model_client)
+    enricher = TranscriptEnricher(model_client, state_path="visual_enrichment_state.json")
     enriched_result = await enricher.enrich_transcript(transcript)
     
     # Display results
@@ -283,6 +361,9 @@ async def main():
     #     print(f"Visual Theme: {summary.get('visual_theme', 'N/A')}")
     #     print(f"Emotional Arc: {summary.get('emotional_arc', 'N/A')}")
 
+    print(report())
+    await close_all()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
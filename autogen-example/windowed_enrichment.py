@@ -0,0 +1,176 @@
+# windowed_enrichment.py
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+
+from json_stream import JsonItemStream
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for sizing gemma prompts
+    return len(text) // 4 + 1
+
+
+def segment_tokens(segment: Dict) -> int:
+    return estimate_tokens(json.dumps(segment, indent=2))
+
+
+class Window:
+    """A run of segments the model must enrich, plus read-only overlap on each side"""
+
+    def __init__(self, core: List[Dict], before: List[Dict], after: List[Dict]):
+        self.core = core
+        self.before = before
+        self.after = after
+
+    @property
+    def ids(self) -> List:
+        return [s["id"] for s in self.core]
+
+
+def make_windows(segments: List[Dict], max_tokens: int = 1200, overlap: int = 1) -> List[Window]:
+    """Split segments into windows whose core fits in ``max_tokens``.
+
+    Every segment is the core of exactly one window; ``overlap`` neighbours on
+    each side are attached as context so the model sees the transitions.
+    """
+    windows, start, used = [], 0, 0
+    for index, segment in enumerate(segments):
+        cost = segment_tokens(segment)
+        if index > start and used + cost > max_tokens:
+            windows.append((start, index))
+            start, used = index, 0
+        used += cost
+    if start < len(segments):
+        windows.append((start, len(segments)))
+
+    return [
+        Window(
+            segments[begin:end],
+            [{"id": s["id"], "text": s["text"]} for s in segments[max(0, begin - overlap):begin]],
+            [{"id": s["id"], "text": s["text"]} for s in segments[end:end + overlap]],
+        )
+        for begin, end in windows
+    ]
+
+
+def story_digest(segments: List[Dict], max_tokens: int = 250) -> str:
+    """Compact extractive outline of the whole story: evenly spaced segment texts
+    in order, trimmed to a token budget. Every window gets the same outline."""
+    if not segments:
+        return ""
+    budget = max_tokens * 4
+    texts = [s["text"].strip() for s in segments]
+    step = max(1, sum(len(t) for t in texts) // budget)
+    picked = texts[::step]
+    if texts[-1] != picked[-1]:
+        picked.append(texts[-1])
+    digest = " … ".join(picked)
+    return digest if len(digest) <= budget else digest[:budget].rsplit(" ", 1)[0] + " …"
+
+
+def _vote(values: List[Any]) -> Any:
+    values = [v for v in values if v]
+    return Counter(map(str, values)).most_common(1)[0][0] if values else ""
+
+
+def _unique(values: List[Any]) -> List[Any]:
+    seen, result = set(), []
+    for value in values:
+        if value and str(value) not in seen:
+            seen.add(str(value))
+            result.append(value)
+    return result
+
+
+def merge_story_arcs(summaries: List[Optional[Dict]]) -> Dict:
+    """Combine per-window story_arc_summary dicts into one for the whole transcript"""
+    summaries = [s for s in summaries if s]
+    if not summaries:
+        return {}
+    merged = {
+        "primary_character": _vote([s.get("primary_character") for s in summaries]),
+        "primary_setting": _vote([s.get("primary_setting") for s in summaries]),
+        "emotional_arc": " → ".join(_unique([s.get("emotional_arc") for s in summaries])),
+        "visual_theme": _vote([s.get("visual_theme") for s in summaries]),
+    }
+    audio = [s.get("audio_theme") for s in summaries if isinstance(s.get("audio_theme"), dict)]
+    if audio:
+        merged["audio_theme"] = {
+            "overall_mood": _vote([a.get("overall_mood") for a in audio]),
+            "recommended_bgm": _vote([a.get("recommended_bgm") for a in audio]),
+            "key_sound_elements": _unique([e for a in audio for e in a.get("key_sound_elements", [])]),
+            "music_transition_points": [p for a in audio for p in a.get("music_transition_points", [])],
+        }
+    return merged
+
+
+class WindowedEnrichment:
+    """Runs an enrichment prompt over token-sized windows concurrently.
+
+    ``make_agent`` builds a fresh agent per window (agents keep chat history,
+    so they can't be shared between concurrent runs), ``build_prompt(window,
+    story)`` renders the window prompt and ``parse(text)`` turns the reply
+    into ``{"segments": [...], "story_arc_summary": {...}}`` or None. At most
+    ``max_concurrency`` windows are in flight; the model client's own cap
+    still applies on top. ``on_item`` is called with every segment the moment
+    it is streamed.
+    """
+
+    def __init__(
+        self,
+        make_agent: Callable[[], Any],
+        build_prompt: Callable[[Window, str], str],
+        parse: Callable[[str], Optional[Dict]],
+        max_window_tokens: int = 1200,
+        overlap: int = 1,
+        max_concurrency: int = 4,
+        on_item: Optional[Callable[[Dict], Any]] = None,
+    ):
+        self.make_agent = make_agent
+        self.build_prompt = build_prompt
+        self.parse = parse
+        self.max_window_tokens = max_window_tokens
+        self.overlap = overlap
+        self.max_concurrency = max_concurrency
+        self.on_item = on_item
+
+    async def _run_window(self, semaphore: asyncio.Semaphore, window: Window, story: str) -> Optional[Dict]:
+        async with semaphore:
+            parser = JsonItemStream(keys=("segments",))
+            stream = self.make_agent().run_stream(task=self.build_prompt(window, story))
+            try:
+                async for _, segment in parser.consume(stream, echo=False):
+                    if self.on_item and segment.get("id") in window.ids:
+                        self.on_item(segment)
+                parsed = self.parse(json.dumps(parser.document()))
+            except Exception as e:
+                logger.error(f"Window {window.ids[0]}-{window.ids[-1]} failed: {e}")
+                parsed = None
+        if not parsed:
+            return None
+        wanted = set(window.ids)
+        parsed["segments"] = [s for s in parsed["segments"] if s.get("id") in wanted]
+        return parsed
+
+    async def run(self, segments: List[Dict], story: str) -> Tuple[Dict, List]:
+        """Return ({"segments", "story_arc_summary"}, [ids the model did not return])"""
+        windows = make_windows(segments, self.max_window_tokens, self.overlap)
+        logger.info(f"Enriching {len(segments)} segments in {len(windows)} windows")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*(self._run_window(semaphore, w, story) for w in windows))
+
+        merged_segments = [s for r in results if r for s in r["segments"]]
+        returned = {s["id"] for s in merged_segments}
+        missing = [s["id"] for s in segments if s["id"] not in returned]
+        return (
+            {
+                "segments": merged_segments,
+                "story_arc_summary": merge_story_arcs([r.get("story_arc_summary") for r in results if r]),
+            },
+            missing,
+        )
@@ -0,0 +1,5 @@
+"""Helpers shared by the example folders (model clients, caches, asset store, waits).
+
+Installed with the project (``uv sync`` or ``pip install -e .``), so every
+script imports them as ``autogen_course.<module>`` whatever folder it runs from.
+"""
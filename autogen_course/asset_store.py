@@ -0,0 +1,130 @@
+# asset_store.py
+from pathlib import Path
+from typing import List, Optional, Union
+import hashlib
+import json
+import os
+import shutil
+
+# Shared by every script folder so a stock photo is stored once per machine.
+DEFAULT_STORE_DIR = Path(__file__).resolve().parent.parent / "asset_store"
+
+
+def file_sha256(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AssetStore:
+    """Content-addressed store for downloaded images.
+
+    Every file is kept once under ``blobs/<sha[:2]>/<sha><ext>``. A small JSON
+    index maps source URL -> blob and (project, segment id) -> blob + query +
+    URL, so all lookups are dictionary hits. Project folders get hardlinks to
+    the blobs instead of copies, falling back to a copy where hardlinks are
+    not possible.
+    """
+
+    def __init__(self, root: Union[str, Path] = DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.json"
+        self.index = {"blobs": {}, "urls": {}, "segments": {}}
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+
+    def _save(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def blob_path(self, sha: str) -> Path:
+        ext = self.index["blobs"][sha]["ext"]
+        return self.blob_dir / sha[:2] / f"{sha}{ext}"
+
+    def put_file(
+        self,
+        path: Union[str, Path],
+        url: Optional[str] = None,
+        query: Optional[str] = None,
+        project: Optional[str] = None,
+        segment_id: Optional[str] = None,
+        move: bool = True,
+    ) -> str:
+        """Add a file to the store (deduplicated by content) and return its sha256"""
+        path = Path(path)
+        sha = file_sha256(path)
+        if sha not in self.index["blobs"]:
+            self.index["blobs"][sha] = {"ext": path.suffix.lower() or ".jpg", "size": path.stat().st_size}
+            target = self.blob_path(sha)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if move:
+                shutil.move(str(path), str(target))
+            else:
+                shutil.copy2(path, target)
+        elif move:
+            path.unlink()
+
+        if url:
+            self.index["urls"][url] = sha
+        if project is not None and segment_id is not None:
+            self.index["segments"][f"{project}/{segment_id}"] = {
+                "sha": sha,
+                "query": query,
+                "url": url,
+            }
+        self._save()
+        return sha
+
+    def get_by_url(self, url: str) -> Optional[str]:
+        return self.index["urls"].get(url)
+
+    def get_segment(self, project: str, segment_id: str) -> Optional[dict]:
+        return self.index["segments"].get(f"{project}/{segment_id}")
+
+    def assign(self, sha: str, project: str, segment_id: str, query: Optional[str] = None, url: Optional[str] = None):
+        """Record an already stored blob as the image for a segment"""
+        self.index["segments"][f"{project}/{segment_id}"] = {"sha": sha, "query": query, "url": url}
+        self._save()
+
+    def link(self, sha: str, dest: Union[str, Path]) -> Path:
+        """Hardlink a blob to ``dest`` (copy if hardlinking fails)"""
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if dest.exists():
+            dest.unlink()
+        try:
+            os.link(self.blob_path(sha), dest)
+        except OSError:
+            shutil.copy2(self.blob_path(sha), dest)
+        return dest
+
+    def fetch_to(
+        self,
+        project_dir: Union[str, Path],
+        name: str,
+        url: Optional[str] = None,
+        query: Optional[str] = None,
+        download_dir: Optional[Union[str, Path]] = None,
+    ) -> List[Path]:
+        """Move a browser download into the store and link it as ``images/<name>.jpg``
+
+        ``download_dir`` defaults to ``<project_dir>/image_downloads``; the
+        project folder's name keys the segment entry. Each file is stored once,
+        the project only gets a hardlink.
+        """
+        project_dir = Path(project_dir)
+        download_dir = Path(download_dir) if download_dir is not None else project_dir / "image_downloads"
+        linked = []
+        for file in download_dir.iterdir():
+            if file.is_file():
+                sha = self.put_file(file, url=url, query=query, project=project_dir.name, segment_id=name)
+                linked.append(self.link(sha, project_dir / "images" / f"{name}.jpg"))
+                print(f"Stored {file.name} as {sha[:12]} → {linked[-1]}")
+        return linked
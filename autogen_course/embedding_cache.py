@@ -0,0 +1,241 @@
+# embedding_cache.py
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Set, Tuple, Union
+import atexit
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+from filelock import FileLock
+
+logger = logging.getLogger(__name__)
+
+# Shared by every script folder so the same title is only embedded once.
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "embeddings"
+
+# encode() options the cached vectors already satisfy; other values would change the output
+FIXED_OPTIONS = {"convert_to_numpy": True, "normalize_embeddings": True}
+
+
+class EmbeddingCache:
+    """Persistent on-disk embedding store, drop-in for ``SentenceTransformer.encode``.
+
+    Vectors live in a memory-mapped float32 array (``vectors.f32``) and an
+    ``index.json`` maps sha256(model name + text) to a row. Least recently used
+    rows are recycled once ``max_entries`` is reached. Embeddings are always
+    L2-normalized, so cosine similarity is a plain dot product. The
+    SentenceTransformer model is only loaded when a text is missing from the
+    cache.
+
+    Several processes can share one cache directory: row allocation and index
+    writes happen under ``index.lock``, after re-reading an index that another
+    process has rewritten.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR,
+        max_entries: int = 50_000,
+        model=None,
+    ):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._model = model
+        self.cache_dir = Path(cache_dir) / model_name.replace("/", "__")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / "index.json"
+        self.vectors_path = self.cache_dir / "vectors.f32"
+        self._lock = FileLock(str(self.cache_dir / "index.lock"))
+
+        self.hits = 0
+        self.misses = 0
+        self.dim: Optional[int] = None
+        self.capacity = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> row, LRU first
+        self._free_rows: List[int] = []
+        self._vectors: Optional[np.memmap] = None
+        self._dirty = False
+        # keys read since the last save, so a reload keeps their LRU position
+        self._touched: Set[str] = set()
+        self._stamp: Optional[Tuple[int, int, int]] = None
+
+        with self._lock:
+            self._load()
+        atexit.register(self.save)
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            logger.info(f"Loading embedding model {self.model_name}")
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _index_stamp(self) -> Optional[Tuple[int, int, int]]:
+        # the index is replaced (new inode) on every write
+        try:
+            stat = self.index_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        """Read the index from disk; call with the lock held"""
+        if not self.index_path.exists() or not self.vectors_path.exists():
+            return
+        with self.index_path.open("r", encoding="utf-8") as f:
+            index = json.load(f)
+        self._stamp = self._index_stamp()
+        self.dim = index["dim"]
+        capacity = max(index["capacity"], self.max_entries)
+        if self._vectors is None or capacity > self.capacity:
+            self._open_vectors(capacity)
+        self._entries = OrderedDict((key, row) for key, row in index["entries"])
+        for key in self._touched:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        used = set(self._entries.values())
+        self._free_rows = [row for row in range(self.capacity) if row not in used]
+        while len(self._entries) > self.max_entries:
+            self._evict()
+
+    def _refresh(self) -> None:
+        """Reload the index if another process rewrote it; call with the lock held"""
+        if self._index_stamp() != self._stamp:
+            self._load()
+
+    def _open_vectors(self, capacity: int) -> None:
+        """Open (and grow if needed) the memory-mapped vector file"""
+        size = capacity * self.dim * np.dtype(np.float32).itemsize
+        if not self.vectors_path.exists() or self.vectors_path.stat().st_size < size:
+            with self.vectors_path.open("ab") as f:
+                f.truncate(size)
+        self._vectors = np.memmap(
+            self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim)
+        )
+        self._free_rows.extend(range(self.capacity, capacity))
+        self.capacity = capacity
+
+    def _evict(self) -> None:
+        _, row = self._entries.popitem(last=False)
+        self._free_rows.append(row)
+        self._dirty = True
+
+    def _store(self, key: str, vector: np.ndarray) -> None:
+        if self._vectors is None:
+            self.dim = int(vector.shape[0])
+            self._open_vectors(self.max_entries)
+        if len(self._entries) >= self.max_entries:
+            self._evict()
+        row = self._free_rows.pop()
+        self._vectors[row] = vector
+        self._entries[key] = row
+        self._dirty = True
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 64,
+        show_progress_bar: Optional[bool] = None,
+        **kwargs,
+    ) -> np.ndarray:
+        """Return normalized float32 embeddings, computing only uncached texts.
+
+        A single string gives a 1-D vector and a list gives a 2-D array, like
+        ``SentenceTransformer.encode``. Options that would change the vectors
+        (``convert_to_tensor``, ``normalize_embeddings=False``, ...) raise
+        TypeError instead of being ignored.
+        """
+        for name, value in kwargs.items():
+            if name not in FIXED_OPTIONS or FIXED_OPTIONS[name] != value:
+                raise TypeError(
+                    f"EmbeddingCache.encode does not support {name}={value!r}; "
+                    "it always returns normalized float32 numpy arrays"
+                )
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        keys = [self._key(text) for text in texts]
+
+        cached = {}
+        missing = {}
+        with self._lock:
+            self._refresh()
+            for key, text in zip(keys, texts):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self._touched.add(key)
+                    self._dirty = True
+                    # copy out: another process may recycle the row once the lock is released
+                    cached[key] = np.array(self._vectors[self._entries[key]])
+                elif key not in missing:
+                    missing[key] = text
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        if missing:
+            computed = self.model.encode(
+                list(missing.values()),
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            ).astype(np.float32)
+            fresh = dict(zip(missing, computed))
+        else:
+            fresh = {}
+
+        if not texts:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+
+        result = np.stack([fresh[key] if key in fresh else cached[key] for key in keys])
+        if fresh:
+            with self._lock:
+                self._refresh()
+                for key, vector in fresh.items():
+                    if key not in self._entries:
+                        self._store(key, vector)
+                self.save()
+        return result[0] if single else result
+
+    def save(self) -> None:
+        """Flush vectors and write the index atomically"""
+        if not self._dirty or self._vectors is None:
+            return
+        with self._lock:
+            # another process may have added rows since this one last read the index
+            self._refresh()
+            self._write_index()
+
+    def _write_index(self) -> None:
+        self._vectors.flush()
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "model": self.model_name,
+                    "dim": self.dim,
+                    "capacity": self.capacity,
+                    "entries": list(self._entries.items()),
+                },
+                f,
+            )
+        os.replace(tmp_path, self.index_path)
+        self._stamp = self._index_stamp()
+        self._touched.clear()
+        self._dirty = False
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,56 @@
+# image_matcher.py
+from typing import List, Tuple
+import numpy as np
+
+
+class ImageMatcher:
+    """Match image suggestions against candidate images in one batched pass.
+
+    All suggestions and all candidate names are encoded with one ``encode``
+    call each, and the full suggestion x image cosine matrix comes from a
+    single matrix multiply of L2-normalized embeddings.
+    """
+
+    def __init__(self, model):
+        # Anything with a SentenceTransformer-style ``encode`` (e.g. EmbeddingCache)
+        self.model = model
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.asarray(self.model.encode(texts), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def similarity(self, suggestions: List[str], images: List[dict]) -> np.ndarray:
+        """Cosine similarity matrix of shape (len(suggestions), len(images))"""
+        if not suggestions or not images:
+            return np.zeros((len(suggestions), len(images)), dtype=np.float32)
+        suggestion_embeddings = self._encode(suggestions)
+        image_embeddings = self._encode([image["name"] for image in images])
+        return suggestion_embeddings @ image_embeddings.T
+
+    def top_k(
+        self, suggestions: List[str], images: List[dict], k: int = 3
+    ) -> List[List[Tuple[dict, float]]]:
+        """Best ``k`` images per suggestion, highest score first"""
+        scores = self.similarity(suggestions, images)
+        k = min(k, len(images))
+        if k == 0:
+            return [[] for _ in suggestions]
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        return [
+            [(images[j], float(scores[i, j])) for j in row]
+            for i, row in enumerate(top)
+        ]
+
+    def best(self, suggestions: List[str], images: List[dict]) -> Tuple[str, dict, float]:
+        """The single best (suggestion, image, score) over all suggestions"""
+        scores = self.similarity(suggestions, images)
+        if scores.size == 0:
+            return None, None, -1.0
+        i, j = np.unravel_index(np.argmax(scores), scores.shape)
+        return suggestions[i], images[j], float(scores[i, j])
@@ -0,0 +1,277 @@
+# model_clients.py
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import time
+
+import httpx
+from autogen_core.models import ChatCompletionClient, CreateResult, ModelInfo, RequestUsage
+from autogen_ext.models.cache import ChatCompletionCache
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.response_cache import SqliteCacheStore
+
+DEFAULT_MODEL = "gemma-3-1b-it-GGUF"
+DEFAULT_BASE_URL = "http://localhost:8080/v1"
+# match llama.cpp's --parallel slot count; extra requests queue here instead of on the server
+DEFAULT_MAX_IN_FLIGHT = 4
+
+DEFAULT_MODEL_INFO: ModelInfo = {
+    "vision": False,
+    "function_calling": True,
+    "json_output": True,
+    "family": "",
+    "structured_output": True,
+}
+
+
+class ClientStats:
+    """Request counters and latency samples for one client"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.queue_ms: List[float] = []
+        self.latency_ms: List[float] = []
+
+    @classmethod
+    def combine(cls, parts: List["ClientStats"]) -> "ClientStats":
+        """One ClientStats holding the counters and samples of all ``parts``"""
+        total = cls()
+        for part in parts:
+            total.requests += part.requests
+            total.errors += part.errors
+            total.in_flight += part.in_flight
+            total.queue_ms.extend(part.queue_ms)
+            total.latency_ms.extend(part.latency_ms)
+        return total
+
+    def percentile(self, p: float) -> float:
+        if not self.latency_ms:
+            return 0.0
+        ordered = sorted(self.latency_ms)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "avg_queue_ms": round(sum(self.queue_ms) / len(self.queue_ms), 1) if self.queue_ms else 0.0,
+            "p50_ms": round(self.percentile(50), 1),
+            "p95_ms": round(self.percentile(95), 1),
+        }
+
+
+class PooledChatCompletionClient(ChatCompletionClient):
+    """ChatCompletionClient wrapper that shares a concurrency cap with every
+    other client talking to the same server and records its own stats
+    (clients registered under the same name and model share one counter).
+
+    ``close()`` is a no-op: the underlying HTTP pool is shared, so it is
+    closed once by ``close_all()``.
+    """
+
+    def __init__(self, name: str, inner: ChatCompletionClient, semaphore: asyncio.Semaphore, stats: ClientStats):
+        self.name = name
+        self.inner = inner
+        self.stats = stats
+        self._semaphore = semaphore
+
+    async def create(self, *args, **kwargs) -> CreateResult:
+        queued = time.perf_counter()
+        async with self._semaphore:
+            started = time.perf_counter()
+            self.stats.queue_ms.append((started - queued) * 1000)
+            self.stats.requests += 1
+            self.stats.in_flight += 1
+            try:
+                return await self.inner.create(*args, **kwargs)
+            except Exception:
+                self.stats.errors += 1
+                raise
+            finally:
+                self.stats.in_flight -= 1
+                self.stats.latency_ms.append((time.perf_counter() - started) * 1000)
+
+    async def create_stream(self, *args, **kwargs) -> AsyncGenerator[Any, None]:
+        # the slot stays taken until the last chunk has arrived
+        queued = time.perf_counter()
+        async with self._semaphore:
+            started = time.perf_counter()
+            self.stats.queue_ms.append((started - queued) * 1000)
+            self.stats.requests += 1
+            self.stats.in_flight += 1
+            try:
+                async for chunk in self.inner.create_stream(*args, **kwargs):
+                    yield chunk
+            except Exception:
+                self.stats.errors += 1
+                raise
+            finally:
+                self.stats.in_flight -= 1
+                self.stats.latency_ms.append((time.perf_counter() - started) * 1000)
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self.inner.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self.inner.total_usage()
+
+    def count_tokens(self, *args, **kwargs) -> int:
+        return self.inner.count_tokens(*args, **kwargs)
+
+    def remaining_tokens(self, *args, **kwargs) -> int:
+        return self.inner.remaining_tokens(*args, **kwargs)
+
+    @property
+    def capabilities(self):
+        return self.inner.capabilities
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self.inner.model_info
+
+
+# one keep-alive pool and one in-flight cap per server, shared by every client
+_http_clients: Dict[str, httpx.AsyncClient] = {}
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+_registry: Dict[Tuple, ChatCompletionClient] = {}
+# stats and cache stores are keyed by (name, model, base_url); stats() groups them by name or by model
+_stats: Dict[Tuple[str, str, str], ClientStats] = {}
+_stores: Dict[Tuple[str, str, str], List[SqliteCacheStore]] = {}
+
+
+def cache_namespace(model: str, response_format: Any = None) -> str:
+    """Cache namespace for a model + response schema pair.
+
+    ChatCompletionCache keys only cover the messages and create arguments, so
+    the model and the structured output schema have to be part of the store.
+    """
+    if isinstance(response_format, type) and hasattr(response_format, "model_json_schema"):
+        schema = response_format.model_json_schema()
+    else:
+        schema = response_format
+    digest = hashlib.sha256(json.dumps(schema, sort_keys=True, default=str).encode("utf-8"))
+    return f"{model}:{digest.hexdigest()[:16]}"
+
+
+def _http_client(base_url: str, max_in_flight: int) -> httpx.AsyncClient:
+    client = _http_clients.get(base_url)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=max_in_flight,
+                max_keepalive_connections=max_in_flight,
+                keepalive_expiry=60.0,
+            ),
+        )
+        _http_clients[base_url] = client
+    return client
+
+
+def get_client(
+    name: str = "default",
+    response_format: Any = None,
+    model: str = DEFAULT_MODEL,
+    base_url: str = DEFAULT_BASE_URL,
+    model_info: Optional[ModelInfo] = None,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    cache: bool = True,
+    validate: Optional[Callable[[str], Any]] = None,
+    **kwargs,
+) -> ChatCompletionClient:
+    """Return the registered client for these settings, creating it on first use.
+
+    Clients with the same name, model, server and response format are the same
+    object, so agents built in different places share one connection pool.
+    With ``cache`` on, identical requests are answered from the SQLite
+    response cache without touching the server (or its in-flight slots).
+    ``validate(text)`` is the caller's parser: a reply it raises on is not
+    cached, so a retry reaches the server. It defaults to the schema check
+    when ``response_format`` is a pydantic model.
+    """
+    if validate is None and isinstance(response_format, type) and hasattr(response_format, "model_validate_json"):
+        validate = response_format.model_validate_json
+    # schemas passed as dicts are rebuilt on every call, so key on their content
+    key = (name, model, base_url, cache_namespace(model, response_format), cache, validate)
+    client = _registry.get(key)
+    if client is not None:
+        return client
+
+    options = dict(kwargs)
+    if response_format is not None:
+        options["response_format"] = response_format
+    inner = OpenAIChatCompletionClient(
+        model=model,
+        base_url=base_url,
+        api_key="placeholder",
+        model_info=model_info or DEFAULT_MODEL_INFO,
+        http_client=_http_client(base_url, max_in_flight),
+        **options,
+    )
+    semaphore = _semaphores.setdefault(base_url, asyncio.Semaphore(max_in_flight))
+    client_stats = _stats.setdefault((name, model, base_url), ClientStats())
+    client = PooledChatCompletionClient(name, inner, semaphore, client_stats)
+    if cache:
+        store = SqliteCacheStore(namespace=cache_namespace(model, response_format), validate=validate)
+        _stores.setdefault((name, model, base_url), []).append(store)
+        client = ChatCompletionCache(client, store=store)
+    _registry[key] = client
+    return client
+
+
+def stats(by_model: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Request stats per client name, or per ``model@base_url`` with ``by_model``.
+
+    Cache hits/misses are summed over the stores of each group.
+    """
+    groups: Dict[str, List[Tuple[str, str, str]]] = {}
+    for key in _stats:
+        name, model, base_url = key
+        groups.setdefault(f"{model}@{base_url}" if by_model else name, []).append(key)
+
+    summary = {}
+    for label, keys in groups.items():
+        entry = ClientStats.combine([_stats[key] for key in keys]).summary()
+        stores = [store for key in keys for store in _stores.get(key, [])]
+        if stores:
+            entry["cache"] = {
+                "hits": sum(store.hits for store in stores),
+                "misses": sum(store.misses for store in stores),
+            }
+        summary[label] = entry
+    return summary
+
+
+def report(by_model: bool = False) -> str:
+    summary = stats(by_model)
+    width = max([len(label) for label in summary] + [24]) + 2
+    lines = [
+        f"{'model' if by_model else 'client':<{width}}{'requests':>10}{'errors':>8}{'queue ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'cache hit':>11}{'cache miss':>12}"
+    ]
+    for label, s in summary.items():
+        cache = s.get("cache", {})
+        lines.append(
+            f"{label:<{width}}{s['requests']:>10}{s['errors']:>8}"
+            f"{s['avg_queue_ms']:>10}{s['p50_ms']:>10}{s['p95_ms']:>10}"
+            f"{cache.get('hits', '-'):>11}{cache.get('misses', '-'):>12}"
+        )
+    return "\n".join(lines)
+
+
+async def close_all():
+    """Close the shared HTTP pools and forget every registered client"""
+    for client in _http_clients.values():
+        await client.aclose()
+    _http_clients.clear()
+    _semaphores.clear()
+    _registry.clear()
+    _stats.clear()
+    _stores.clear()
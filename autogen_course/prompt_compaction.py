@@ -0,0 +1,100 @@
+# prompt_compaction.py
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Pixabay titles look like "Free Man Sad photo and picture"
+_BOILERPLATE_PREFIX = re.compile(r"^\s*free\s+", re.IGNORECASE)
+_BOILERPLATE_SUFFIX = re.compile(
+    r"\s+(?:photo|image|illustration|vector|picture|graphic)s?"
+    r"(?:\s+(?:(?:and|&)\s+)?(?:photo|image|picture|graphic)s?)?\s*$",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token, good enough to compare two encodings
+    return len(text) // 4 + 1
+
+
+def clean_name(name: str) -> str:
+    """Strip stock-site boilerplate and tabs from an image title"""
+    name = _BOILERPLATE_PREFIX.sub("", name or "")
+    name = _BOILERPLATE_SUFFIX.sub("", name)
+    return " ".join(name.replace("\t", " ").split())
+
+
+class CompactionStats:
+    """Running totals of prompt tokens before/after compaction"""
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def record(self, before: int, after: int):
+        self.calls += 1
+        self.tokens_before += before
+        self.tokens_after += after
+
+    def summary(self) -> Dict[str, Any]:
+        saved = self.tokens_before - self.tokens_after
+        return {
+            "calls": self.calls,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "saved_pct": round(100 * saved / self.tokens_before, 1) if self.tokens_before else 0.0,
+        }
+
+
+stats = CompactionStats()
+
+
+class CandidateTable:
+    """Image candidates as a small ``id<TAB>name`` table for prompts.
+
+    Rows get consecutive integer ids (or keep the images' own ``id`` when
+    ``id_key`` is given), names are cleaned of stock boilerplate and URLs are
+    left out entirely. Replies that refer to ids are mapped back with
+    ``image()`` / ``url()``.
+    """
+
+    def __init__(
+        self,
+        images: List[dict],
+        name_key: str = "name",
+        url_key: str = "contentUrl",
+        id_key: Optional[str] = None,
+    ):
+        self.name_key = name_key
+        self.url_key = url_key
+        self.images: Dict[int, dict] = {}
+        for index, img in enumerate(images):
+            image_id = int(img[id_key]) if id_key else index
+            self.images[image_id] = img
+
+    def render(self) -> str:
+        rows = [f"{image_id}\t{clean_name(img.get(self.name_key, ''))}" for image_id, img in self.images.items()]
+        return "id\tname\n" + "\n".join(rows)
+
+    def image(self, image_id: int) -> dict:
+        if image_id not in self.images:
+            raise ValueError(f"Unknown image id {image_id}")
+        return self.images[image_id]
+
+    def url(self, image_id: int) -> str:
+        return self.image(image_id)[self.url_key]
+
+    def report(self, label: str = "candidates") -> Dict[str, int]:
+        """Log and record tokens saved versus ``json.dumps(images, indent=2)``"""
+        before = estimate_tokens(json.dumps(list(self.images.values()), indent=2))
+        after = estimate_tokens(self.render())
+        stats.record(before, after)
+        logger.info(
+            f"Prompt compaction ({label}): {len(self.images)} images, "
+            f"~{before} -> ~{after} tokens ({100 * (before - after) // max(before, 1)}% saved)"
+        )
+        return {"before": before, "after": after}
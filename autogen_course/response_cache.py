@@ -0,0 +1,191 @@
+# response_cache.py
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+import json
+import sqlite3
+import time
+
+from autogen_core import CacheStore
+from autogen_core.models import CreateResult
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "llm_responses.sqlite"
+
+
+def _dump(value: Any) -> str:
+    # ChatCompletionCache stores a CreateResult for create() and the list of
+    # streamed chunks (str) ending in a CreateResult for create_stream()
+    if isinstance(value, CreateResult):
+        return json.dumps({"result": value.model_dump(mode="json")})
+    return json.dumps(
+        {
+            "stream": [
+                item.model_dump(mode="json") if isinstance(item, CreateResult) else item
+                for item in value
+            ]
+        }
+    )
+
+
+def _reply_text(value: Any) -> Optional[str]:
+    result = value if isinstance(value, CreateResult) else next(
+        (item for item in reversed(value) if isinstance(item, CreateResult)), None
+    )
+    if result is None or not isinstance(result.content, str):
+        return None
+    return result.content
+
+
+def _load(payload: str) -> Any:
+    data = json.loads(payload)
+    if "result" in data:
+        return CreateResult.model_validate(data["result"])
+    return [
+        CreateResult.model_validate(item) if isinstance(item, dict) else item
+        for item in data["stream"]
+    ]
+
+
+class SqliteCacheStore(CacheStore):
+    """SQLite backed store for ``autogen_ext.models.cache.ChatCompletionCache``.
+
+    Entries live in one table keyed by ``(namespace, key)``. The namespace
+    separates models and response schemas, because ChatCompletionCache only
+    hashes the messages and create arguments. Entries older than ``ttl``
+    seconds are treated as misses. Once the table grows past ``max_bytes``
+    the least recently used entries are evicted.
+
+    With ``validate`` set, a text reply is only stored if ``validate(text)``
+    does not raise (pass the caller's own parser), so a bad reply never comes
+    back from the cache on a retry. Stored replies that no longer validate
+    are dropped on read.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "",
+        path: Union[str, Path] = DEFAULT_CACHE_PATH,
+        ttl: Optional[float] = 7 * 24 * 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+        validate: Optional[Callable[[str], Any]] = None,
+    ):
+        self.namespace = namespace
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.validate = validate
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._conn.execute(
+            "SELECT value, created FROM responses WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        now = time.time()
+        if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+            self.misses += 1
+            return default
+
+        value = _load(row[0])
+        if not self._accepts(value):
+            # stored before this validator existed (or by a laxer one)
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE namespace = ? AND key = ?", (self.namespace, key)
+                )
+            self.evictions += 1
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        with self._conn:
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if not self._accepts(value):
+            self.rejected += 1
+            return
+        payload = _dump(value)
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, payload, len(payload), now, now),
+            )
+        self._evict()
+
+    def _accepts(self, value: Any) -> bool:
+        text = _reply_text(value)
+        if self.validate is None or text is None:
+            return True
+        try:
+            self.validate(text)
+        except Exception:
+            return False
+        return True
+
+    def _evict(self):
+        with self._conn:
+            if self.ttl is not None:
+                self.evictions += self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+                ).rowcount
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # drop least recently used rows until the table fits again
+            freed = 0
+            stale = []
+            for namespace, key, size in self._conn.execute(
+                "SELECT namespace, key, size FROM responses ORDER BY accessed"
+            ):
+                if total - freed <= self.max_bytes:
+                    break
+                stale.append((namespace, key))
+                freed += size
+            self._conn.executemany("DELETE FROM responses WHERE namespace = ? AND key = ?", stale)
+            self.evictions += len(stale)
+
+    def clear(self):
+        with self._conn:
+            self._conn.execute("DELETE FROM responses WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses WHERE namespace = ?",
+            (self.namespace,),
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "rejected": self.rejected,
+            "entries": entries,
+            "bytes": size,
+        }
+
@@ -0,0 +1,166 @@
+# structured_output.py
+from typing import Any, Dict, Generic, List, Tuple, Type, TypeVar
+import logging
+import re
+
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def json_schema_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """OpenAI-style ``response_format`` that llama.cpp compiles into a grammar.
+
+    Passing this dict (rather than the pydantic class) keeps the raw completion
+    text in our hands, so a truncated reply can still be repaired locally
+    instead of being rejected inside the client.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "schema": model.model_json_schema(),
+            "strict": True,
+        },
+    }
+
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*(?:```|$)", re.DOTALL)
+_DANGLING_KEY = re.compile(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$')
+
+
+def repair_json(text: str) -> str:
+    """Best-effort fix for slightly broken model JSON.
+
+    Strips code fences and text around the top-level value, drops trailing
+    commas, and closes an unterminated string, a dangling key and any open
+    brackets left by a truncated completion.
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return text
+    text = text[min(starts):]
+
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if not stack:
+                break
+            # drop a trailing comma before the closing bracket
+            while out and out[-1] in " \t\r\n":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack[-1] != char:
+                char = stack[-1]
+            stack.pop()
+            out.append(char)
+            if not stack:
+                break
+            continue
+        out.append(char)
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    repaired = "".join(out).rstrip()
+    if stack:
+        if stack[-1] == "}":
+            # a key cut off before its value ("key" or "key":) is dropped
+            repaired = _DANGLING_KEY.sub(r"\1", repaired)
+        repaired = repaired.rstrip().rstrip(",") + "".join(reversed(stack))
+    return repaired
+
+
+class StructuredOutputMetrics:
+    """How often replies parsed cleanly, needed a repair, or needed a re-ask"""
+
+    def __init__(self):
+        self.parsed = 0
+        self.repaired = 0
+        self.failed = 0
+        self.retries = 0
+
+    def record_retry(self, retry_state=None):
+        # usable directly as a tenacity ``before_sleep`` hook
+        self.retries += 1
+
+    def summary(self) -> Dict[str, Any]:
+        total = self.parsed + self.repaired + self.failed
+        return {
+            "replies": total,
+            "clean": self.parsed,
+            "repaired": self.repaired,
+            "failed": self.failed,
+            "retries": self.retries,
+            "repair_rate": round(self.repaired / total, 3) if total else 0.0,
+            "retry_rate": round(self.retries / total, 3) if total else 0.0,
+        }
+
+    def report(self) -> str:
+        return " | ".join(f"{key}: {value}" for key, value in self.summary().items())
+
+
+metrics = StructuredOutputMetrics()
+
+
+class StructuredOutput(Generic[T]):
+    """Validate model replies against a pydantic schema, repairing before failing"""
+
+    def __init__(self, model: Type[T], stats: StructuredOutputMetrics = metrics):
+        self.model = model
+        self.stats = stats
+
+    @property
+    def response_format(self) -> Dict[str, Any]:
+        return json_schema_format(self.model)
+
+    def _validate(self, text: str) -> Tuple[T, bool]:
+        """Return (result, whether it needed a repair); ValueError if unusable"""
+        try:
+            return self.model.model_validate_json(text), False
+        except ValidationError as first_error:
+            error = first_error
+        try:
+            return self.model.model_validate_json(repair_json(text)), True
+        except ValidationError:
+            # ValueError so callers' retry policies treat it like a bad reply
+            raise ValueError(f"{self.model.__name__} reply invalid after repair: {error}") from None
+
+    def check(self, text: str) -> T:
+        """``parse`` without touching the metrics; meant as the cache ``validate`` hook"""
+        return self._validate(text)[0]
+
+    def parse(self, text: str) -> T:
+        try:
+            result, repaired = self._validate(text)
+        except ValueError:
+            self.stats.failed += 1
+            raise
+        if repaired:
+            self.stats.repaired += 1
+            logger.info(f"Repaired malformed {self.model.__name__} reply locally")
+        else:
+            self.stats.parsed += 1
+        return result
@@ -0,0 +1,116 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import quote
+import asyncio
+import bisect
+import time
+
+# Pixabay applies these filters straight from the search URL, no clicking needed.
+FILTER_PARAMS = "content_type=authentic&orientation=horizontal"
+
+
+def pixabay_search_url(query: str, filtered: bool = True) -> str:
+    url = f"https://pixabay.com/photos/search/{quote(query)}/"
+    return f"{url}?{FILTER_PARAMS}" if filtered else url
+
+
+class StepTimeout(asyncio.TimeoutError):
+    def __init__(self, name: str, timeout: float):
+        super().__init__(f"step '{name}' timed out after {timeout:.1f}s")
+        self.name = name
+        self.timeout = timeout
+
+
+class LatencyHistogram:
+    """Bucketed latency counts (milliseconds) plus raw samples for percentiles"""
+
+    BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 5000, 10000, float("inf"))
+
+    def __init__(self):
+        self.counts = [0] * len(self.BUCKETS_MS)
+        self.samples: List[float] = []
+        self.timeouts = 0
+
+    def record(self, elapsed_ms: float):
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, elapsed_ms)] += 1
+        self.samples.append(elapsed_ms)
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.samples)
+
+
+class WaitEngine:
+    """Event-driven waits with per-step timeouts and latency histograms.
+
+    Wrap any framework wait (``page.wait_for_selector``, ``tab.query(...,
+    timeout=...)``, ``page.wait_for_load_state("networkidle")``, a response
+    predicate...) in ``step`` instead of sleeping for a fixed time. Use
+    ``until`` to poll a condition. Every step is timed under its name so
+    ``report()`` shows where the time goes.
+    """
+
+    def __init__(self, default_timeout: float = 10.0):
+        self.default_timeout = default_timeout
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        return self.histograms.setdefault(name, LatencyHistogram())
+
+    async def step(self, name: str, awaitable: Awaitable, timeout: Optional[float] = None) -> Any:
+        timeout = self.default_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            self._histogram(name).timeouts += 1
+            raise StepTimeout(name, timeout) from None
+        finally:
+            self._histogram(name).record((time.perf_counter() - started) * 1000)
+
+    async def until(
+        self,
+        name: str,
+        predicate: Callable[[], Any],
+        timeout: Optional[float] = None,
+        interval: float = 0.1,
+    ) -> Any:
+        """Poll a (sync or async) predicate until it returns something truthy"""
+
+        async def poll():
+            while True:
+                value = predicate()
+                if asyncio.iscoroutine(value):
+                    value = await value
+                if value:
+                    return value
+                await asyncio.sleep(interval)
+
+        return await self.step(name, poll(), timeout)
+
+    def summary(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "count": len(h.samples),
+                "timeouts": h.timeouts,
+                "total_ms": round(h.total_ms, 1),
+                "p50_ms": round(h.percentile(50), 1),
+                "p95_ms": round(h.percentile(95), 1),
+                "buckets": dict(zip(map(str, LatencyHistogram.BUCKETS_MS), h.counts)),
+            }
+            for name, h in self.histograms.items()
+        }
+
+    def report(self) -> str:
+        lines = [f"{'step':<28}{'n':>5}{'timeouts':>10}{'p50 ms':>10}{'p95 ms':>10}{'total ms':>11}"]
+        for name, stats in self.summary().items():
+            lines.append(
+                f"{name:<28}{stats['count']:>5}{stats['timeouts']:>10}"
+                f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['total_ms']:>11}"
+            )
+        return "\n".join(lines)
@@ -1,11 +1,12 @@
 from __future__ import annotations
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client
 import asyncio
 import json
 from typing import List
 from pydantic import BaseModel
+from autogen_course.prompt_compaction import CandidateTable
 
 
 class RankedImage(BaseModel):
@@ -21,19 +22,7 @@ class ImageSuggestion(BaseModel):
 
 async def main():
     # setup model client
-    client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        response_format=ImageSuggestion,
-        model_info={
-            "vision": False,
-            "function_calling": True,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    client = get_client(name="film_director", response_format=ImageSuggestion)
 
     # call the assistant agent
     image_ranker = AssistantAgent(
@@ -98,7 +87,9 @@ async def main():
     # print(images)          # Python dict
     # print(type(images['name']))    # <class 'dict'>
     
-    selected = list(map(lambda x: {"id": x["id"], "name": x["name"]}, images))
+    # the prompt only carries id + name; the table maps ids back to URLs
+    table = CandidateTable(images, id_key="id")
+    table.report(keyword)
 
     # Professional adventure director's brief
     input_prompt = f"""
@@ -110,8 +101,8 @@ async def main():
     SPECIFIC MOMENT TO CAPTURE:
     "{keyword}"
     
-    IMAGE DATASET FOR CONSIDERATION:
-    {json.dumps(selected, indent=2)}
+    IMAGE DATASET FOR CONSIDERATION (id, name):
+    {table.render()}
     
     🎯 YOUR ROLE AS ADVENTURE DIRECTOR:
     You are selecting reference images for a crucial mountain climbing scene. Consider:
@@ -149,7 +140,7 @@ async def main():
     print("🏔️ Adventure image selection in progress...")
     print("📖 Story: The Dream of Eagle's Peak")
     print("🎭 Scene: First doubts on the mountain")
-    print(f"📸 Images to evaluate: {len(selected)}")
+    print(f"📸 Images to evaluate: {len(images)}")
 
     # Get professional-level response
     response = await Console(image_ranker.run_stream(task=input_prompt))
@@ -163,8 +154,8 @@ async def main():
         last_message = response.messages[-1].to_text()
 
         try:
-            if hasattr(last_message, "content") and last_message.content:
-                content = last_message.content
+            content = json.loads(last_message)
+            if content:
                 if isinstance(content, dict):
                     result = ImageSuggestion(**content)
 
@@ -188,7 +179,7 @@ async def main():
                             emoji = "🎒"
 
                         print(f"{i}. {emoji} {rating} - Score: {img.score:.1f}/10.0")
-                        print(f"   📷 Reference URL: {img.url}")
+                        print(f"   📷 Reference URL: {table.url(img.id)}")
                         print(
                             f"   🎬 Director's Note: {'Perfect struggle moment' if img.score > 9.0 else 'Good emotional capture' if img.score > 8.0 else 'Works with context'}"
                         )
@@ -1,11 +1,12 @@
 from __future__ import annotations
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_course.model_clients import get_client, report, close_all
 import asyncio
 from typing import List
 
 from pydantic import BaseModel
+from autogen_course.structured_output import StructuredOutput, json_schema_format, metrics
 
 
 class Hook(BaseModel):
@@ -43,19 +44,7 @@ class Model(BaseModel):
 
 #  call the  openai client
 async def main():
-    model_client = OpenAIChatCompletionClient(
-        model="gemma-3-1b-it-GGUF",
-        base_url="http://localhost:8080/v1",
-        api_key="placeholder",
-        response_format=Model,
-        model_info={
-            "vision": False,
-            "function_calling": True,
-            "json_output": True,
-            "family": "",
-            "structured_output": True,
-        },
-    )
+    model_client = get_client(name="keyword_agent", response_format=json_schema_format(Model))
 
     #  call assitant agent and pass the system prompt
 
@@ -148,6 +137,17 @@ Tag someone who needs to hear this.
 
     print("Response: ", response.messages[-1])
 
+    try:
+        result = StructuredOutput(Model).parse(response.messages[-1].to_text())
+        for part in ("Hook", "Middle", "End"):
+            print(f"{part}: {getattr(result, part).BrollKeywords}")
+    except ValueError as e:
+        print("Error parsing JSON response:", e)
+
+    print(report())
+    print(metrics.report())
+    await close_all()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
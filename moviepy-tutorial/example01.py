@@ -12,6 +12,8 @@ from moviepy import (
 
 import os
 
+from preview import active_profile
+
 # C:\Users\admin\projects\python-project\autogen-course\moviepy-learning-material\8928261-uhd_3840_2160_25fps.mp4
 
 # Get the current working directory
@@ -30,7 +32,9 @@ print(f"File mp4: {file_path}")
 
 
 # Load video and audio clips
-video = VideoFileClip(filename=file_path)
+# --preview reads a cached quarter-size proxy of the 4K source instead
+profile = active_profile()
+video = VideoFileClip(filename=profile.proxy(file_path))
 audio = AudioFileClip("audio.wav")
 
 
@@ -54,11 +58,11 @@ video = video.with_duration(audio.duration)
 
 output_dir = os.path.join(current_dir, "moviepy-learning-material-output")
 os.makedirs(output_dir, exist_ok=True)
-output_file = os.path.join(output_dir, "sample01.mp4")
+output_file = profile.output_path(os.path.join(output_dir, "sample01.mp4"))
 
 print(f"output path created {output_file}")
 
 
 
 # Write final video
-video.write_videofile(filename=output_file, fps=24, audio_codec="aac")
\ No newline at end of file
+video.write_videofile(filename=output_file, **profile.write_kwargs(fps=24, audio_codec="aac"))
\ No newline at end of file
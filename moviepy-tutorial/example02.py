@@ -1,10 +1,13 @@
 import os
 from pathlib import Path
+from typing import Optional
 
 
-from moviepy import ImageClip
+from ken_burns import KenBurns
+from preview import FINAL, RenderProfile, active_profile
+from render_cache import RenderCache, default_cache
 
-def pan_and_zoom(image_path: str, duration: float = 5, output_path: str = "pan_zoom.mp4"):
+def pan_and_zoom(image_path: str, duration: float = 5, output_path: str = "pan_zoom.mp4", cache: Optional[RenderCache] = None, profile: RenderProfile = FINAL):
     """
     Creates a video from an image with a pan and zoom effect.
 
@@ -12,21 +15,35 @@ def pan_and_zoom(image_path: str, duration: float = 5, output_path: str = "pan_z
         image_path: Path to the input image.
         duration: Duration of the output video in seconds.
         output_path: Path to save the resulting video.
+        cache: Render cache; an unchanged image + settings reuses the last render.
+        profile: PREVIEW renders a low-res proxy quickly, FINAL the original.
     """
-    # Load image
-    clip = ImageClip(image_path, duration=duration)
-
-    # Apply zoom-in effect: scale from 1x to 1.2x
-    clip = clip.resized(lambda t: 1 + 0.2 * t / duration)
-
-    # Apply pan effect: move from left to right
-    clip = clip.with_position(lambda t: ('center', -50 * t / duration))  # vertical pan example
-
-    # Export video
-    clip.write_videofile(output_path, fps=24, codec="libx264")
+    image_path = profile.proxy(image_path)
+    write_kwargs = profile.write_kwargs(fps=24, codec="libx264")
+
+    def render(path):
+        # Zoom from 1x to 1.2x while panning down (vertical pan example)
+        kb = KenBurns(image_path, duration=duration, zoom_start=1.0, zoom_end=1.2)
+        # 50 px of the original image, so a proxy pans the same share of the frame
+        kb.center_end = (0.5, 0.5 + 50 * profile.scale / kb.src_h)
+        clip = kb.clip()
+
+        # Export video
+        clip.write_videofile(path, **write_kwargs)
+
+    recipe = {
+        "effect": "pan_and_zoom",
+        "duration": duration,
+        "zoom": [1.0, 1.2],
+        "pan_y": 50,
+        "write": write_kwargs,
+        "profile": profile.recipe(),
+    }
+    (cache or default_cache()).render(recipe, [image_path], profile.output_path(output_path), render)
 
 # Example usage
 if __name__ == "__main__":
     current_image = os.path.join(os.path.join(os.getcwd(),'images'),'1.jpg')
     current_work_dir = os.path.join(os.path.join(os.getcwd(),'moviepy-learning-material-output'),'pan_zoom.mp4')
-    pan_and_zoom(current_image, duration=5, output_path=current_work_dir)
+    # --preview renders a quarter-size draft; run without it for the final export
+    pan_and_zoom(current_image, duration=5, output_path=current_work_dir, profile=active_profile())
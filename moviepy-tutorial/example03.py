@@ -1,5 +1,9 @@
-from moviepy import ImageClip
 import os
+from typing import Optional
+
+from ken_burns import KenBurns
+from preview import FINAL, RenderProfile, active_profile
+from render_cache import RenderCache, default_cache
 
 
 def pan_and_zoom(
@@ -8,6 +12,8 @@ def pan_and_zoom(
     output_path: str = "pan_zoom.mp4",
     zoom_factor: float = 1.2,
     fps: int = 24,
+    cache: Optional[RenderCache] = None,
+    profile: RenderProfile = FINAL,
 ):
     """
     Creates a Ken Burns effect video from a single image.
@@ -18,32 +24,11 @@ def pan_and_zoom(
         output_path: Path to save the resulting video.
         zoom_factor: Final zoom scale (e.g., 1.2 = 20% zoom in).
         fps: Frames per second of the output video.
+        cache: Render cache; an unchanged image + settings reuses the last render.
+        profile: PREVIEW renders a low-res proxy quickly, FINAL the original.
     """
-    # Load image clip
-    clip = ImageClip(image_path)
-
-    # Calculate size zooming
-    w, h = clip.size
-    final_w, final_h = int(w * zoom_factor), int(h * zoom_factor)
-
-    # Apply resize (zoom) and position (pan) over time
-    def zoom_pos(t):
-        # Linear interpolation for size
-        scale = 1 + (zoom_factor - 1) * (t / duration)
-        new_w, new_h = int(w * scale), int(h * scale)
-        # Calculate position to keep it centered (pan slightly)
-        x = (w - new_w) // 2
-        y = (h - new_h) // 2
-        return (x, y)
-
-    clip = (
-        clip.resized(lambda t: 1 + (zoom_factor - 1) * t / duration)
-        .with_position(lambda t: ("center", "center"))
-        .with_duration(duration)
-    )
-
-    clip.write_videofile(
-        output_path,
+    image_path = profile.proxy(image_path)
+    write_kwargs = profile.write_kwargs(
         fps=fps,
         codec="libx264",
         preset="ultrafast",
@@ -51,6 +36,23 @@ def pan_and_zoom(
         ffmpeg_params=["-crf", "25"],
     )
 
+    def render(path):
+        # Centered zoom, sampled per frame from the pre-decoded still
+        clip = KenBurns(
+            image_path, duration=duration, zoom_start=1.0, zoom_end=zoom_factor
+        ).clip()
+        clip.write_videofile(path, **write_kwargs)
+
+    # threads only changes speed, not the pixels
+    recipe = {
+        "effect": "pan_and_zoom_centered",
+        "duration": duration,
+        "zoom_factor": zoom_factor,
+        "write": {k: v for k, v in write_kwargs.items() if k != "threads"},
+        "profile": profile.recipe(),
+    }
+    (cache or default_cache()).render(recipe, [image_path], profile.output_path(output_path), render)
+
 
 # Example usage
 if __name__ == "__main__":
@@ -60,5 +62,6 @@ if __name__ == "__main__":
     )
 
     pan_and_zoom(
-        current_image, duration=5, output_path=current_work_dir, zoom_factor=1.2
+        current_image, duration=5, output_path=current_work_dir, zoom_factor=1.2,
+        profile=active_profile(),
     )
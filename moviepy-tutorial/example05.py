@@ -3,7 +3,9 @@ from moviepy import VideoClip, ImageClip
 from moviepy.video.fx.Resize import Resize
 from moviepy.video.fx.FadeIn import FadeIn
 from moviepy.video.fx.FadeOut import FadeOut
-import numpy as np
+from ken_burns import KenBurns
+from preview import active_profile
+from render_cache import render_cached
 
 current_image = os.path.join(os.path.join(os.getcwd(), "images"), "1.jpg")
 
@@ -12,16 +14,13 @@ current_output = os.path.join(os.path.join(os.getcwd(), "moviepy-learning-materi
 # Create output directory if it doesn't exist
 os.makedirs(os.path.dirname(current_output), exist_ok=True)
 
-# Method 1: Ken Burns with animated resize using lambda function
-def ken_burns_effect(image_path, duration=5, zoom_start=1.0, zoom_end=1.3):
-    """Ken Burns effect using MoviePy 2.0 with_effects syntax"""
-    # Load image and set duration
-    clip = ImageClip(image_path).with_duration(duration)
-    
-    # Apply animated resize effect
-    ken_burns_clip = clip.with_effects([
-        Resize(lambda t: zoom_start + (zoom_end - zoom_start) * (t / duration))
-    ])
+# Method 1: Ken Burns with a per-frame crop window
+def ken_burns_effect(image_path, duration=5, zoom_start=1.0, zoom_end=1.3, size=None):
+    """Ken Burns effect rendered by KenBurns (crop window sampled per frame)"""
+    # size=(1920, 1080) renders a 4K still straight at 1080p
+    ken_burns_clip = KenBurns(
+        image_path, size=size, duration=duration, zoom_start=zoom_start, zoom_end=zoom_end
+    ).clip()
     
     # Optional: Add fade in/out
     ken_burns_clip = ken_burns_clip.with_effects([
@@ -32,48 +31,14 @@ def ken_burns_effect(image_path, duration=5, zoom_start=1.0, zoom_end=1.3):
     return ken_burns_clip
 
 # Method 2: Ken Burns with panning effect
-def ken_burns_with_pan(image_path, duration=5, zoom_factor=1.2, pan_distance=100):
+def ken_burns_with_pan(image_path, duration=5, zoom_factor=1.2, pan_distance=100, size=None, scale=1.0):
     """Ken Burns with both zoom and pan effects"""
-    clip = ImageClip(image_path).with_duration(duration)
-    
-    # Create a custom transformation for combined zoom and pan
-    def combined_effect(get_frame, t):
-        frame = get_frame(t)
-        
-        # Calculate current zoom
-        progress = t / duration
-        current_zoom = 1 + (zoom_factor - 1) * progress
-        
-        # Calculate pan position
-        pan_x = int(pan_distance * progress)
-        pan_y = int(pan_distance * 0.5 * progress)  # Move diagonally
-        
-        # Apply effects using Resize fx
-        from PIL import Image
-        pil_img = Image.fromarray(frame)
-        
-        # Resize (zoom)
-        new_width = int(pil_img.width * current_zoom)
-        new_height = int(pil_img.height * current_zoom)
-        resized = pil_img.resize((new_width, new_height), Image.LANCZOS)
-        
-        # Crop with pan offset
-        left = pan_x
-        top = pan_y
-        right = min(left + clip.w, new_width)
-        bottom = min(top + clip.h, new_height)
-        
-        cropped = resized.crop((left, top, right, bottom))
-        
-        # If cropped area is smaller, pad with black
-        if cropped.size != (clip.w, clip.h):
-            background = Image.new('RGB', (clip.w, clip.h), (0, 0, 0))
-            background.paste(cropped, (0, 0))
-            cropped = background
-        
-        return np.array(cropped)
-    
-    return clip.transform(combined_effect)
+    kb = KenBurns(image_path, size=size, duration=duration, zoom_end=zoom_factor)
+    # pan_distance pixels (of the original image; pass profile.scale when
+    # image_path is a proxy) to the right and half of it down (diagonal move)
+    pan = pan_distance * scale
+    kb.center_end = (0.5 + pan / kb.src_w, 0.5 + 0.5 * pan / kb.src_h)
+    return kb.clip()
 
 # Method 3: Simple resize with fixed dimensions (alternative approach)
 def simple_resize_example(image_path, duration=5):
@@ -101,17 +66,25 @@ def simple_resize_example(image_path, duration=5):
 try:
     print("Creating Ken Burns effect...")
     
-    # Method 1: Simple animated resize
-    ken_burns_clip = ken_burns_effect(current_image, duration=8, zoom_end=1.5)
-    
-    # Write to file
-    ken_burns_clip.write_videofile(
-        current_output,
-        fps=24,
-        codec='libx264',
-        audio_codec='aac',
-        verbose=False,
-        logger=None
+    # Method 1: Simple animated resize (skipped when the same render is cached)
+    # --preview renders from a cached low-res proxy; the final export reuses the same call
+    profile = active_profile()
+    source_image = profile.proxy(current_image)
+    render_cached(
+        ken_burns_effect,
+        profile.output_path(current_output),
+        inputs=[source_image],
+        write_kwargs=profile.write_kwargs(
+            fps=24,
+            codec='libx264',
+            audio_codec='aac',
+            verbose=False,
+            logger=None
+        ),
+        extra_recipe={"profile": profile.recipe()},
+        image_path=source_image,
+        duration=8,
+        zoom_end=1.5,
     )
     
     print(f"Success! Video saved to: {current_output}")
@@ -1,6 +1,10 @@
 import subprocess
 import shlex
 import os
+from typing import Optional
+
+from preview import FINAL, RenderProfile, active_profile
+from render_cache import RenderCache, default_cache
 
 def create_intro(
     text: str,
@@ -11,13 +15,19 @@ def create_intro(
     font_path: str = "arial",
     text_effect: str = "bounce",
     logo_effect: str = "flyin",
+    cache: Optional[RenderCache] = None,
+    profile: RenderProfile = FINAL,
 ):
     """
     Create a motion graphic intro using FFmpeg with customizable effects.
 
     text_effect:  "bounce", "slide", "fade"
     logo_effect:  "flyin", "fade", "slide"
+    cache: render cache; the same command and logo reuse the last render
+    profile: PREVIEW encodes with a fast preset; the layout is drawn in
+             absolute pixels, so the frame size stays 1280x720
     """
+    preset, crf = profile.encoder("medium", 23)
 
     # --- TEXT EFFECTS ---
     if text_effect == "bounce":
@@ -50,10 +60,17 @@ def create_intro(
          {text_anim}:fontsize=72:fontcolor=white:enable='between(t,1,{duration - 2})'[texted]; \
     [texted][1:v]overlay={logo_anim}:enable='between(t,2,{duration - 4})'[final]
     " \
-    -map "[final]" -t {duration} -pix_fmt yuv420p -c:v libx264 "{output_path}"
+    -map "[final]" -t {duration} -pix_fmt yuv420p -c:v libx264 -preset {preset} -crf {crf} "__OUTPUT__"
     """
 
-    subprocess.run(shlex.split(ffmpeg_cmd), check=True)
+    def render(path):
+        subprocess.run(shlex.split(ffmpeg_cmd.replace("__OUTPUT__", path)), check=True)
+
+    # the command (minus the output path) is the recipe; input files are hashed by content
+    inputs = [logo_path] + ([font_path] if os.path.isfile(font_path) else [])
+    recipe = {"ffmpeg_cmd": shlex.split(ffmpeg_cmd), "profile": profile.recipe()}
+    output_path = profile.output_path(output_path)
+    (cache or default_cache()).render(recipe, inputs, output_path, render)
     print(
         f"✅ Intro video saved at {output_path} with text={text_effect}, logo={logo_effect}"
     )
@@ -70,4 +87,5 @@ if __name__ == "__main__":
         output_path=current_output,
         text_effect="slide",
         logo_effect="fade",
+        profile=active_profile(),
     )
@@ -0,0 +1,201 @@
+import json
+import os
+import subprocess
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from preview import FINAL, RenderProfile, active_profile
+
+# Windows caps a command line at ~8k characters; longer graphs go through a file
+MAX_INLINE_FILTER = 4000
+
+
+class Slot:
+    """One still on the timeline: which image, when it starts, how long it shows"""
+
+    def __init__(self, segment_id, image_path: str, start: float, duration: float):
+        self.segment_id = segment_id
+        self.image_path = image_path
+        self.start = start
+        self.duration = duration
+
+
+def timeline_slots(transcript: Dict, images_dir: str, ext: str = ".jpg") -> List[Slot]:
+    """
+    Turn transcript segments into back-to-back slots.
+
+    Each image stays on screen from its segment's start until the next
+    segment starts (so pauses between sentences are covered); the first one
+    starts at 0 and the last one runs to the transcript duration. Segments
+    without an image keep the previous image on screen.
+    """
+    segments = sorted(transcript["segments"], key=lambda s: s["start"])
+    total = float(transcript.get("duration") or segments[-1]["end"])
+    slots: List[Slot] = []
+    for index, segment in enumerate(segments):
+        start = 0.0 if index == 0 else float(segment["start"])
+        end = float(segments[index + 1]["start"]) if index + 1 < len(segments) else total
+        image_path = os.path.join(images_dir, f"{segment['id']}{ext}")
+        if not os.path.exists(image_path):
+            if not slots:
+                raise FileNotFoundError(f"No image for the first segment: {image_path}")
+            slots[-1].duration = end - slots[-1].start
+            continue
+        slots.append(Slot(segment["id"], image_path, start, end - start))
+    return slots
+
+
+def _zoompan(index: int, frames: int, size: Tuple[int, int], fps: int, zoom: float, supersample: int) -> str:
+    """Scale/crop one still to the frame, then zoom in (even) or out (odd) over ``frames``"""
+    w, h = size
+    sw, sh = w * supersample, h * supersample
+    step = (zoom - 1) / max(frames - 1, 1)
+    if index % 2 == 0:
+        z = f"min(1+{step:.6f}*on,{zoom})"
+    else:
+        z = f"max({zoom}-{step:.6f}*on,1)"
+    return (
+        f"[{index}:v]scale={sw}:{sh}:force_original_aspect_ratio=increase,crop={sw}:{sh},"
+        f"zoompan=z='{z}':x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':d={frames}:s={w}x{h}:fps={fps},"
+        f"setsar=1,format=yuv420p[v{index}]"
+    )
+
+
+def build_filter_graph(
+    slots: List[Slot],
+    size: Tuple[int, int] = (1080, 1920),
+    fps: int = 24,
+    zoom: float = 1.15,
+    transition: float = 0.5,
+    transition_name: str = "fade",
+    supersample: int = 2,
+) -> str:
+    """
+    One filter_complex for the whole timeline, ending in ``[vout]``.
+
+    Every still becomes a zoompan clip; clips are joined with ``xfade`` when
+    ``transition`` > 0 (each clip is lengthened by the transition so cuts stay
+    on the segment starts) or with ``concat`` otherwise. ``supersample``
+    scales stills up before zoompan, which hides its integer-pixel jitter.
+
+    Slot boundaries are rounded to whole frames (not each clip's length), so
+    rounding never accumulates and every xfade ends exactly where its clip does.
+    """
+    origin = slots[0].start
+    end = slots[-1].start + slots[-1].duration
+    bounds = [round((slot.start - origin) * fps) for slot in slots] + [round((end - origin) * fps)]
+    fade_frames = round(transition * fps) if len(slots) > 1 else 0
+    parts = []
+    for index in range(len(slots)):
+        last = index == len(slots) - 1
+        frames = bounds[index + 1] - bounds[index] + (0 if last else fade_frames)
+        parts.append(_zoompan(index, max(1, frames), size, fps, zoom, supersample))
+
+    if fade_frames <= 0:
+        inputs = "".join(f"[v{i}]" for i in range(len(slots)))
+        parts.append(f"{inputs}concat=n={len(slots)}:v=1:a=0[vout]")
+        return ";\n".join(parts)
+
+    previous = "v0"
+    for index in range(1, len(slots)):
+        label = "vout" if index == len(slots) - 1 else f"x{index}"
+        parts.append(
+            f"[{previous}][v{index}]xfade=transition={transition_name}"
+            f":duration={fade_frames / fps:.6f}:offset={bounds[index] / fps:.6f}[{label}]"
+        )
+        previous = label
+    return ";\n".join(parts)
+
+
+def build_command(
+    slots: List[Slot],
+    audio_path: Optional[str],
+    output_path: str,
+    filter_graph: str,
+    total: float,
+    filter_script: Optional[str] = None,
+    preset: str = "veryfast",
+    crf: int = 23,
+) -> List[str]:
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error"]
+    for slot in slots:
+        cmd += ["-i", slot.image_path]
+    if audio_path:
+        cmd += ["-i", audio_path]
+    if filter_script:
+        cmd += ["-filter_complex_script", filter_script]
+    else:
+        cmd += ["-filter_complex", filter_graph]
+    cmd += ["-map", "[vout]"]
+    if audio_path:
+        cmd += ["-map", f"{len(slots)}:a", "-c:a", "aac", "-b:a", "192k"]
+    cmd += [
+        "-t", f"{total:.3f}",
+        "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+        "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+        output_path,
+    ]
+    return cmd
+
+
+def render_timeline(
+    transcript: Dict,
+    images_dir: str,
+    output_path: str,
+    audio_path: Optional[str] = None,
+    size: Tuple[int, int] = (1080, 1920),
+    fps: int = 24,
+    zoom: float = 1.15,
+    transition: float = 0.5,
+    transition_name: str = "fade",
+    preset: str = "veryfast",
+    profile: RenderProfile = FINAL,
+) -> str:
+    """
+    Render a slideshow of ``images/{segment_id}.jpg`` timed to the transcript
+    with a single ffmpeg call; no frames pass through Python.
+
+    With the PREVIEW profile the stills are swapped for cached proxies and
+    the frame size, frame rate and encoder are scaled down; the timing and
+    transitions are identical to the final render.
+    """
+    slots = timeline_slots(transcript, images_dir)
+    for slot in slots:
+        slot.image_path = profile.proxy(slot.image_path)
+    size, fps = profile.size(size), profile.fps(fps)
+    preset, crf = profile.encoder(preset, 23)
+    # zoompan jitter is invisible at proxy resolution
+    supersample = 1 if profile.is_preview else 2
+    graph = build_filter_graph(slots, size, fps, zoom, transition, transition_name, supersample)
+    total = slots[-1].start + slots[-1].duration
+    output_path = profile.output_path(output_path)
+
+    script_path = None
+    if len(graph) > MAX_INLINE_FILTER:
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+            f.write(graph)
+            script_path = f.name
+    try:
+        cmd = build_command(slots, audio_path, output_path, graph, total, script_path, preset, crf)
+        subprocess.run(cmd, check=True)
+    finally:
+        if script_path:
+            os.remove(script_path)
+
+    print(f"✅ Timeline video saved at {output_path} ({len(slots)} stills, {total:.1f}s)")
+    return output_path
+
+
+if __name__ == "__main__":
+    with open(os.path.join(os.getcwd(), "image_suggestion_system", "output.json"), "r", encoding="utf-8") as f:
+        transcript = json.load(f)
+    current_output = os.path.join(os.getcwd(), "moviepy-learning-material-output", "timeline.mp4")
+    os.makedirs(os.path.dirname(current_output), exist_ok=True)
+
+    render_timeline(
+        transcript,
+        images_dir=os.path.join(os.getcwd(), "images"),
+        output_path=current_output,
+        audio_path="audio.wav",
+        profile=active_profile(),
+    )
@@ -0,0 +1,164 @@
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ffmpeg_timeline import timeline_slots
+from preview import FINAL, RenderProfile, active_profile
+from render_cache import RenderCache, remove_quietly
+
+CACHE_DIR = os.path.join(os.getcwd(), ".cache", "segments")
+
+# Every segment file must be encoded identically or the concat demuxer can't copy them
+ENCODER = {
+    "codec": "libx264",
+    "preset": "veryfast",
+    "ffmpeg_params": ["-crf", "23", "-pix_fmt", "yuv420p"],
+}
+
+
+def segment_jobs(
+    transcript: Dict,
+    images_dir: str,
+    size: Tuple[int, int] = (1080, 1920),
+    fps: int = 24,
+    zoom: float = 1.15,
+    profile: RenderProfile = FINAL,
+) -> List[Dict]:
+    """One picklable job per still, split at segment boundaries.
+
+    Segment boundaries (not lengths) are rounded to whole frames, so the
+    rounding error never accumulates and the stitched video stays in sync
+    with the transcript. The profile picks the image (original or
+    proxy), the output size and frame rate, and the encoder settings.
+    """
+    size, fps = profile.size(size), profile.fps(fps)
+    encoder = profile.write_kwargs(**ENCODER)
+    jobs = []
+    for index, slot in enumerate(timeline_slots(transcript, images_dir)):
+        frames = max(1, round((slot.start + slot.duration) * fps) - round(slot.start * fps))
+        # alternate zoom in / zoom out like the ffmpeg timeline
+        zoom_start, zoom_end = (1.0, zoom) if index % 2 == 0 else (zoom, 1.0)
+        jobs.append(
+            {
+                "segment_id": slot.segment_id,
+                "image_path": profile.proxy(slot.image_path),
+                "duration": frames / fps,
+                "size": list(size),
+                "fps": fps,
+                "zoom_start": zoom_start,
+                "zoom_end": zoom_end,
+                "encoder": encoder,
+                "profile": profile.recipe(),
+            }
+        )
+    return jobs
+
+
+def job_recipe(job: Dict) -> Dict:
+    """Everything besides the image bytes that affects a segment's pixels"""
+    return {k: v for k, v in job.items() if k != "image_path"}
+
+
+def render_segment(job: Dict, output_path: str) -> str:
+    """Render one segment with moviepy (runs inside a worker process)"""
+    from ken_burns import KenBurns
+
+    clip = KenBurns(
+        job["image_path"],
+        size=tuple(job["size"]),
+        duration=job["duration"],
+        zoom_start=job["zoom_start"],
+        zoom_end=job["zoom_end"],
+    ).clip()
+    # write to a temp name so an interrupted render never looks cached
+    tmp_path = output_path + ".part.mp4"
+    try:
+        clip.write_videofile(
+            tmp_path,
+            fps=job["fps"],
+            audio=False,
+            threads=1,
+            logger=None,
+            **job["encoder"],
+        )
+    except BaseException:
+        remove_quietly(tmp_path)
+        raise
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def concat_segments(paths: List[str], output_path: str, audio_path: Optional[str] = None) -> None:
+    """Stitch segment files with the concat demuxer (video is copied, not re-encoded)"""
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_path = f.name
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v", "-map", "1:a", "-c:a", "aac", "-shortest"]
+    cmd += ["-c:v", "copy", "-movflags", "+faststart", output_path]
+    try:
+        subprocess.run(cmd, check=True)
+    finally:
+        os.remove(list_path)
+
+
+def render_parallel(
+    transcript: Dict,
+    images_dir: str,
+    output_path: str,
+    audio_path: Optional[str] = None,
+    size: Tuple[int, int] = (1080, 1920),
+    fps: int = 24,
+    workers: Optional[int] = None,
+    cache: Optional[RenderCache] = None,
+    render_fn: Callable[[Dict, str], str] = render_segment,
+    profile: RenderProfile = FINAL,
+) -> str:
+    """
+    Render the timeline segment by segment in a process pool, then concat.
+
+    Segment files are kept in a RenderCache (``.cache/segments`` by default)
+    keyed by the image bytes, the Ken Burns parameters and the encoder
+    settings, so after an edit only the segments whose image or timing
+    changed are rendered again. Preview and final segments differ in their
+    recipe, so both can stay cached side by side.
+    """
+    cache = cache or RenderCache(CACHE_DIR)
+    output_path = profile.output_path(output_path)
+    jobs = segment_jobs(transcript, images_dir, size, fps, profile=profile)
+    keys = [cache.key(job_recipe(job), [job["image_path"]]) for job in jobs]
+    paths = [cache.path(key) for key in keys]
+    todo = [(job, path) for job, key, path in zip(jobs, keys, paths) if cache.get(key) is None]
+    print(f"🎞️ {len(jobs)} segments, {len(jobs) - len(todo)} cached, {len(todo)} to render")
+
+    start = time.perf_counter()
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            # list() re-raises the first worker error
+            list(pool.map(render_fn, *zip(*todo)))
+    concat_segments(paths, output_path, audio_path)
+    cache.evict(keep=keys)
+    print(f"✅ Video saved at {output_path} in {time.perf_counter() - start:.1f}s")
+    return output_path
+
+
+if __name__ == "__main__":
+    with open(os.path.join(os.getcwd(), "image_suggestion_system", "output.json"), "r", encoding="utf-8") as f:
+        transcript = json.load(f)
+    current_output = os.path.join(os.getcwd(), "moviepy-learning-material-output", "parallel.mp4")
+    os.makedirs(os.path.dirname(current_output), exist_ok=True)
+
+    render_parallel(
+        transcript,
+        images_dir=os.path.join(os.getcwd(), "images"),
+        output_path=current_output,
+        audio_path="audio.wav",
+        profile=active_profile(),
+    )
@@ -0,0 +1,150 @@
+import os
+import subprocess
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+from render_cache import RenderCache, remove_quietly
+
+PROXY_DIR = os.path.join(os.getcwd(), ".cache", "proxies")
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+class ProxyStore:
+    """
+    Low-resolution stand-ins for input files, generated once and cached.
+
+    Stills are downscaled with Pillow, videos with ffmpeg (ultrafast x264,
+    optional fps cap, audio kept). Proxies are keyed by the source file's
+    content, so replacing an input regenerates its proxy.
+    """
+
+    def __init__(self, directory: str = PROXY_DIR, max_bytes: Optional[int] = 2 * 1024 ** 3):
+        self.cache = RenderCache(directory, max_bytes=max_bytes)
+
+    def get(self, path: str, scale: float, fps: Optional[int] = None) -> str:
+        ext = os.path.splitext(path)[1].lower()
+        is_image = ext in IMAGE_EXTS
+        recipe = {"proxy": "image" if is_image else "video", "scale": scale, "fps": None if is_image else fps}
+        key = self.cache.key(recipe, [path])
+        out_ext = ".jpg" if is_image else ".mp4"
+        cached = self.cache.get(key, out_ext)
+        if cached:
+            return cached
+
+        tmp_path = self.cache.path(key, ".part" + out_ext)
+        try:
+            if is_image:
+                with Image.open(path) as img:
+                    img = img.convert("RGB")
+                    img.reduce(max(1, int(1 / scale))).save(tmp_path, "JPEG", quality=85)
+            else:
+                cmd = [
+                    "ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i", path,
+                    "-vf", f"scale=trunc(iw*{scale}/2)*2:-2",
+                ]
+                if fps:
+                    cmd += ["-r", str(fps)]
+                cmd += ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "28", "-c:a", "aac", tmp_path]
+                subprocess.run(cmd, check=True)
+        except BaseException:
+            remove_quietly(tmp_path)
+            raise
+        cached = self.cache.path(key, out_ext)
+        os.replace(tmp_path, cached)
+        self.cache.evict(keep={key})
+        print(f"🪶 Proxy created for {os.path.basename(path)}")
+        return cached
+
+
+class RenderProfile:
+    """
+    Resolution, frame rate and encoder overrides for one kind of render.
+
+    PREVIEW works from cached proxies at a fraction of the resolution and
+    frame rate with an ultrafast preset; FINAL overrides nothing, so each
+    script renders the same timeline from the original inputs with its own
+    full-quality settings. Preview outputs get a ``.preview`` suffix so they
+    never overwrite a final export.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        scale: float = 1.0,
+        max_fps: Optional[int] = None,
+        preset: Optional[str] = None,
+        crf: Optional[int] = None,
+        use_proxies: bool = False,
+    ):
+        self.name = name
+        self.scale = scale
+        self.max_fps = max_fps
+        self.preset = preset
+        self.crf = crf
+        self.use_proxies = use_proxies
+        self._proxies: Optional[ProxyStore] = None
+
+    @property
+    def is_preview(self) -> bool:
+        return self.use_proxies
+
+    def size(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        """Scaled (width, height), rounded down to even numbers for yuv420p"""
+        if self.scale == 1.0:
+            return size
+        w, h = size
+        return max(2, int(w * self.scale) // 2 * 2), max(2, int(h * self.scale) // 2 * 2)
+
+    def fps(self, fps: int) -> int:
+        return min(fps, self.max_fps) if self.max_fps else fps
+
+    def proxy(self, path: str) -> str:
+        """The input to read: a cached low-res proxy in preview, the original otherwise"""
+        if not self.use_proxies:
+            return path
+        if self._proxies is None:
+            self._proxies = ProxyStore()
+        return self._proxies.get(path, self.scale, self.max_fps)
+
+    def output_path(self, path: str) -> str:
+        if not self.is_preview:
+            return path
+        root, ext = os.path.splitext(path)
+        return f"{root}.{self.name}{ext}"
+
+    def encoder(self, preset: str, crf: int) -> Tuple[str, int]:
+        """(preset, crf) for an ffmpeg command, given the script's own defaults"""
+        return self.preset or preset, self.crf if self.crf is not None else crf
+
+    def write_kwargs(self, **kwargs) -> Dict[str, Any]:
+        """Apply the overrides to moviepy ``write_videofile`` keyword arguments"""
+        kwargs = dict(kwargs)
+        if "fps" in kwargs:
+            kwargs["fps"] = self.fps(kwargs["fps"])
+        if self.preset:
+            kwargs["preset"] = self.preset
+        if self.crf is not None:
+            params = list(kwargs.get("ffmpeg_params") or [])
+            if "-crf" in params:
+                params[params.index("-crf") + 1] = str(self.crf)
+            else:
+                params += ["-crf", str(self.crf)]
+            kwargs["ffmpeg_params"] = params
+        return kwargs
+
+    def recipe(self) -> Dict[str, Any]:
+        """What render caches need to tell a preview from a final render"""
+        return {"profile": self.name, "scale": self.scale, "max_fps": self.max_fps, "preset": self.preset, "crf": self.crf}
+
+
+PREVIEW = RenderProfile("preview", scale=0.25, max_fps=12, preset="ultrafast", crf=30, use_proxies=True)
+FINAL = RenderProfile("final")
+
+
+def active_profile() -> RenderProfile:
+    """PREVIEW when run with ``--preview`` or RENDER_PROFILE=preview, else FINAL"""
+    if "--preview" in sys.argv or os.environ.get("RENDER_PROFILE", "").lower() == "preview":
+        return PREVIEW
+    return FINAL
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+CACHE_DIR = os.path.join(os.getcwd(), ".cache", "renders")
+# temp files this old belong to a render that crashed or was killed
+STALE_PART_SECONDS = 24 * 3600
+
+
+class RenderCache:
+    """
+    Rendered artifacts keyed by a hash of their full recipe.
+
+    The key covers the recipe dict (effect parameters, fps, codec,
+    ffmpeg_params, ...) plus the contents of every input file, so a hit is
+    only possible when the output would come out byte-for-byte the same.
+    Entries are evicted least recently used first once the cache holds more
+    than ``max_bytes`` or ``max_entries``, and anything older than
+    ``max_age_days`` is dropped; ``None`` disables a limit.
+    """
+
+    def __init__(
+        self,
+        directory: str = CACHE_DIR,
+        max_bytes: Optional[int] = 5 * 1024 ** 3,
+        max_entries: Optional[int] = None,
+        max_age_days: Optional[float] = None,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        # (path, size, mtime) -> sha256, so unchanged inputs are hashed once per run
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def file_digest(self, path: str) -> str:
+        stat = os.stat(path)
+        memo = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if memo not in self._digests:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+            self._digests[memo] = h.hexdigest()
+        return self._digests[memo]
+
+    def key(self, recipe: Dict[str, Any], inputs: Iterable[str] = ()) -> str:
+        payload = {"recipe": recipe, "inputs": [self.file_digest(p) for p in inputs]}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:24]
+
+    def path(self, key: str, ext: str = ".mp4") -> str:
+        return os.path.join(self.directory, f"{key}{ext}")
+
+    def get(self, key: str, ext: str = ".mp4") -> Optional[str]:
+        path = self.path(key, ext)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # mark as recently used
+        return path
+
+    def render(
+        self,
+        recipe: Dict[str, Any],
+        inputs: Iterable[str],
+        output_path: str,
+        render_to: Callable[[str], Any],
+    ) -> str:
+        """
+        Copy the cached artifact to ``output_path``, or call
+        ``render_to(path)`` to produce it first. The render goes to a temp
+        name, so an interrupted encode never becomes a cache entry.
+        """
+        ext = os.path.splitext(output_path)[1] or ".mp4"
+        key = self.key(recipe, inputs)
+        cached = self.get(key, ext)
+        if cached is None:
+            self.misses += 1
+            tmp_path = self.path(key, ".part" + ext)
+            try:
+                render_to(tmp_path)
+            except BaseException:
+                remove_quietly(tmp_path)
+                raise
+            cached = self.path(key, ext)
+            os.replace(tmp_path, cached)
+            self.evict(keep={key})
+        else:
+            self.hits += 1
+            print(f"♻️ Render cache hit for {os.path.basename(output_path)}")
+
+        # a copy, not a link: tools writing output_path in place must not touch the cache
+        if os.path.abspath(output_path) != os.path.abspath(cached):
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            shutil.copyfile(cached, output_path)
+        return output_path
+
+    def evict(self, keep: Iterable[str] = ()) -> int:
+        """Apply the age, size and count limits; returns the number of files removed.
+
+        Leftover ``.part`` files older than STALE_PART_SECONDS are removed too;
+        younger ones may still be written by another process.
+        """
+        keep = set(keep)
+        entries = []
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            if ".part" in name:
+                if now - stat.st_mtime > STALE_PART_SECONDS:
+                    remove_quietly(path)
+                    removed += 1
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name.split(".")[0], path))
+        entries.sort()  # least recently used first
+
+        evicted = 0
+        total = sum(size for _, size, _, _ in entries)
+        cutoff = now - self.max_age_days * 86400 if self.max_age_days is not None else None
+        for mtime, size, key, path in list(entries):
+            over_size = self.max_bytes is not None and total > self.max_bytes
+            over_count = self.max_entries is not None and len(entries) - evicted > self.max_entries
+            expired = cutoff is not None and mtime < cutoff
+            if not (over_size or over_count or expired):
+                break
+            if key in keep:
+                continue
+            os.remove(path)
+            total -= size
+            evicted += 1
+        return removed + evicted
+
+    def stats(self) -> Dict[str, Any]:
+        files = [f for f in os.listdir(self.directory) if ".part" not in f]
+        return {
+            "entries": len(files),
+            "bytes": sum(os.path.getsize(os.path.join(self.directory, f)) for f in files),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_default_cache: Optional[RenderCache] = None
+
+
+def default_cache() -> RenderCache:
+    """Shared cache under .cache/renders, created on first use"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RenderCache()
+    return _default_cache
+
+
+def render_cached(
+    make_clip: Callable[..., Any],
+    output_path: str,
+    inputs: Iterable[str] = (),
+    write_kwargs: Optional[Dict[str, Any]] = None,
+    cache: Optional[RenderCache] = None,
+    extra_recipe: Optional[Dict[str, Any]] = None,
+    **params,
+) -> str:
+    """
+    Write ``make_clip(**params)`` to ``output_path`` unless an identical
+    render is cached. The clip is only built on a miss. ``extra_recipe``
+    adds key entries that are not clip parameters (e.g. the render profile).
+    """
+    write_kwargs = write_kwargs or {}
+    recipe = {
+        "clip": f"{make_clip.__module__}.{make_clip.__qualname__}",
+        "params": params,
+        "write": write_kwargs,
+        **(extra_recipe or {}),
+    }
+    return (cache or default_cache()).render(
+        recipe,
+        inputs,
+        output_path,
+        lambda path: make_clip(**params).write_videofile(path, **write_kwargs),
+    )
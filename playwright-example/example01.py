@@ -1,74 +1,80 @@
 import asyncio
 import json
-from pathlib import Path
 from sentence_transformers import SentenceTransformer, util
 import os
-import shutil
+from autogen_course.asset_store import AssetStore
 
 # from playwright.async_api import async_playwright, Playwright
 from patchright.async_api import async_playwright, Playwright, Page
+from autogen_course.wait_engine import WaitEngine, pixabay_search_url
 
 
-def handle_image(index: str):
-    #  current directory
-    current_dir = Path(os.path.join(os.getcwd(), "image_downloads"))
-    # target directory
-    target_dir = Path(os.path.join(os.getcwd(), "images"))
+store = AssetStore()
 
-    for file in current_dir.iterdir():
-        if file.is_file():
-            new_name = f"{index}.jpg"
-            new_path = target_dir / new_name  # new folder + new name
-            # file.rename(new_path)
-            shutil.move(str(file), str(new_path))
-            print(f"Moved + renamed {file.name} → {new_path}")
 
+def handle_image(index: str, query: str = None, url: str = None):
+    store.fetch_to(os.getcwd(), index, url=url, query=query)
 
-async def handle_pixabay_filter(page: Page):
+
+RESULTS_SELECTOR = 'div[class^="results"] div[class^="verticalMasonry"] script[type="application/ld+json"]'
+
+# photo / horizontal / authentic filters come from the search URL instead of
+# six dropdown clicks; set to False to drive the filter UI
+USE_URL_FILTERS = True
+
+
+async def click_when_visible(page: Page, waits: WaitEngine, name: str, selector: str):
+    handle = await waits.step(name, page.wait_for_selector(selector, state="visible"))
+    await handle.click()
+
+
+async def handle_pixabay_filter(page: Page, waits: WaitEngine):
     try:
         # photo => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="triggerWrapper"] > button
-        await (
-            await page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="triggerWrapper"] > button'
-            )
-        ).click()
-
-        await asyncio.sleep(2)
+        await click_when_visible(
+            page,
+            waits,
+            "photo_trigger",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="triggerWrapper"] > button',
+        )
         # dropdown photo click => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)
-        await (
-            await page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)'
-            )
-        ).click()
-        await asyncio.sleep(2)
+        await click_when_visible(
+            page,
+            waits,
+            "photo_option",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)',
+        )
+        await waits.step("photo_idle", page.wait_for_load_state("networkidle"))
         # horizontal => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="triggerWrapper"] >button
-        await (
-            await page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="triggerWrapper"] >button'
-            )
-        ).click()
-        await asyncio.sleep(2)
+        await click_when_visible(
+            page,
+            waits,
+            "orientation_trigger",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="triggerWrapper"] >button',
+        )
         # div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)
-        await (
-            await page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)'
-            )
-        ).click()
-        await asyncio.sleep(2)
+        await click_when_visible(
+            page,
+            waits,
+            "orientation_option",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)',
+        )
+        await waits.step("orientation_idle", page.wait_for_load_state("networkidle"))
         # authencity => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="triggerWrapper"] >button
-        await (
-            await page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="triggerWrapper"] >button'
-            )
-        ).click()
-        await asyncio.sleep(2)
+        await click_when_visible(
+            page,
+            waits,
+            "authenticity_trigger",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="triggerWrapper"] >button',
+        )
         # div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)
-        await (
-            await page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)'
-            )
-        ).click()
-        await asyncio.sleep(2)
+        await click_when_visible(
+            page,
+            waits,
+            "authenticity_option",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)',
+        )
+        await waits.step("authenticity_idle", page.wait_for_load_state("networkidle"))
     except Exception as e:
         print(e)
 
@@ -86,36 +92,25 @@ async def run(playwright: Playwright):
 
     segments = transcription["segments"]
 
+    waits = WaitEngine()
     for segment in segments:
         page = await browser.new_page()
-        await page.goto("https://pixabay.com/")
-        await asyncio.sleep(2)
-        await (await page.query_selector(selector="input[type='search']")).fill(
-            segment["image_suggestion"][0]
-        )
-        await page.evaluate(
-            expression="""()=>{
-                
-                    // Create a new KeyboardEvent for Enter
-                    var enterEvent = new KeyboardEvent('keydown', {
-                        key: 'Enter',
-                        code: 'Enter',
-                        keyCode: 13,
-                        which: 13,
-                        bubbles: true
-                    });
-
-                    // Dispatch the event on the currently focused element
-                    document.activeElement.dispatchEvent(enterEvent);      
-                    } """
+        query = segment["image_suggestion"][0]
+        await waits.step(
+            "goto_search",
+            page.goto(
+                pixabay_search_url(query, filtered=USE_URL_FILTERS),
+                wait_until="domcontentloaded",
+            ),
         )
-        await asyncio.sleep(3)
 
-        await handle_pixabay_filter(page)
+        if not USE_URL_FILTERS:
+            await handle_pixabay_filter(page, waits)
 
-        images = await page.query_selector_all(
-            'div[class^="results"] div[class^="verticalMasonry"] script[type="application/ld+json"]'
+        await waits.step(
+            "results", page.wait_for_selector(RESULTS_SELECTOR, state="attached")
         )
+        images = await page.query_selector_all(RESULTS_SELECTOR)
         for image in images:
             img = json.loads(await image.text_content())
             print(img["contentUrl"])
@@ -124,6 +119,7 @@ async def run(playwright: Playwright):
 
         # await asyncio.sleep(5000)
     # other actions...
+    print(waits.report())
     await browser.close()
 
 
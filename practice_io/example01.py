@@ -1,24 +1,14 @@
 import os
-from pathlib import Path
-import shutil
+from autogen_course.asset_store import AssetStore
 import json
 
 
 
-def handle_image():
-    #  current directory
-    current_dir = Path(os.path.join(os.getcwd(), "image_downloads"))
-    # target directory
-    target_dir = Path(os.path.join(os.getcwd(), "images"))
+store = AssetStore()
 
-    for file in current_dir.iterdir():
-        if file.is_file():
-            new_name = "1.jpg"
-            new_path = target_dir / new_name  # new folder + new name
-            # file.rename(new_path)
-            shutil.move(str(file), str(new_path))
-            print(f"Moved + renamed {file.name} → {new_path}")
-        
+
+def handle_image(index: str = "1", query: str = None, url: str = None):
+    store.fetch_to(os.getcwd(), index, url=url, query=query)
 
 
 def handle_transcription_out():
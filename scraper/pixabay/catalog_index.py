@@ -0,0 +1,167 @@
+from pathlib import Path
+from typing import List, Tuple
+import json
+import os
+
+import numpy as np
+
+
+class CatalogIndex:
+    """Persistent approximate nearest neighbour index over scraped Pixabay records.
+
+    Records are the ``{"id", "contentUrl", "name"}`` dicts returned by
+    ``PixabayScraper.result()``. Names are embedded once and stored in an IVF
+    index: vectors are clustered with spherical k-means, and a query only scans
+    the ``n_probe`` closest clusters. Small catalogs are searched exactly until
+    ``train_threshold`` records exist. New records are appended to their
+    nearest cluster, and the clusters are retrained when the catalog doubles.
+    """
+
+    def __init__(
+        self,
+        model,
+        index_dir: str,
+        n_probe: int = 4,
+        train_threshold: int = 256,
+        kmeans_iterations: int = 10,
+    ):
+        self.model = model
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.n_probe = n_probe
+        self.train_threshold = train_threshold
+        self.kmeans_iterations = kmeans_iterations
+
+        self.records: List[dict] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.trained_size = 0
+        self._urls = set()
+        self._lists: List[List[int]] = []
+        self.load()
+
+    # ---------- persistence ----------
+    @property
+    def _records_path(self) -> Path:
+        return self.index_dir / "records.json"
+
+    @property
+    def _arrays_path(self) -> Path:
+        return self.index_dir / "catalog.npz"
+
+    def load(self):
+        if not self._records_path.exists() or not self._arrays_path.exists():
+            return
+        with open(self._records_path, "r", encoding="utf-8") as f:
+            self.records = json.load(f)
+        with np.load(self._arrays_path) as arrays:
+            self.vectors = arrays["vectors"]
+            self.centroids = arrays["centroids"]
+            self.assignments = arrays["assignments"]
+            self.trained_size = int(arrays["trained_size"])
+        self._urls = {record["contentUrl"] for record in self.records}
+        self._rebuild_lists()
+
+    def save(self):
+        # write to temp files first so a crash never leaves a half-written index
+        arrays_tmp = self._arrays_path.with_suffix(".tmp")
+        with open(arrays_tmp, "wb") as f:
+            np.savez(
+                f,
+                vectors=self.vectors,
+                centroids=self.centroids,
+                assignments=self.assignments,
+                trained_size=self.trained_size,
+            )
+        records_tmp = self._records_path.with_suffix(".tmp")
+        with open(records_tmp, "w", encoding="utf-8") as f:
+            json.dump(self.records, f, ensure_ascii=False)
+        os.replace(arrays_tmp, self._arrays_path)
+        os.replace(records_tmp, self._records_path)
+
+    # ---------- building ----------
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.asarray(self.model.encode(texts), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def _rebuild_lists(self):
+        self._lists = [[] for _ in range(len(self.centroids))]
+        for row, cluster in enumerate(self.assignments):
+            if cluster >= 0:
+                self._lists[cluster].append(row)
+
+    def _train(self):
+        """Cluster all vectors with spherical k-means (cosine distance)"""
+        n = len(self.vectors)
+        n_lists = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        centroids = self.vectors[rng.choice(n, n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assignments = np.argmax(self.vectors @ centroids.T, axis=1)
+            for cluster in range(n_lists):
+                members = self.vectors[assignments == cluster]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[cluster] = centroid / max(np.linalg.norm(centroid), 1e-12)
+        self.centroids = centroids
+        self.assignments = np.argmax(self.vectors @ centroids.T, axis=1).astype(np.int32)
+        self.trained_size = n
+        self._rebuild_lists()
+
+    def add(self, records: List[dict]) -> int:
+        """Insert new records (deduplicated by contentUrl); returns how many were added"""
+        fresh = []
+        for record in records:
+            url = record.get("contentUrl")
+            if url and url not in self._urls and record.get("name"):
+                self._urls.add(url)
+                fresh.append(record)
+        if not fresh:
+            return 0
+
+        embeddings = self._encode([record["name"] for record in fresh])
+        start = len(self.records)
+        self.records.extend(fresh)
+        self.vectors = (
+            embeddings if self.vectors.size == 0 else np.vstack([self.vectors, embeddings])
+        )
+
+        if self.trained_size == 0 and len(self.records) < self.train_threshold:
+            self.assignments = np.full(len(self.records), -1, dtype=np.int32)
+        elif self.trained_size == 0 or len(self.records) >= 2 * self.trained_size:
+            self._train()
+        else:
+            clusters = np.argmax(embeddings @ self.centroids.T, axis=1).astype(np.int32)
+            self.assignments = np.concatenate([self.assignments, clusters])
+            for offset, cluster in enumerate(clusters):
+                self._lists[cluster].append(start + offset)
+        return len(fresh)
+
+    # ---------- querying ----------
+    def search(self, query: str, k: int = 5) -> List[Tuple[dict, float]]:
+        """Approximate top-k records for a phrase, highest cosine score first"""
+        if not self.records:
+            return []
+        query_embedding = self._encode([query])[0]
+
+        if self.trained_size == 0:
+            candidates = np.arange(len(self.records))
+        else:
+            n_probe = min(self.n_probe, len(self.centroids))
+            probes = np.argpartition(-(self.centroids @ query_embedding), n_probe - 1)[:n_probe]
+            candidates = np.fromiter(
+                (row for cluster in probes for row in self._lists[cluster]), dtype=np.int64
+            )
+            if candidates.size == 0:
+                return []
+
+        scores = self.vectors[candidates] @ query_embedding
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.records[candidates[i]], float(scores[i])) for i in top]
+
+    def __len__(self):
+        return len(self.records)
@@ -0,0 +1,108 @@
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
+from pixabay_http import shared_client
+import asyncio
+import hashlib
+import os
+
+import httpx
+
+
+def url_filename(url: str) -> str:
+    """Stable file name for a CDN URL: sha256 prefix + original extension"""
+    suffix = Path(urlparse(url).path).suffix or ".jpg"
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16] + suffix
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transport errors, server errors and rate limiting are worth another try"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, httpx.TransportError)
+
+
+def write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class CdnDownloader:
+    """Parallel image downloads straight from cdn.pixabay.com.
+
+    Files are named by URL hash, so a URL is only ever fetched once and files
+    already on disk are skipped. Downloads stream into ``<name>.part`` and
+    resume with an HTTP Range request after a dropped connection. The file is
+    moved into place atomically only when complete. Only transport errors,
+    5xx and 429 responses are retried; other HTTP errors fail at once.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        concurrency: int = 6,
+        retries: int = 3,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.retries = retries
+        self.client = client or shared_client()
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def target_path(self, url: str) -> Path:
+        return self.output_dir / url_filename(url)
+
+    async def _fetch(self, url: str, path: Path):
+        part_path = path.with_name(path.name + ".part")
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 416:
+                # the range starts past the end: done only if the part file is exactly
+                # the full size, otherwise it is stale or corrupt and is fetched again
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                if total.isdigit() and offset == int(total):
+                    os.replace(part_path, path)
+                    return
+                part_path.unlink(missing_ok=True)
+                raise httpx.ReadError(f"unusable partial download for {url}, restarting")
+            response.raise_for_status()
+            if response.status_code != 206:
+                offset = 0  # server ignored the Range header, start over
+            expected = response.headers.get("Content-Length")
+
+            with open(part_path, "ab" if offset else "wb") as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+
+        received = part_path.stat().st_size - offset
+        if expected is not None and received < int(expected):
+            raise httpx.ReadError(f"incomplete body for {url}: {received}/{expected}")
+        os.replace(part_path, path)
+
+    async def download(self, url: str) -> Optional[Path]:
+        path = self.target_path(url)
+        if path.exists():
+            return path
+
+        async with self._semaphore:
+            for attempt in range(1, self.retries + 1):
+                try:
+                    await self._fetch(url, path)
+                    print(f"🖼️ Saved image: {path}")
+                    return path
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    if attempt == self.retries or not is_retryable(e):
+                        print(f"Failed to download {url}: {e}")
+                        return None
+                    await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+
+    async def download_all(self, urls: Iterable[str]) -> Dict[str, Optional[Path]]:
+        unique = list(dict.fromkeys(urls))
+        paths = await asyncio.gather(*(self.download(url) for url in unique))
+        return dict(zip(unique, paths))
@@ -1,40 +1,92 @@
 from patchright.async_api import async_playwright, Playwright, Page
 from pixabay_scraper import PixabayScraper
 from visual_image_downloader import VisualImageDownloader
+from catalog_index import CatalogIndex
+from cdn_downloader import CdnDownloader
+from pixabay_http import PixabayHttpScraper, PixabayBlockedError, close_shared_client
+from sentence_transformers import SentenceTransformer
+import json
 import os
 import asyncio
 
+# below this cosine score the local catalog is considered a miss
+CATALOG_SCORE_THRESHOLD = 0.6
+# fetch search pages without a browser; falls back to Chromium if blocked
+USE_HTTP_BACKEND = True
+# best catalog matches downloaded for each segment
+DOWNLOADS_PER_SEGMENT = 5
+
 
 async def run(playwright: Playwright):
     current_directory = os.getcwd()
     parent_directory = os.path.dirname(current_directory)
     print(f"Parent of current working directory: {parent_directory}")
-    chromium = playwright.chromium  # or "firefox" or "webkit".
 
-    browser = await chromium.launch_persistent_context(
-        user_data_dir=os.path.join(parent_directory, "deepak"),
-        channel="chrome",
-        headless=False,
+    catalog = CatalogIndex(
+        model=SentenceTransformer("all-MiniLM-L6-v2"),
+        index_dir=os.path.join(parent_directory, "pixabay_catalog"),
     )
-    
-    # page = await browser.new_page()
-    
-    # visual = VisualImageDownloader(browser=browser)
-    
-    # await visual.transcript_path(path='output.json')
-    
-    pixabay = PixabayScraper(browser=browser,curr_dir=parent_directory)
-    # await pixabay.open_page()
-    # await asyncio.sleep(3)
-    await pixabay.search("big mountain")
-
-    await asyncio.sleep(5)
-    # await pixabay.filter()
-    result = await pixabay.result()
-    
-    
-    await asyncio.sleep(1000)
-    # print(result)
+    print(f"Local catalog has {len(catalog)} images")
+
+    with open("output.json", "r", encoding="utf-8") as f:
+        transcription = json.load(f)
+
+    http_scraper = PixabayHttpScraper(curr_dir=parent_directory) if USE_HTTP_BACKEND else None
+    # straight from the CDN over the shared session, whichever backend found the image
+    downloader = CdnDownloader(os.path.join(parent_directory, "filtered_images"))
+    browser = None
+    pixabay = None
+    for segment in transcription["segments"]:
+        query = segment["image_suggestion"][0]
+
+        # answer from the local catalog first, only scrape on a miss
+        hits = catalog.search(query, k=DOWNLOADS_PER_SEGMENT)
+        if hits and hits[0][1] >= CATALOG_SCORE_THRESHOLD:
+            print(f"[catalog] {query} -> {hits[0][0]['contentUrl']} ({hits[0][1]:.3f})")
+        else:
+            result = None
+            # the search page already carries the JSON-LD, so try plain HTTP first
+            if http_scraper is not None:
+                try:
+                    await http_scraper.search(query)
+                    result = await http_scraper.result()
+                    source = "http"
+                except PixabayBlockedError as e:
+                    print(f"HTTP backend blocked ({e}), switching to the browser")
+                    http_scraper = None
+
+            if result is None:
+                if browser is None:
+                    chromium = playwright.chromium  # or "firefox" or "webkit".
+                    browser = await chromium.launch_persistent_context(
+                        user_data_dir=os.path.join(parent_directory, "deepak"),
+                        channel="chrome",
+                        headless=False,
+                    )
+                    pixabay = PixabayScraper(browser=browser, curr_dir=parent_directory)
+
+                # visual = VisualImageDownloader(browser=browser)
+                # await visual.transcript_path(path='output.json')
+
+                await pixabay.search(query)
+                # await pixabay.filter()
+                result = await pixabay.result()
+                source = "scrape"
+
+            added = catalog.add(result)
+            catalog.save()
+            print(f"[{source}] {query} -> {len(result)} results, {added} new in catalog")
+            hits = catalog.search(query, k=DOWNLOADS_PER_SEGMENT)
+
+        paths = await downloader.download_all(img["contentUrl"] for img, _ in hits)
+        saved = sum(path is not None for path in paths.values())
+        print(f"[download] {query} -> {saved}/{len(paths)} images")
+
+    # also closes the session of a scraper dropped after being blocked
+    await close_shared_client()
+    if browser is not None:
+        print(pixabay.waits.report())
+        await browser.close()
 
 
 async def main():
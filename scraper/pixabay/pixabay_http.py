@@ -0,0 +1,193 @@
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterable, List, Optional
+from autogen_course.wait_engine import pixabay_search_url
+import json
+import os
+
+import httpx
+
+# one pooled, keep-alive session shared by every PixabayHttpScraper
+_client: Optional[httpx.AsyncClient] = None
+
+BROWSER_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+def new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        headers=BROWSER_HEADERS,
+        follow_redirects=True,
+        timeout=httpx.Timeout(15.0, connect=5.0),
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=8),
+    )
+
+
+def shared_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = new_client()
+    return _client
+
+
+async def close_shared_client():
+    """Close the pooled session; call once, after every scraper and downloader is done"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+class PixabayBlockedError(RuntimeError):
+    """Pixabay answered with a bot check instead of search results"""
+
+
+class LdJsonStreamParser(HTMLParser):
+    """Incrementally extracts ImageObject JSON-LD blocks from HTML chunks.
+
+    Feed the page as it arrives; every ``<script type="application/ld+json">``
+    inside the result list (``div[class^="results"] div[class^="verticalMasonry"]``,
+    the container the browser scraper reads) is decoded as soon as its
+    closing tag is seen, so the whole document is never held in memory.
+    JSON-LD elsewhere on the page (site metadata, related images) is ignored.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._in_ld_json = False
+        self._buffer: List[str] = []
+        self._ready: List[dict] = []
+        # one entry per open <div>: "results", "masonry" or None
+        self._divs: List[Optional[str]] = []
+
+    @property
+    def in_results(self) -> bool:
+        return "masonry" in self._divs
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "div":
+            css_class = attrs.get("class") or ""
+            if css_class.startswith("results"):
+                self._divs.append("results")
+            elif css_class.startswith("verticalMasonry") and "results" in self._divs:
+                self._divs.append("masonry")
+            else:
+                self._divs.append(None)
+        elif tag == "script" and attrs.get("type") == "application/ld+json" and self.in_results:
+            self._in_ld_json = True
+            self._buffer = []
+
+    def handle_data(self, data):
+        if self._in_ld_json:
+            self._buffer.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "div" and self._divs:
+            self._divs.pop()
+            return
+        if tag != "script" or not self._in_ld_json:
+            return
+        self._in_ld_json = False
+        try:
+            payload = json.loads("".join(self._buffer))
+        except json.JSONDecodeError:
+            return
+        if isinstance(payload, list):
+            nodes = payload
+        elif isinstance(payload, dict):
+            nodes = payload.get("@graph", [payload])
+        else:
+            return
+        if not isinstance(nodes, list):
+            return
+        self._ready.extend(
+            node for node in nodes if isinstance(node, dict) and "contentUrl" in node
+        )
+
+    def feed_chunk(self, chunk: str) -> List[dict]:
+        """Feed one chunk and return the image objects completed by it"""
+        self.feed(chunk)
+        ready, self._ready = self._ready, []
+        return ready
+
+
+def parse_ld_json(chunks: Iterable[str]) -> List[dict]:
+    parser = LdJsonStreamParser()
+    images = []
+    for chunk in chunks:
+        images.extend(parser.feed_chunk(chunk))
+    parser.close()
+    return images
+
+
+def parse_html_file(path: str, chunk_size: int = 64 * 1024) -> List[dict]:
+    """Parse a saved search page (e.g. a test fixture) exactly like a live response"""
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_ld_json(iter(lambda: f.read(chunk_size), ""))
+
+
+class PixabayHttpScraper:
+    """Browser-free drop-in for PixabayScraper.
+
+    ``search`` streams the search page over a pooled HTTP session and
+    ``result`` returns the same list of JSON-LD dicts the browser scraper
+    reads from the rendered page. With ``shared=False`` (and no ``client``)
+    the scraper opens a session of its own, which ``close()`` closes; the
+    shared pool is left to ``close_shared_client()``.
+    """
+
+    def __init__(self, curr_dir: str, client: Optional[httpx.AsyncClient] = None, shared: bool = True):
+        self.curr_dir = curr_dir
+        self._owns_client = client is None and not shared
+        self.client = client or (shared_client() if shared else new_client())
+        self.images: List[dict] = []
+
+    async def search(self, query: str, use_url_filters: bool = True):
+        self.output_dir = Path(os.path.join(self.curr_dir, Path("filtered_images")))
+        self.output_dir.mkdir(exist_ok=True)
+
+        parser = LdJsonStreamParser()
+        self.images = []
+        url = pixabay_search_url(query, filtered=use_url_filters)
+        async with self.client.stream("GET", url) as response:
+            if response.status_code in (403, 429, 503):
+                raise PixabayBlockedError(f"{response.status_code} for {url}")
+            response.raise_for_status()
+            async for chunk in response.aiter_text():
+                self.images.extend(parser.feed_chunk(chunk))
+        parser.close()
+
+    async def filter(self):
+        # filters are part of the search URL
+        pass
+
+    async def result(self):
+        for img in self.images:
+            print(img["contentUrl"])
+        return self.images
+
+    async def download(self, images: List[dict] = None, concurrency: int = 6):
+        from cdn_downloader import CdnDownloader
+
+        images = self.images if images is None else images
+        downloader = CdnDownloader(self.output_dir, concurrency=concurrency, client=self.client)
+        return await downloader.download_all(img["contentUrl"] for img in images)
+
+    async def close(self):
+        if self._owns_client:
+            await self.client.aclose()
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python pixabay_http.py saved_search_page.html
+    for image in parse_html_file(sys.argv[1]):
+        print(image["contentUrl"], "|", image.get("name"))
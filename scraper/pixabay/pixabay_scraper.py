@@ -1,29 +1,39 @@
 from patchright.async_api import async_playwright, Playwright, Page, BrowserContext,Response
-import asyncio
+from patchright.async_api import TimeoutError as PlaywrightTimeoutError
+from autogen_course.wait_engine import WaitEngine, StepTimeout, pixabay_search_url
+from cdn_downloader import CdnDownloader, url_filename, write_atomic
 import json
 from pathlib import Path
 import os
 
+RESULTS_SELECTOR = 'div[class^="results"] div[class^="verticalMasonry"] script[type="application/ld+json"]'
+
+
 class PixabayScraper:
-    def __init__(self, browser: BrowserContext,curr_dir:str):
+    def __init__(self, browser: BrowserContext,curr_dir:str, waits: WaitEngine = None):
         self.browser = browser
         self.curr_dir = curr_dir
+        # shared so every step of every search lands in the same latency report
+        self.waits = waits or WaitEngine()
+        self.url_filtered = False
+        self.images_result = []
 
     async def open_page(self):
         # https://pixabay.com/photos/search/mountain/?content_type=authentic&orientation=horizontal
         await self.page.goto("https://pixabay.com/")
         
     async def download_photo_response(self,response:Response):
+        """Save CDN images the page itself loads, instead of downloading them again"""
         url = response.url
         if url.startswith('https://cdn.pixabay.com/photo') and url.endswith("1280.jpg"):
+            save_path = self.output_dir / url_filename(url)
+            if save_path.exists():
+                return
             img_data = await response.body()
-            filename = Path(url.split("/")[-1])
-            save_path = self.output_dir / filename
-            with open(save_path, "wb") as f:
-                f.write(img_data)
-                print(f"🖼️ Saved image: {save_path}")
+            write_atomic(save_path, img_data)
+            print(f"🖼️ Saved image: {save_path}")
 
-    async def search(self, query: str):
+    async def search(self, query: str, use_url_filters: bool = True, capture_responses: bool = False):
         
         self.page = await self.browser.new_page()
         
@@ -32,7 +42,8 @@ class PixabayScraper:
         self.output_dir.mkdir(exist_ok=True)
         
         
-        # self.page.on("response",self.download_photo_response)
+        if capture_responses:
+            self.page.on("response",self.download_photo_response)
         
         # self.page.on(
         #     "request", lambda request: print(">>", request.method, request.url)
@@ -41,84 +52,101 @@ class PixabayScraper:
         #     "response", lambda response: print("<<", response.status, response.url)
         # )
 
-        await self.page.goto(
-            f"https://pixabay.com/photos/search/{query}/?content_type=authentic&orientation=horizontal"
+        # the photo/horizontal/authentic filters ride along in the URL, which
+        # makes filter() a no-op
+        self.url_filtered = use_url_filters
+        await self.waits.step(
+            "goto_search",
+            self.page.goto(
+                pixabay_search_url(query, filtered=use_url_filters),
+                wait_until="domcontentloaded",
+            ),
+        )
+        await self.wait_for_results()
+
+    async def wait_for_results(self):
+        await self.waits.step(
+            "results", self.page.wait_for_selector(RESULTS_SELECTOR, state="attached")
         )
-        await (await self.page.query_selector(selector="input[type='search']")).fill(
-            query
+
+    async def _open(self, name: str, selector: str):
+        """Click a filter trigger as soon as it is visible"""
+        handle = await self.waits.step(
+            name, self.page.wait_for_selector(selector, state="visible")
         )
-        await self.page.evaluate(
-            expression="""()=>{
-                    // Create a new KeyboardEvent for Enter
-                    var enterEvent = new KeyboardEvent('keydown', {
-                        key: 'Enter',
-                        code: 'Enter',
-                        keyCode: 13,
-                        which: 13,
-                        bubbles: true
-                    });
+        await handle.click()
 
-                    // Dispatch the event on the currently focused element
-                    document.activeElement.dispatchEvent(enterEvent);      
-                    } """
+    async def _choose(self, name: str, selector: str):
+        """Click a dropdown option and wait for the results request it triggers"""
+        handle = await self.waits.step(
+            name, self.page.wait_for_selector(selector, state="visible")
         )
+        timeout = self.waits.default_timeout
+
+        async def click_and_wait():
+            # leaving the block already waits for the response, so the whole
+            # block is the step and Playwright gets the same timeout
+            async with self.page.expect_response(
+                lambda response: "pixabay.com" in response.url
+                and response.request.resource_type in ("document", "fetch", "xhr"),
+                timeout=timeout * 1000,
+            ) as response_info:
+                await handle.click()
+            return await response_info.value
+
+        try:
+            await self.waits.step(f"{name}_response", click_and_wait(), timeout)
+        except (StepTimeout, PlaywrightTimeoutError) as e:
+            print(f"{name}: {e}")
 
     async def filter(self):
+        if self.url_filtered:
+            return
         # photo => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="triggerWrapper"] > button
-        await (
-            await self.page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="triggerWrapper"] > button'
-            )
-        ).click()
-
-        await asyncio.sleep(2)
+        await self._open(
+            "photo_trigger",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="triggerWrapper"] > button',
+        )
         # dropdown photo click => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)
-        await (
-            await self.page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)'
-            )
-        ).click()
-        await asyncio.sleep(2)
+        await self._choose(
+            "photo_option",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(1) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)',
+        )
         # horizontal => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="triggerWrapper"] >button
-        await (
-            await self.page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="triggerWrapper"] >button'
-            )
-        ).click()
-        await asyncio.sleep(2)
+        await self._open(
+            "orientation_trigger",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="triggerWrapper"] >button',
+        )
         # div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)
-        await (
-            await self.page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)'
-            )
-        ).click()
-        await asyncio.sleep(2)
+        await self._choose(
+            "orientation_option",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(2) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)',
+        )
         # authencity => div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="triggerWrapper"] >button
-        await (
-            await self.page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="triggerWrapper"] >button'
-            )
-        ).click()
-        await asyncio.sleep(2)
+        await self._open(
+            "authenticity_trigger",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="triggerWrapper"] >button',
+        )
         # div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)
-        await (
-            await self.page.query_selector(
-                'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)'
-            )
-        ).click()
-        await asyncio.sleep(2)
+        await self._choose(
+            "authenticity_option",
+            'div[class^="filters"] div[class^="lhs"]  div[class^="container"]:nth-child(6) > div[class^="dropdown"]  div[class^="dropdownMenuItem"]:nth-child(2)',
+        )
+        await self.wait_for_results()
 
     async def result(self):
-        images = await self.page.query_selector_all(
-            'div[class^="results"] div[class^="verticalMasonry"] script[type="application/ld+json"]'
-        )
+        images = await self.page.query_selector_all(RESULTS_SELECTOR)
         images_result = []
         for image in images:
             img = json.loads(await image.text_content())
             images_result.append(img)
             print(img["contentUrl"])
 
+        self.images_result = images_result
         return images_result
 
-    async def download(self):
-        pass
+    async def download(self, images: list = None, concurrency: int = 6):
+        """Fetch contentUrls from result() straight from the CDN, in parallel"""
+        images = self.images_result if images is None else images
+        downloader = CdnDownloader(self.output_dir, concurrency=concurrency)
+        return await downloader.download_all(img["contentUrl"] for img in images)
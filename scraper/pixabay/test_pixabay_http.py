@@ -0,0 +1,61 @@
+from pathlib import Path
+import asyncio
+
+from pixabay_http import LdJsonStreamParser, PixabayHttpScraper, close_shared_client, parse_html_file
+
+FIXTURE = Path(__file__).parent / "fixtures" / "search_mountain.html"
+
+EXPECTED_URLS = [
+    "https://cdn.pixabay.com/photo/2016/01/01/00/00/mountains-1111111_1280.jpg",
+    "https://cdn.pixabay.com/photo/2017/02/02/00/00/peak-2222222_1280.jpg",
+    "https://cdn.pixabay.com/photo/2018/03/03/00/00/lake-3333333_1280.jpg",
+]
+
+
+def test_extracts_only_result_list_images():
+    images = parse_html_file(str(FIXTURE))
+    assert [img["contentUrl"] for img in images] == EXPECTED_URLS
+    assert images[0]["name"] == "Mountains Alps Snow"
+    assert images[0]["creator"]["name"] == "alpinist"
+
+
+def test_tiny_chunks_give_the_same_result():
+    # a chunk boundary can fall inside a tag or a JSON string
+    assert parse_html_file(str(FIXTURE), chunk_size=7) == parse_html_file(str(FIXTURE))
+
+
+def test_images_are_returned_as_soon_as_their_script_closes():
+    parser = LdJsonStreamParser()
+    html = FIXTURE.read_text(encoding="utf-8")
+    cut = html.index("peak-2222222_640.jpg")
+    first = parser.feed_chunk(html[:cut])
+    rest = parser.feed_chunk(html[cut:])
+    assert [img["contentUrl"] for img in first] == EXPECTED_URLS[:1]
+    assert [img["contentUrl"] for img in rest] == EXPECTED_URLS[1:]
+
+
+def test_scalar_and_malformed_payloads_are_skipped():
+    parser = LdJsonStreamParser()
+    html = (
+        '<div class="results--a"><div class="verticalMasonry--b">'
+        '<script type="application/ld+json">"just a string"</script>'
+        '<script type="application/ld+json">null</script>'
+        '<script type="application/ld+json">{"@graph": 3}</script>'
+        '<script type="application/ld+json">{"contentUrl": </script>'
+        "</div></div>"
+    )
+    assert parser.feed_chunk(html) == []
+
+
+def test_close_leaves_the_shared_session_open(tmp_path):
+    async def run():
+        first = PixabayHttpScraper(str(tmp_path))
+        second = PixabayHttpScraper(str(tmp_path))
+        own = PixabayHttpScraper(str(tmp_path), shared=False)
+        await first.close()
+        await own.close()
+        still_open = not second.client.is_closed
+        await close_shared_client()
+        return still_open, own.client.is_closed, second.client.is_closed
+
+    assert asyncio.run(run()) == (True, True, True)
@@ -1,8 +1,8 @@
-from sentence_transformers import SentenceTransformer
+from autogen_course.embedding_cache import EmbeddingCache
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
-model = SentenceTransformer('all-mpnet-base-v2')
+model = EmbeddingCache('all-mpnet-base-v2')
 
 
 reference_words = {
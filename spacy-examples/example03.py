@@ -1,10 +1,10 @@
-from sentence_transformers import SentenceTransformer
+from autogen_course.embedding_cache import EmbeddingCache
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 from pprint import pprint
 
-# Step 1: Load the model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Step 1: Load the model (embeddings are cached on disk between runs)
+model = EmbeddingCache('all-MiniLM-L6-v2')
 
 # Step 2: Reference words for each category
 reference_words = {
@@ -4,27 +4,20 @@ from pydoll.browser.tab import Tab
 from pydoll.browser.options import ChromiumOptions as Options
 from bs4 import BeautifulSoup
 import json
-from pathlib import Path
-from sentence_transformers import SentenceTransformer, util
+from autogen_course.embedding_cache import EmbeddingCache
+from autogen_course.image_matcher import ImageMatcher
+from autogen_course.asset_store import AssetStore
 import os
-import shutil
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+model = EmbeddingCache('all-MiniLM-L6-v2')
+matcher = ImageMatcher(model)
 
 
-def handle_image(index:str):
-    #  current directory
-    current_dir = Path(os.path.join(os.getcwd(), "image_downloads"))
-    # target directory
-    target_dir = Path(os.path.join(os.getcwd(), "images"))
+store = AssetStore()
 
-    for file in current_dir.iterdir():
-        if file.is_file():
-            new_name = f"{index}.jpg"
-            new_path = target_dir / new_name  # new folder + new name
-            # file.rename(new_path)
-            shutil.move(str(file), str(new_path))
-            print(f"Moved + renamed {file.name} → {new_path}")
+
+def handle_image(index: str, query: str = None, url: str = None):
+    store.fetch_to(os.getcwd(), index, url=url, query=query)
 
 async def main(query:str,index:str):
     
@@ -70,22 +63,20 @@ async def main(query:str,index:str):
             await asyncio.sleep(3)
 
             images = await tab.query('div[class^="results"] div[class^="verticalMasonry"] script[type="application/ld+json"]',find_all=True)
-            suggestion_embedding = model.encode(query)
-            selected_image = None
-            best_score = -1
+            image_objects = []
             
             for image in images:
                 # print(image)
                 image_data = await image.inner_html
                 soup = BeautifulSoup(image_data,features="html.parser")
                 image_str_obj = soup.find('script').text
-                image_object = json.loads(image_str_obj)
-                image_embedding = model.encode(image_object["name"])
-                similarity = util.cos_sim(suggestion_embedding, image_embedding).item()
-                print(f"Suggestion: '{"mountain peak silhouette"}' | Image: {image_object['contentUrl']} | Score: {similarity:.3f}")
-                if similarity > best_score:
-                    best_score = similarity
-                    selected_image = image_object
+                image_objects.append(json.loads(image_str_obj))
+            
+            # score every result in one batched pass instead of one encode per image
+            [matches] = matcher.top_k([query], image_objects, k=len(image_objects))
+            for image_object, similarity in matches:
+                print(f"Suggestion: '{query}' | Image: {image_object['contentUrl']} | Score: {similarity:.3f}")
+            selected_image, best_score = matches[0]
                 
             print("\n=== BEST MATCH ===")
             print(f"selected Image a tag href {selected_image['acquireLicensePage']}")
@@ -114,7 +105,7 @@ async def main(query:str,index:str):
                 
             except Exception as e:
                 print(e)
-            handle_image(index=index)
+            handle_image(index=index, query=query, url=selected_image['contentUrl'])
             # await asyncio.sleep(2000)
     except Exception as e:
         #  handle browser level error
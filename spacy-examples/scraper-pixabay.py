@@ -1,27 +1,18 @@
 import asyncio
 import json
-from pathlib import Path
 # from sentence_transformers import SentenceTransformer, util
 import os
-import shutil
+from autogen_course.asset_store import AssetStore
 
 # from playwright.async_api import async_playwright, Playwright
 from patchright.async_api import async_playwright, Playwright, Page
 
 
-def handle_image(index: str):
-    #  current directory
-    current_dir = Path(os.path.join(os.getcwd(), "image_downloads"))
-    # target directory
-    target_dir = Path(os.path.join(os.getcwd(), "images"))
+store = AssetStore()
 
-    for file in current_dir.iterdir():
-        if file.is_file():
-            new_name = f"{index}.jpg"
-            new_path = target_dir / new_name  # new folder + new name
-            # file.rename(new_path)
-            shutil.move(str(file), str(new_path))
-            print(f"Moved + renamed {file.name} → {new_path}")
+
+def handle_image(index: str, query: str = None, url: str = None):
+    store.fetch_to(os.getcwd(), index, url=url, query=query)
 
 
 async def handle_pixabay_filter(page: Page):